@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Benchmark penulisan baris Excel (openpyxl)
+Membandingkan cara lama exporter (objek Font/Border/Alignment dibuat per sel)
+dengan NamedStyle dari excel_styles + RowWriter, pada worksheet biasa dan
+worksheet write-only. Tidak membutuhkan database: baris transaksi kasir
+dibuat secara sintetis.
+
+    python benchmark_excel.py --rows 20000
+
+Hasil: baris/detik, ukuran file dan jumlah entri style (cellXfs) workbook.
+"""
+import argparse
+import io
+import time
+from datetime import datetime, timedelta
+
+from openpyxl import Workbook
+from openpyxl.styles import Alignment, Border, Font, PatternFill, Side
+from openpyxl.utils import get_column_letter
+
+from excel_styles import RowWriter, register_styles, set_column_widths
+
+HEADERS = ['No', 'ID Transaksi', 'Tanggal & Waktu', 'Nama Pembeli',
+           'Metode Pembayaran', 'Daftar Barang', 'Total', 'Status']
+COLUMN_WIDTHS = [5, 25, 20, 20, 18, 50, 15, 12]
+
+
+def sample_rows(count):
+    start = datetime(2026, 1, 1, 9, 0)
+    for idx in range(1, count + 1):
+        yield [
+            idx, f'TRX-{idx:08d}',
+            (start + timedelta(minutes=idx)).strftime('%d/%m/%Y %H:%M:%S'),
+            f'Pembeli {idx % 500}', ('Cash', 'Debit', 'Qris')[idx % 3],
+            f'Senar Gitar x{idx % 4 + 1} (@Rp 85,000); Pick x2 (@Rp 5,000)',
+            float(85000 * (idx % 4 + 1) + 10000),
+            'Tersinkron' if idx % 5 else 'Pending',
+        ]
+
+
+def write_per_cell(rows):
+    """Cara lama: objek style baru untuk setiap sel"""
+    wb = Workbook()
+    ws = wb.active
+    border = Border(left=Side(style='thin'), right=Side(style='thin'),
+                    top=Side(style='thin'), bottom=Side(style='thin'))
+    for col, header in enumerate(HEADERS, start=1):
+        cell = ws.cell(row=1, column=col, value=header)
+        cell.fill = PatternFill(start_color='FF6B35', end_color='FF6B35', fill_type='solid')
+        cell.font = Font(bold=True, color='FFFFFF', size=11)
+        cell.border = border
+        cell.alignment = Alignment(horizontal='center', vertical='center')
+    for row_data in rows:
+        row_num = ws.max_row + 1
+        for col, value in enumerate(row_data, start=1):
+            cell = ws.cell(row=row_num, column=col)
+            cell.value = value
+            cell.border = border
+            if col == 7:
+                cell.number_format = 'Rp #,##0'
+                cell.alignment = Alignment(horizontal='right')
+            else:
+                cell.alignment = Alignment(horizontal='left', vertical='center', wrap_text=True)
+    for idx, width in enumerate(COLUMN_WIDTHS, start=1):
+        ws.column_dimensions[get_column_letter(idx)].width = width
+    return wb
+
+
+def write_named_styles(rows, write_only=False):
+    """Cara baru: NamedStyle terdaftar sekali, RowWriter per baris"""
+    wb = register_styles(Workbook(write_only=write_only))
+    ws = wb.create_sheet('Benchmark') if write_only else wb.active
+    set_column_widths(ws, COLUMN_WIDTHS)
+    sheet = RowWriter(ws)
+    sheet.append(HEADERS, 'hr_brand_header')
+    row_styles = ['hr_brand_cell'] * 6 + ['hr_brand_cell_money', 'hr_brand_cell']
+    for row_data in rows:
+        sheet.append(row_data, row_styles)
+    return wb
+
+
+def run(name, build, rows):
+    started = time.perf_counter()
+    wb = build(sample_rows(rows))
+    output = io.BytesIO()
+    wb.save(output)
+    elapsed = time.perf_counter() - started
+    style_count = len(wb._cell_styles)
+    print(f"{name:<28} {rows / elapsed:>12,.0f} {output.tell() / 1024:>12,.0f} {style_count:>8}")
+    return rows / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--rows', type=int, default=20000, help='Jumlah baris data')
+    args = parser.parse_args()
+
+    print(f"{'Metode':<28} {'baris/detik':>12} {'ukuran (KB)':>12} {'styles':>8}")
+    before = run('per-sel (sebelum)', write_per_cell, args.rows)
+    after = run('NamedStyle', write_named_styles, args.rows)
+    streamed = run('NamedStyle + write-only',
+                   lambda rows: write_named_styles(rows, write_only=True), args.rows)
+    print(f"\n[INFO] NamedStyle: {after / before:.2f}x, "
+          f"NamedStyle + write-only: {streamed / before:.2f}x dibanding per-sel")
+
+
+if __name__ == '__main__':
+    main()
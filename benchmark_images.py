@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Benchmark kompresi gambar produk
+Membandingkan compress_image lama (simpan ulang ke disk hingga 10 kali dan
+cek os.path.getsize setiap kali) dengan encode_to_target di image_pipeline
+(binary search kualitas/dimensi di BytesIO, satu kali tulis atomik). Gambar
+fixture disalin ke folder sementara, jadi file asli tidak berubah.
+
+    python benchmark_images.py --dir static/public/produk_images --max-kb 200
+
+Hasil: waktu encode per gambar, total byte yang ditulis ke disk, total ukuran
+akhir dan jumlah gambar yang masih di atas batas.
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from PIL import Image
+
+from image_pipeline import compress_image
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp')
+
+
+class WriteCounter:
+    """Hitung byte yang ditulis ke disk (ukuran file setelah setiap save)"""
+
+    def __init__(self):
+        self.bytes = 0
+
+    def saved(self, path):
+        self.bytes += os.path.getsize(path)
+
+
+def legacy_compress(image_path, max_size_mb, counter):
+    """compress_image sebelum image_pipeline.encode_to_target"""
+    img = Image.open(image_path)
+    original_format = img.format
+    if os.path.getsize(image_path) / (1024 * 1024) <= max_size_mb:
+        return image_path
+    if original_format == 'GIF' and getattr(img, 'is_animated', False):
+        return image_path
+
+    if original_format in ('JPEG', 'JPG'):
+        save_format, save_kwargs = 'JPEG', {'optimize': True, 'quality': 85}
+    elif original_format == 'WEBP':
+        save_format, save_kwargs = 'WEBP', {'optimize': True, 'quality': 85}
+    else:
+        save_format, save_kwargs = 'PNG', {'optimize': True}
+
+    for _ in range(10):
+        img.save(image_path, save_format, **save_kwargs)
+        counter.saved(image_path)
+        if os.path.getsize(image_path) / (1024 * 1024) <= max_size_mb:
+            break
+        width, height = img.size
+        if width > 800 or height > 800:
+            img = img.resize((int(width * 0.8), int(height * 0.8)), Image.Resampling.LANCZOS)
+        else:
+            break
+    return image_path
+
+
+def fixture_images(directory, limit):
+    names = sorted(name for name in os.listdir(directory)
+                   if name.lower().endswith(IMAGE_EXTENSIONS))
+    return [os.path.join(directory, name) for name in names[:limit]]
+
+
+def run(name, compress, fixtures, max_size_mb):
+    workdir = tempfile.mkdtemp(prefix='benchmark_images_')
+    try:
+        paths = [shutil.copy(path, os.path.join(workdir, f'{i}_{os.path.basename(path)}'))
+                 for i, path in enumerate(fixtures)]
+        counter = WriteCounter()
+        started = time.perf_counter()
+        for path in paths:
+            compress(path, max_size_mb, counter)
+        elapsed = time.perf_counter() - started
+        sizes = [os.path.getsize(path) for path in paths]
+    finally:
+        shutil.rmtree(workdir)
+
+    limit = max_size_mb * 1024 * 1024
+    over = sum(1 for size in sizes if size > limit)
+    print(f"{name:<24} {elapsed * 1000 / len(fixtures):>10,.1f} {counter.bytes / 1024:>14,.0f} "
+          f"{sum(sizes) / 1024:>12,.0f} {over:>8}")
+    return elapsed, counter.bytes
+
+
+def single_pass(path, max_size_mb, counter):
+    before = os.stat(path)
+    compress_image(path, max_size_mb)
+    after = os.stat(path)
+    # Ditulis sekali jika file diganti (inode baru dari os.replace)
+    if (after.st_ino, after.st_mtime_ns) != (before.st_ino, before.st_mtime_ns):
+        counter.saved(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--dir', default='static/public/produk_images',
+                        help='Folder fixture foto produk')
+    parser.add_argument('--limit', type=int, default=100, help='Jumlah gambar maksimum')
+    parser.add_argument('--max-kb', type=int, default=200,
+                        help='Batas ukuran file (KB); kecil agar kompresi benar-benar berjalan')
+    args = parser.parse_args()
+
+    fixtures = fixture_images(args.dir, args.limit)
+    if not fixtures:
+        parser.error(f'Tidak ada gambar di {args.dir}')
+    max_size_mb = args.max_kb / 1024
+    total_kb = sum(os.path.getsize(path) for path in fixtures) / 1024
+    print(f"[INFO] {len(fixtures)} gambar, {total_kb:,.0f} KB, batas {args.max_kb} KB\n")
+
+    print(f"{'Metode':<24} {'ms/gambar':>10} {'ditulis (KB)':>14} {'hasil (KB)':>12} {'> batas':>8}")
+    before_time, before_bytes = run('iteratif (sebelum)', legacy_compress, fixtures, max_size_mb)
+    after_time, after_bytes = run('single-pass', single_pass, fixtures, max_size_mb)
+    print(f"\n[INFO] single-pass: {before_time / after_time:.2f}x lebih cepat, "
+          f"{before_bytes / max(after_bytes, 1):.1f}x lebih sedikit byte ditulis")
+
+
+if __name__ == '__main__':
+    main()
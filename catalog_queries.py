@@ -0,0 +1,316 @@
+"""
+Catalog query layer untuk Hurtrock Music Store
+Query produk dengan eager loading kategori dan gambar supaya halaman listing
+tidak memicu N+1 SELECT, pagination offset/keyset dengan count yang di-cache,
+plus helper penghitung query untuk mendeteksi regresi. refresh_catalog_caches
+mengosongkan cache katalog di semua proses (lihat CatalogCacheSync).
+"""
+
+import base64
+import json
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime
+
+from sqlalchemy import event, tuple_
+from sqlalchemy.orm import joinedload, selectinload
+
+import models
+from database import db
+
+
+def with_listing_relations(query, images=True):
+    """Tambahkan eager loading category (JOIN) dan images (SELECT IN)"""
+    options = [joinedload(models.Product.category)]
+    if images:
+        options.append(selectinload(models.Product.images))
+    return query.options(*options)
+
+
+def active_products_query(category_id=None, images=True):
+    """Query produk aktif siap dirender (category dan images sudah dimuat)"""
+    query = with_listing_relations(
+        models.Product.query.filter(models.Product.is_active == True),
+        images=images)
+    if category_id is not None:
+        query = query.filter(models.Product.category_id == category_id)
+    return query
+
+
+def homepage_products(limit=8):
+    """Produk untuk halaman utama"""
+    return active_products_query().limit(limit).all()
+
+
+def related_products(product, limit=4):
+    """Produk aktif lain di kategori yang sama untuk halaman detail"""
+    return active_products_query(category_id=product.category_id).filter(
+        models.Product.id != product.id).order_by(
+            models.Product.id).limit(limit).all()
+
+
+def active_categories():
+    return models.Category.query.filter_by(is_active=True).all()
+
+
+# ===========================
+# PAGINATION
+# ===========================
+
+PRODUCTS_PER_PAGE = 24
+COUNT_CACHE_TTL = 300  # detik
+# Key berisi teks pencarian bebas dari user: cache dibatasi (LRU)
+COUNT_CACHE_MAX_ENTRIES = 256
+
+# sort -> (kolom kunci, urutan menurun?)
+PRODUCT_SORTS = {
+    'name': ('name', False),
+    'newest': ('created_at', True),
+}
+
+_count_cache = OrderedDict()  # key -> (count, waktu), urutan = terakhir dipakai
+_count_cache_lock = threading.Lock()
+
+
+def cached_count(key, query):
+    """
+    COUNT(*) query yang di-cache per key selama COUNT_CACHE_TTL detik, paling
+    banyak COUNT_CACHE_MAX_ENTRIES key (yang paling lama tidak dipakai dibuang)
+    """
+    now = time.monotonic()
+    with _count_cache_lock:
+        entry = _count_cache.get(key)
+        if entry and now - entry[1] < COUNT_CACHE_TTL:
+            _count_cache.move_to_end(key)
+            return entry[0]
+
+    count = query.order_by(None).count()
+    with _count_cache_lock:
+        _count_cache[key] = (count, now)
+        _count_cache.move_to_end(key)
+        while len(_count_cache) > COUNT_CACHE_MAX_ENTRIES:
+            _count_cache.popitem(last=False)
+    return count
+
+
+def invalidate_product_counts():
+    """Kosongkan cache count setelah produk ditambah/diubah/dihapus"""
+    with _count_cache_lock:
+        _count_cache.clear()
+
+
+def refresh_catalog_caches():
+    """
+    Invalidasi seluruh cache katalog (import massal, edit kategori), di proses
+    ini dan, lewat catalog_sync, di proses web lain
+    """
+    _invalidate_local_caches()
+    catalog_sync.notify()
+
+
+def _invalidate_local_caches():
+    from page_cache import page_cache
+    from search_index import product_search_index
+
+    product_search_index.mark_stale()
+    invalidate_product_counts()
+    page_cache.invalidate('catalog')
+
+
+# File penanda di instance/; mtime-nya berubah setiap refresh_catalog_caches
+CATALOG_STALE_FILE = 'catalog.stale'
+CATALOG_SYNC_INTERVAL = 2  # detik, jeda minimum antar pemeriksaan per proses
+
+
+class CatalogCacheSync:
+    """
+    Search index, count cache dan page cache memory disimpan per proses. Import
+    dari export worker (EXPORT_WORKER=external) atau worker gunicorn lain
+    menyentuh file penanda; setiap proses web memeriksa mtime-nya di awal
+    request lalu mengosongkan cache katalognya sendiri.
+    """
+
+    def __init__(self):
+        self.path = None
+        self._seen = None
+        self._checked_at = 0.0
+
+    def init_app(self, app):
+        os.makedirs(app.instance_path, exist_ok=True)
+        self.path = os.path.join(app.instance_path, CATALOG_STALE_FILE)
+        self._seen = self._mtime()
+        app.before_request(self.check)
+
+    def _mtime(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def notify(self):
+        """Tandai cache katalog proses lain kedaluwarsa"""
+        if self.path is None:
+            return
+        try:
+            with open(self.path, 'a'):
+                pass
+            os.utime(self.path)
+        except OSError as e:
+            print(f"[WARNING] Could not mark catalog caches stale: {e}")
+            return
+        self._seen = self._mtime()  # cache proses ini sudah dikosongkan
+
+    def check(self):
+        now = time.monotonic()
+        if now - self._checked_at < CATALOG_SYNC_INTERVAL:
+            return
+        self._checked_at = now
+        mtime = self._mtime()
+        if mtime != self._seen:
+            self._seen = mtime
+            _invalidate_local_caches()
+
+
+catalog_sync = CatalogCacheSync()
+
+
+def encode_cursor(sort, product):
+    """Cursor keyset opaque berisi (sort, nilai kolom kunci, id)"""
+    column, _ = PRODUCT_SORTS[sort]
+    value = getattr(product, column)
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    payload = json.dumps([sort, value, product.id]).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+
+
+def decode_cursor(token, sort):
+    """Kembalikan (nilai, id) dari cursor, atau None jika tidak valid"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        cursor_sort, value, product_id = json.loads(
+            base64.urlsafe_b64decode(padded.encode()))
+        if cursor_sort != sort or value is None:
+            return None
+        if PRODUCT_SORTS[sort][0] == 'created_at':
+            value = datetime.fromisoformat(value)
+        return value, int(product_id)
+    except (ValueError, TypeError, KeyError):
+        return None
+
+
+class ProductPage:
+    """Satu halaman hasil listing produk"""
+
+    def __init__(self, items, sort, page, per_page, total, has_next,
+                 next_cursor, is_keyset):
+        self.items = items
+        self.sort = sort
+        self.page = page
+        self.per_page = per_page
+        self.total = total
+        self.has_next = has_next
+        self.next_cursor = next_cursor
+        self.is_keyset = is_keyset
+
+    @property
+    def pages(self):
+        return max(1, math.ceil(self.total / self.per_page))
+
+    @property
+    def has_prev(self):
+        return self.page > 1
+
+    def iter_pages(self, window=2):
+        """Nomor halaman di sekitar halaman aktif (None = elipsis)"""
+        last = self.pages
+        shown = {1, last} | set(range(self.page - window, self.page + window + 1))
+        previous = 0
+        for number in sorted(n for n in shown if 1 <= n <= last):
+            if number - previous > 1:
+                yield None
+            yield number
+            previous = number
+
+
+def paginate_products(query, count_key, sort='name', page=1,
+                      per_page=PRODUCTS_PER_PAGE, cursor=None):
+    """
+    Paginate query produk. Dengan cursor dipakai keyset pagination
+    (WHERE (kolom, id) > nilai terakhir), tanpa cursor dipakai OFFSET.
+    Total selalu diambil dari cached_count.
+    """
+    column_name, descending = PRODUCT_SORTS[sort]
+    column = getattr(models.Product, column_name)
+    total = cached_count(count_key, query)
+
+    if descending:
+        query = query.order_by(column.desc(), models.Product.id.desc())
+    else:
+        query = query.order_by(column, models.Product.id)
+
+    position = decode_cursor(cursor, sort) if cursor else None
+    if position:
+        key = tuple_(column, models.Product.id)
+        query = query.filter(key < position if descending else key > position)
+    else:
+        page = max(1, page)
+        query = query.offset((page - 1) * per_page)
+
+    rows = query.limit(per_page + 1).all()
+    items = rows[:per_page]
+    has_next = len(rows) > per_page
+    next_cursor = encode_cursor(sort, items[-1]) if has_next else None
+
+    return ProductPage(items, sort, page, per_page, total, has_next,
+                       next_cursor, is_keyset=bool(position))
+
+
+class QueryCounter:
+    """Mencatat statement SQL yang dieksekusi selama blok count_queries"""
+
+    def __init__(self):
+        self.statements = []
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters,
+                               context, executemany):
+        self.statements.append(statement)
+
+
+@contextmanager
+def count_queries(engine=None):
+    """
+    Hitung query yang dikirim ke database di dalam blok.
+
+        with count_queries() as counter:
+            render_template('products.html', products=...)
+        print(counter.count)
+    """
+    engine = engine or db.engine
+    counter = QueryCounter()
+    event.listen(engine, 'before_cursor_execute',
+                 counter._before_cursor_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, 'before_cursor_execute',
+                     counter._before_cursor_execute)
+
+
+@contextmanager
+def assert_max_queries(max_queries, engine=None):
+    """Gagal (AssertionError) jika blok mengeksekusi lebih dari max_queries query"""
+    with count_queries(engine) as counter:
+        yield counter
+    if counter.count > max_queries:
+        statements = '\n'.join(f'  {i}. {s}' for i, s in enumerate(counter.statements, 1))
+        raise AssertionError(
+            f'Expected at most {max_queries} queries, got {counter.count}:\n{statements}')
@@ -463,13 +463,24 @@ class ChatConsumer(AsyncWebsocketConsumer):
 
     async def get_product_info(self, product_id):
         """Fetch product information from Flask API"""
+        try:
+            product_id = int(product_id)
+        except (TypeError, ValueError):
+            logger.warning(f"Invalid product ID: {product_id}")
+            return None
+        products = await self.get_products_info([product_id])
+        return products.get(product_id)
+
+    async def get_products_info(self, product_ids):
+        """Fetch many products in one request (/api/products?ids=...), keyed by id"""
         try:
             import aiohttp
 
+            ids = ','.join(str(int(pid)) for pid in product_ids)
             endpoints = [
-                f'http://127.0.0.1:5000/api/products/{product_id}',
-                f'http://localhost:5000/api/products/{product_id}',
-                f'http://0.0.0.0:5000/api/products/{product_id}'
+                f'http://127.0.0.1:5000/api/products?ids={ids}',
+                f'http://localhost:5000/api/products?ids={ids}',
+                f'http://0.0.0.0:5000/api/products?ids={ids}'
             ]
 
             timeout = aiohttp.ClientTimeout(total=5)
@@ -478,19 +489,19 @@ class ChatConsumer(AsyncWebsocketConsumer):
                     try:
                         async with session.get(endpoint) as response:
                             if response.status == 200:
-                                product_data = await response.json()
-                                logger.info(f"Product info fetched successfully from {endpoint}: {product_data}")
-                                return product_data
+                                data = await response.json()
+                                logger.info(f"Product info fetched successfully from {endpoint}")
+                                return {p['id']: p for p in data.get('products', [])}
                     except Exception as e:
                         logger.warning(f"Failed to fetch from {endpoint}: {e}")
                         continue
 
-            logger.warning(f"Failed to fetch product info for ID {product_id} from any endpoint.")
-            return None
+            logger.warning(f"Failed to fetch product info for IDs {ids} from any endpoint.")
+            return {}
 
         except Exception as e:
             logger.error(f"Error fetching product info: {e}", exc_info=True)
-            return None
+            return {}
 
     @database_sync_to_async
     def create_or_update_session(self):
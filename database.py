@@ -6,6 +6,18 @@ class Base(DeclarativeBase):
 
 db = SQLAlchemy(model_class=Base)
 
+
+def upsert_insert(connection, table):
+    """insert() dialek koneksi yang mendukung ON CONFLICT (PostgreSQL, SQLite)"""
+    dialect_name = connection.dialect.name
+    if dialect_name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect_name == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f'Upsert (ON CONFLICT) not supported on {dialect_name}')
+    return insert(table)
+
 def configure_database(app):
     """Configure database for PostgreSQL"""
     import os
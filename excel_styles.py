@@ -0,0 +1,186 @@
+"""
+Excel styles untuk Hurtrock Music Store
+NamedStyle bersama untuk semua exporter openpyxl (laporan penjualan, transaksi
+kasir, invoice). Style didaftarkan sekali per workbook dengan register_styles()
+dan setiap sel cukup merujuk nama style-nya, jadi objek Font/PatternFill/
+Border/Alignment tidak dibuat ulang per sel dan tabel style workbook hanya
+berisi satu entri per style.
+
+RowWriter menulis satu baris sekaligus (nilai + nama style per kolom, tinggi
+baris, merge) ke worksheet biasa maupun worksheet write-only.
+"""
+
+try:
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Alignment, Border, Font, NamedStyle, PatternFill, Side
+    from openpyxl.styles.fonts import DEFAULT_FONT
+    from openpyxl.utils import get_column_letter
+    from openpyxl.worksheet._write_only import WriteOnlyWorksheet
+    OPENPYXL_AVAILABLE = True
+except ImportError:
+    OPENPYXL_AVAILABLE = False
+
+XLSX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+BRAND_COLOR = 'FF6B35'
+RUPIAH_FORMAT = 'Rp #,##0'
+
+
+def _style_specs():
+    """nama -> kwargs NamedStyle"""
+    def arial(size, bold=False, italic=False, color='000000'):
+        return Font(name='Arial', size=size, bold=bold, italic=italic, color=color)
+
+    def solid(color):
+        return PatternFill(start_color=color, end_color=color, fill_type='solid')
+
+    thin = Side(style='thin')
+    border = Border(left=thin, right=thin, top=thin, bottom=thin)
+    white, light_gray = solid('FFFFFF'), solid('F5F5F5')
+    center = Alignment(horizontal='center', vertical='center')
+    center_wrap = Alignment(horizontal='center', vertical='center', wrap_text=True)
+    left = Alignment(horizontal='left')
+    left_middle = Alignment(horizontal='left', vertical='center')
+    left_wrap = Alignment(horizontal='left', wrap_text=True)
+    left_middle_wrap = Alignment(horizontal='left', vertical='center', wrap_text=True)
+    right = Alignment(horizontal='right')
+    right_middle = Alignment(horizontal='right', vertical='center')
+    middle = Alignment(horizontal='center')
+
+    return {
+        # Header dokumen
+        'hr_title': dict(font=arial(18, bold=True), fill=white, alignment=center),
+        'hr_subtitle': dict(font=arial(14, bold=True), fill=white, alignment=center),
+        'hr_info': dict(font=arial(9), alignment=center),
+        'hr_period': dict(font=arial(12, bold=True), fill=light_gray, alignment=center),
+        'hr_footer': dict(font=arial(9, italic=True, color='666666'), alignment=middle),
+
+        # Tabel laporan (putih / abu-abu muda)
+        'hr_table_header': dict(font=arial(11, bold=True), fill=light_gray,
+                                alignment=center_wrap, border=border),
+        'hr_table_header_small': dict(font=arial(10, bold=True), fill=light_gray,
+                                      alignment=center, border=border),
+        'hr_cell': dict(border=border),
+        'hr_cell_center': dict(alignment=middle, border=border),
+        'hr_cell_center_bold': dict(font=arial(10, bold=True), alignment=middle, border=border),
+        'hr_cell_text': dict(font=arial(10), alignment=left, border=border),
+        'hr_cell_note': dict(font=arial(9), alignment=left_wrap, border=border),
+        'hr_cell_money': dict(alignment=right, border=border),
+        'hr_cell_money_bold': dict(font=arial(10, bold=True), alignment=right, border=border),
+        'hr_section_title': dict(font=arial(12, bold=True), fill=light_gray,
+                                 alignment=middle, border=border),
+        'hr_subtotal': dict(font=arial(11, bold=True), fill=light_gray,
+                            alignment=right, border=border),
+        'hr_grand_total': dict(font=arial(12, bold=True), fill=light_gray,
+                               alignment=right, border=border),
+
+        # Invoice
+        'hr_invoice_store': dict(font=arial(20, bold=True), fill=white, alignment=center),
+        'hr_invoice_info': dict(font=arial(10), alignment=center),
+        'hr_invoice_title': dict(font=arial(16, bold=True), alignment=center),
+        'hr_invoice_section': dict(font=arial(12, bold=True), fill=light_gray, alignment=center),
+        'hr_invoice_label': dict(font=arial(10, bold=True)),
+        'hr_invoice_item_center': dict(alignment=center, border=border),
+        'hr_invoice_item_text': dict(alignment=left_middle, border=border),
+        'hr_invoice_item_money': dict(alignment=right_middle, border=border),
+        'hr_invoice_total_label': dict(font=arial(10, bold=True), alignment=right_middle),
+        'hr_invoice_total_value': dict(font=arial(10), alignment=right_middle),
+        'hr_invoice_grand_total': dict(font=arial(12, bold=True), fill=light_gray,
+                                       alignment=right_middle),
+        'hr_invoice_footer': dict(font=arial(10, italic=True, color=None), alignment=center),
+
+        # Laporan kasir (warna brand)
+        'hr_brand_title': dict(font=Font(size=18, bold=True, color=BRAND_COLOR), alignment=center),
+        'hr_brand_subtitle': dict(font=Font(size=14, bold=True), alignment=center),
+        'hr_brand_info': dict(font=Font(size=10), alignment=middle),
+        'hr_brand_header': dict(font=Font(bold=True, color='FFFFFF', size=11), fill=solid(BRAND_COLOR),
+                                alignment=center, border=border),
+        'hr_brand_cell': dict(alignment=left_middle_wrap, border=border),
+        'hr_brand_cell_money': dict(alignment=right, border=border, number_format=RUPIAH_FORMAT),
+        'hr_brand_total_label': dict(font=Font(bold=True, size=12), alignment=right),
+        'hr_brand_total': dict(font=Font(bold=True, size=12, color=BRAND_COLOR), fill=solid('FFF3E0'),
+                               alignment=right, number_format=RUPIAH_FORMAT),
+
+        # Laporan error import (baris gagal disorot merah)
+        'hr_import_header': dict(font=Font(color='FFFFFF', bold=True), fill=solid('4472C4')),
+        'hr_import_hint': dict(font=Font(italic=True, color='666666')),
+        'hr_error_cell': dict(fill=solid('FFC7CE'), border=border),
+        'hr_error_message': dict(font=Font(bold=True, color='9C0006'), fill=solid('FFC7CE'),
+                                 alignment=left_wrap, border=border),
+    }
+
+
+STYLE_SPECS = _style_specs() if OPENPYXL_AVAILABLE else {}
+
+
+def register_styles(workbook):
+    """Daftarkan semua NamedStyle ke workbook (sekali, sebelum sel ditulis)"""
+    existing = set(workbook.named_styles)
+    for name, spec in STYLE_SPECS.items():
+        if name not in existing:
+            # Tanpa font eksplisit: font default workbook (Calibri 11)
+            workbook.add_named_style(NamedStyle(name=name, **{'font': DEFAULT_FONT, **spec}))
+    return workbook
+
+
+def set_column_widths(worksheet, widths):
+    """Lebar kolom A, B, ...; worksheet write-only harus diset sebelum baris pertama"""
+    for i, width in enumerate(widths, 1):
+        worksheet.column_dimensions[get_column_letter(i)].width = width
+
+
+class RowWriter:
+    """
+    Menulis baris berurutan dengan nama style per kolom:
+
+        writer = RowWriter(ws)
+        writer.append(['No', 'Nama'], 'hr_table_header', height=35)
+        writer.append([1, 'Gitar'], ['hr_cell_center', 'hr_cell_text'])
+        writer.append(['TOTAL', None, 'Rp 1.000'], 'hr_subtotal', merges=[('A', 'B')])
+    """
+
+    def __init__(self, worksheet, start_row=1):
+        self.ws = worksheet
+        self.write_only = isinstance(worksheet, WriteOnlyWorksheet)
+        self.row = start_row - 1
+
+    def append(self, values=(), styles=None, height=None, merges=()):
+        """
+        Tulis satu baris. styles berupa satu nama style untuk semua sel atau
+        list per kolom (None = tanpa style); merges = [('A', 'C'), ...].
+        Dengan satu nama style, nilai None (sel di dalam merge) tidak diberi style.
+        """
+        self.row += 1
+        values = list(values)
+        if styles is None or isinstance(styles, str):
+            styles = [None if value is None else styles for value in values]
+        if height:
+            self.ws.row_dimensions[self.row].height = height
+
+        if self.write_only:
+            cells = []
+            for value, style in zip(values, styles):
+                if style is None:
+                    cells.append(value)
+                    continue
+                cell = WriteOnlyCell(self.ws, value=value)
+                cell.style = style
+                cells.append(cell)
+            for first, last in merges:
+                self.ws.merged_cells.add(f'{first}{self.row}:{last}{self.row}')
+            self.ws.append(cells)
+            return self.row
+
+        for column, (value, style) in enumerate(zip(values, styles), 1):
+            if value is None and style is None:
+                continue
+            cell = self.ws.cell(row=self.row, column=column, value=value)
+            if style:
+                cell.style = style
+        for first, last in merges:
+            self.ws.merge_cells(f'{first}{self.row}:{last}{self.row}')
+        return self.row
+
+    def skip(self, rows=1, height=None):
+        """Baris kosong"""
+        for _ in range(rows):
+            self.append(height=height)
@@ -0,0 +1,322 @@
+"""
+Export jobs untuk Hurtrock Music Store
+Antrian berbasis database (tabel export_jobs) untuk export dan laporan berat
+(laporan penjualan, transaksi kasir, invoice Excel) supaya tidak dikerjakan di
+thread request web dan tidak terkena timeout proxy.
+
+- Route meng-enqueue job lalu redirect ke halaman status yang mem-poll
+  /api/exports/<id> sampai selesai, kemudian file diunduh dari
+  /exports/<id>/download.
+- Worker mengambil job queued tertua (FOR UPDATE SKIP LOCKED di PostgreSQL
+  sehingga beberapa worker aman berjalan bersamaan), menjalankan handler dan
+  menulis file ke EXPORT_FOLDER. File dan job dihapus setelah EXPORT_FILE_TTL.
+- EXPORT_WORKER=thread (default) menjalankan worker sebagai daemon thread di
+  proses web, dimulai saat request pertama sehingga perintah CLI
+  (db upgrade, export-worker, ...) tidak ikut mengambil job;
+  EXPORT_WORKER=external untuk worker terpisah:
+
+      flask --app main export-worker
+
+Handler didaftarkan dengan @export_job_queue.handler(kind) dan menerima
+(params, fileobj, progress); progress(done, total) menyimpan persentase.
+Selama job running worker memperbarui export_jobs.updated_at (heartbeat);
+job yang heartbeat-nya berhenti lebih dari STALE_AFTER dikembalikan ke antrian.
+Handler mengembalikan download_name, atau (download_name, result) dengan
+result berupa dict ringkasan yang disimpan di export_jobs.result.
+
+File input job (mis. Excel import produk) disimpan dengan save_upload() di
+subfolder uploads dan ikut dibersihkan setelah EXPORT_FILE_TTL.
+"""
+
+import glob
+import json
+import os
+import re
+import socket
+import threading
+import time
+import uuid
+from datetime import timedelta
+
+from sqlalchemy import func, update
+
+import models
+from database import db
+
+JOB_STATUSES = ('queued', 'running', 'done', 'failed')
+DEFAULT_FILE_TTL = 24 * 3600  # detik
+POLL_INTERVAL = 2  # detik
+PROGRESS_INTERVAL = 1.0  # detik, jeda minimum antar update progress
+HEARTBEAT_INTERVAL = 60  # detik, worker memperbarui updated_at job yang running
+STALE_AFTER = timedelta(minutes=5)  # tanpa heartbeat selama ini: worker dianggap mati
+MAX_ATTEMPTS = 3
+CLEANUP_INTERVAL = 300  # detik
+UPLOAD_ID_PATTERN = re.compile(r'[0-9a-f]{32}')
+
+
+class JobProgress:
+    """
+    Callback progress(done, total) yang menyimpan persentase ke export_jobs.
+    Setiap penyimpanan juga memperbarui updated_at; beat() memperbarui
+    updated_at saja, dipanggil berkala oleh thread heartbeat worker.
+    """
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self.engine = db.engine  # juga dipakai dari thread heartbeat tanpa app context
+        self._percent = 0
+        self._saved_at = 0.0
+
+    def __call__(self, done, total):
+        if not total:
+            return
+        percent = min(99, int(done * 100 / total))
+        now = time.monotonic()
+        if percent <= self._percent or now - self._saved_at < PROGRESS_INTERVAL:
+            return
+        self._percent, self._saved_at = percent, now
+        self._save(progress=percent)
+
+    def beat(self):
+        self._save()
+
+    def _save(self, **values):
+        # Koneksi terpisah: session handler mungkin sedang membaca dengan yield_per
+        with self.engine.begin() as connection:
+            connection.execute(update(models.ExportJob).where(
+                models.ExportJob.id == self.job_id,
+                models.ExportJob.status == 'running',
+            ).values(updated_at=models.get_utc_time(), **values))
+
+
+class ExportJobQueue:
+    """Enqueue, worker dan pembersihan file export"""
+
+    def __init__(self):
+        self.app = None
+        self.directory = None
+        self.file_ttl = DEFAULT_FILE_TTL
+        self._handlers = {}
+        self._wake = threading.Event()
+        self._thread = None
+        self._thread_pid = None
+        self._thread_lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+        self.directory = app.config.get('EXPORT_FOLDER') or os.path.join(
+            app.instance_path, 'exports')
+        self.file_ttl = app.config.get('EXPORT_FILE_TTL', DEFAULT_FILE_TTL)
+        os.makedirs(self.upload_directory, exist_ok=True)
+
+        if app.config.get('EXPORT_WORKER', 'thread') == 'thread':
+            app.before_request(self._ensure_thread)
+
+    def _ensure_thread(self):
+        if self._thread_pid == os.getpid():
+            return
+        with self._thread_lock:
+            if self._thread_pid == os.getpid():
+                return
+            self._thread = threading.Thread(target=self._run_thread, name='export-worker',
+                                            daemon=True)
+            self._thread.start()
+            self._thread_pid = os.getpid()
+
+    @property
+    def upload_directory(self):
+        return os.path.join(self.directory, 'uploads')
+
+    def handler(self, kind, mimetype, extension):
+        """Daftarkan fungsi handler(params, fileobj, progress) -> download_name"""
+        def decorator(func):
+            self._handlers[kind] = (func, mimetype, extension)
+            return func
+        return decorator
+
+    def enqueue(self, kind, params, user_id):
+        if kind not in self._handlers:
+            raise ValueError(f'Unknown export job kind: {kind}')
+        job = models.ExportJob(kind=kind, params=json.dumps(params), user_id=user_id,
+                               mimetype=self._handlers[kind][1])
+        db.session.add(job)
+        db.session.commit()
+        self._wake.set()
+        return job
+
+    def save_upload(self, fileobj, extension):
+        """Simpan file input job, kembalikan upload_id"""
+        upload_id = uuid.uuid4().hex
+        with open(self.upload_path(upload_id, extension), 'wb') as output:
+            fileobj.seek(0)
+            while True:
+                chunk = fileobj.read(1024 * 1024)
+                if not chunk:
+                    break
+                output.write(chunk)
+        return upload_id
+
+    def upload_path(self, upload_id, extension):
+        """Path file upload; ValueError untuk upload_id yang tidak valid"""
+        if not UPLOAD_ID_PATTERN.fullmatch(upload_id or ''):
+            raise ValueError('Upload tidak valid')
+        return os.path.join(self.upload_directory, f'{upload_id}{extension}')
+
+    def remove_upload(self, upload_id):
+        """Hapus file upload beserta file turunannya (cache parse, dll.)"""
+        if UPLOAD_ID_PATTERN.fullmatch(upload_id or ''):
+            for path in glob.glob(os.path.join(self.upload_directory, f'{upload_id}*')):
+                os.remove(path)
+
+    # ===========================
+    # WORKER
+    # ===========================
+
+    def claim(self):
+        """Ambil job queued tertua dan tandai running, None jika antrian kosong"""
+        ExportJob = models.ExportJob
+        job = ExportJob.query.filter_by(status='queued').order_by(ExportJob.id)\
+            .with_for_update(skip_locked=True).first()
+        if job is None:
+            db.session.rollback()
+            return None
+        job.status = 'running'
+        job.started_at = job.updated_at = models.get_utc_time()
+        job.attempts += 1
+        job.progress = 0
+        db.session.commit()
+        return job
+
+    def run(self, job):
+        progress = JobProgress(job.id)
+        stop = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(progress, stop),
+                                     name=f'export-heartbeat-{job.id}', daemon=True)
+        heartbeat.start()
+        try:
+            return self._run_handler(job, progress)
+        finally:
+            stop.set()
+            heartbeat.join()
+
+    def _heartbeat(self, progress, stop):
+        """Perbarui updated_at selama handler berjalan, juga tanpa panggilan progress"""
+        while not stop.wait(HEARTBEAT_INTERVAL):
+            try:
+                progress.beat()
+            except Exception as e:
+                print(f"[WARNING] Export job {progress.job_id} heartbeat failed: {e}")
+
+    def _run_handler(self, job, progress):
+        handler, _, extension = self._handlers[job.kind]
+        path = os.path.join(self.directory, f'{job.id}-{uuid.uuid4().hex}{extension}')
+        partial = path + '.part'
+        try:
+            with open(partial, 'wb') as fileobj:
+                download_name = handler(job.params_dict, fileobj, progress)
+            os.replace(partial, path)
+            result = None
+            if isinstance(download_name, tuple):
+                download_name, result = download_name
+        except Exception as e:
+            db.session.rollback()
+            if os.path.exists(partial):
+                os.remove(partial)
+            print(f"[ERROR] Export job {job.id} ({job.kind}) failed: {e}")
+            job = db.session.get(models.ExportJob, job.id)
+            job.status = 'failed'
+            job.message = str(e)
+            job.finished_at = models.get_utc_time()
+            db.session.commit()
+            return job
+
+        job = db.session.get(models.ExportJob, job.id)
+        job.status = 'done'
+        job.progress = 100
+        job.file_path = path
+        job.download_name = download_name
+        job.result = json.dumps(result) if result is not None else None
+        job.finished_at = models.get_utc_time()
+        job.expires_at = job.finished_at + timedelta(seconds=self.file_ttl)
+        db.session.commit()
+        print(f"[OK] Export job {job.id} ({job.kind}) finished: {download_name}")
+        return job
+
+    def requeue_stale(self):
+        """Job running tanpa heartbeat (worker mati) dikembalikan ke antrian (atau gagal)"""
+        ExportJob = models.ExportJob
+        cutoff = models.get_utc_time() - STALE_AFTER
+        # updated_at kosong: job yang di-claim sebelum kolom heartbeat ada
+        stale = ExportJob.query.filter(
+            ExportJob.status == 'running',
+            func.coalesce(ExportJob.updated_at, ExportJob.started_at) < cutoff).all()
+        for job in stale:
+            if job.attempts >= MAX_ATTEMPTS:
+                job.status = 'failed'
+                job.message = 'Worker berhenti saat memproses export'
+                job.finished_at = models.get_utc_time()
+            else:
+                job.status = 'queued'
+        db.session.commit()
+        return len(stale)
+
+    def purge_expired(self):
+        """Hapus file dan job yang sudah melewati expires_at (atau gagal > TTL)"""
+        ExportJob = models.ExportJob
+        now = models.get_utc_time()
+        expired = ExportJob.query.filter(db.or_(
+            ExportJob.expires_at < now,
+            db.and_(ExportJob.status == 'failed',
+                    ExportJob.finished_at < now - timedelta(seconds=self.file_ttl)),
+        )).all()
+        for job in expired:
+            if job.file_path and os.path.exists(job.file_path):
+                os.remove(job.file_path)
+            db.session.delete(job)
+        db.session.commit()
+
+        # Upload yang tidak pernah diproses (mis. hanya divalidasi)
+        cutoff = time.time() - self.file_ttl
+        for entry in os.scandir(self.upload_directory):
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+        return len(expired)
+
+    def work(self, once=False):
+        """Loop worker; once=True berhenti saat antrian kosong"""
+        worker = f'{socket.gethostname()}:{os.getpid()}'
+        print(f"[INFO] Export worker {worker} started")
+        last_cleanup = 0.0
+        last_error = None
+        while True:
+            try:
+                if time.monotonic() - last_cleanup > CLEANUP_INTERVAL:
+                    self.requeue_stale()
+                    self.purge_expired()
+                    last_cleanup = time.monotonic()
+                job = self.claim()
+                last_error = None
+            except Exception as e:
+                db.session.rollback()
+                # Mis. tabel belum dibuat saat migrasi: cukup dicetak sekali
+                if str(e) != last_error:
+                    print(f"[ERROR] Export worker failed to poll queue: {e}")
+                    last_error = str(e)
+                job = None
+
+            if job is not None:
+                self.run(job)
+                db.session.remove()
+                continue
+            db.session.remove()
+            if once:
+                return
+            self._wake.wait(timeout=POLL_INTERVAL)
+            self._wake.clear()
+
+    def _run_thread(self):
+        with self.app.app_context():
+            self.work()
+
+
+export_job_queue = ExportJobQueue()
@@ -0,0 +1,181 @@
+"""
+Image resize cache untuk Hurtrock Music Store
+Thumbnail on-demand untuk gambar yang sudah ada (produk_images dan
+uploads/medias_sends) tanpa upload ulang:
+
+    /img/<w>x<h>/<sumber>/<file>    mis. /img/400x400/produk_images/abc.jpg
+
+Gambar diperkecil agar muat di kotak w x h (0 = tidak dibatasi, tidak pernah
+diperbesar) saat pertama diminta. Hasilnya disimpan di disk dengan nama hash
+dari isi permintaan (path sumber + ukuran + mtime file sumber + w x h), jadi
+file sumber yang berubah otomatis mendapat entri baru dan entri lama hilang
+lewat eviction. Request berikutnya langsung mengirim file cache.
+
+Ukuran cache dibatasi IMAGE_CACHE_MAX_BYTES: entri yang paling lama tidak
+dipakai (mtime, di-touch saat hit) dihapus sampai cache kembali di bawah
+EVICT_TARGET dari batas.
+"""
+
+import hashlib
+import io
+import os
+import threading
+import time
+
+from PIL import ExifTags, Image, ImageOps
+
+from image_pipeline import write_atomic
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+# Ukuran yang boleh diminta; dibatasi agar URL acak tidak memenuhi cache
+RESIZE_DIMENSIONS = (0, 50, 100, 150, 200, 300, 400, 600, 800, 1200, 1600)
+RESIZE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp', '.gif')
+EVICT_TARGET = 0.9
+TOUCH_INTERVAL = 3600  # detik, mtime entri cache diperbarui paling sering sekali per jam
+SAVE_OPTIONS = {
+    'JPEG': {'quality': 85, 'optimize': True},
+    'WEBP': {'quality': 80, 'method': 4},
+    'PNG': {'optimize': True},
+}
+
+
+class ImageResizeCache:
+    """Resize on-demand + cache disk LRU berbatas ukuran"""
+
+    def __init__(self):
+        self.app = None
+        self.directory = None
+        self.max_bytes = DEFAULT_MAX_BYTES
+        self.sources = {}
+        self._size = None  # total byte cache, dihitung saat pertama dipakai
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+        self.directory = app.config.get('IMAGE_CACHE_FOLDER') or os.path.join(
+            app.instance_path, 'image_cache')
+        self.max_bytes = app.config.get('IMAGE_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES)
+        # nama sumber di URL -> folder
+        self.sources = {
+            'produk_images': os.path.join(app.root_path, app.config['UPLOAD_FOLDER']),
+            'medias_sends': os.path.join(app.root_path, app.config['UPLOADS_MEDIA_FOLDER']),
+        }
+        os.makedirs(self.directory, exist_ok=True)
+
+    def source_path(self, source, filename):
+        """Path file sumber, None jika sumber/file tidak valid atau bukan gambar"""
+        root = self.sources.get(source)
+        if root is None or not filename.lower().endswith(RESIZE_EXTENSIONS):
+            return None
+        root = os.path.realpath(root)
+        path = os.path.realpath(os.path.join(root, filename))
+        if not path.startswith(root + os.sep) or not os.path.isfile(path):
+            return None
+        return path
+
+    def cache_key(self, path, width, height):
+        stat = os.stat(path)
+        identity = f'{path}:{stat.st_size}:{stat.st_mtime_ns}:{width}x{height}'
+        return hashlib.sha256(identity.encode()).hexdigest()
+
+    def get(self, source, filename, width, height):
+        """
+        (path file yang dikirim, etag), atau None jika tidak ditemukan.
+        ValueError untuk ukuran yang tidak diizinkan.
+        """
+        if width not in RESIZE_DIMENSIONS or height not in RESIZE_DIMENSIONS:
+            raise ValueError('Ukuran gambar tidak diizinkan')
+        path = self.source_path(source, filename)
+        if path is None:
+            return None
+
+        key = self.cache_key(path, width, height)
+        extension = os.path.splitext(filename)[1].lower()
+        cached = os.path.join(self.directory, key[:2], key + extension)
+        try:
+            stat = os.stat(cached)
+            if time.time() - stat.st_mtime > TOUCH_INTERVAL:
+                os.utime(cached)  # tandai baru dipakai untuk LRU
+            return cached, key
+        except FileNotFoundError:
+            pass
+
+        data = self.resize(path, width, height)
+        if data is None:
+            # Tidak perlu diperkecil (sudah muat, atau GIF animasi): kirim aslinya
+            return path, key
+        os.makedirs(os.path.dirname(cached), exist_ok=True)
+        write_atomic(cached, data)
+        self._added(len(data))
+        return cached, key
+
+    def resize(self, path, width, height):
+        """Bytes gambar yang sudah diperkecil, None jika gambar asli dipakai"""
+        with Image.open(path) as img:
+            if getattr(img, 'is_animated', False):
+                return None
+            # Foto kamera/HP dengan EXIF orientation 5-8 tersimpan dengan sumbu
+            # tertukar; kotak dan cek "sudah muat" memakai ukuran yang tampil
+            swapped = img.getexif().get(ExifTags.Base.Orientation, 1) in (5, 6, 7, 8)
+            shown = (img.height, img.width) if swapped else img.size
+            box = (width or shown[0], height or shown[1])
+            if shown[0] <= box[0] and shown[1] <= box[1]:
+                return None
+            save_format = img.format if img.format in SAVE_OPTIONS else 'PNG'
+            # JPEG: decode langsung di skala 1/2, 1/4, 1/8 (kotak di sumbu tersimpan)
+            img.draft('RGB', (box[1], box[0]) if swapped else box)
+            # EXIF tidak ikut disimpan, jadi rotasi kamera diterapkan ke piksel
+            img = ImageOps.exif_transpose(img)
+            if save_format == 'JPEG' and img.mode not in ('RGB', 'L'):
+                img = img.convert('RGB')
+            img.thumbnail(box, Image.Resampling.LANCZOS)
+            buffer = io.BytesIO()
+            img.save(buffer, save_format, **SAVE_OPTIONS[save_format])
+            return buffer.getvalue()
+
+    # ===========================
+    # EVICTION
+    # ===========================
+
+    def _entries(self):
+        for shard in os.scandir(self.directory):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.is_file() and not entry.name.endswith('.part'):
+                    yield entry
+
+    def _added(self, size):
+        with self._lock:
+            if self._size is None:
+                self._size = sum(entry.stat().st_size for entry in self._entries())
+            else:
+                self._size += size
+            if self._size > self.max_bytes:
+                self._size = self.evict()
+
+    def evict(self, target=None):
+        """Hapus entri yang paling lama tidak dipakai sampai <= target; kembalikan ukuran cache"""
+        target = self.max_bytes * EVICT_TARGET if target is None else target
+        entries = sorted(((entry.stat().st_mtime, entry.stat().st_size, entry.path)
+                          for entry in self._entries()))
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass  # sudah dihapus proses lain
+            total -= size
+            removed += 1
+        if removed:
+            print(f"[INFO] Image cache evicted {removed} files, {total // 1024} KB left")
+        return total
+
+    def clear(self):
+        return self.evict(target=0)
+
+
+image_resize_cache = ImageResizeCache()
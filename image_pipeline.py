@@ -0,0 +1,388 @@
+"""
+Image pipeline untuk Hurtrock Music Store
+Memproses gambar yang baru diupload (kompresi + orientasi) di process pool
+sehingga produk dengan banyak gambar tidak diproses satu per satu di thread
+request. Setiap gambar dibuka sekali: orientasi dibaca dari ukuran di header
+(Image.open belum men-decode piksel) lalu objek yang sama dipakai untuk
+kompresi.
+
+    results = image_pipeline.process(paths)  # urutan sama dengan paths
+
+Kompresi (encode_to_target) mencari kualitas/dimensi yang muat di batas
+ukuran dengan encode ke BytesIO, lalu file ditulis sekali secara atomik.
+Lihat benchmark_images.py untuk perbandingan dengan cara lama.
+
+Untuk foto produk (variants=True) dibuat juga turunan responsif: lebar
+VARIANT_WIDTHS dalam WebP (dan AVIF jika Pillow mendukung) di subfolder
+variants/. Manifest hasilnya disimpan di ProductImage.variants dan dipakai
+picture_sources() untuk membuat <source srcset> di template.
+
+IMAGE_WORKERS mengatur jumlah proses (default: jumlah CPU, maksimal 4);
+dengan IMAGE_WORKERS 0 atau 1 gambar diproses di proses web. Pool memakai
+start method fork (spawn/forkserver akan mengimpor ulang main.py beserta
+seluruh setup aplikasi). Pool hanya dibuat di proses yang melayani request,
+sekali per proses, di awal request pertama sebelum thread background (export
+worker, sitemap) dimulai: fork dari proses yang thread lainnya memegang lock
+bisa membuat worker pool deadlock. Perintah CLI, export worker dan proses
+induk reloader tidak membuat pool. Dengan gunicorn, hook post_worker_init
+yang memanggil image_pipeline.start() membuat pool sebelum thread worker
+gthread berjalan. Proses tanpa pool (platform tanpa fork, CLI, pool gagal/macet)
+memproses gambar di proses web.
+"""
+
+import io
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import NamedTuple
+
+from markupsafe import Markup, escape
+from PIL import Image, ImageOps, features
+
+DEFAULT_MAX_SIZE_MB = 1
+DEFAULT_WORKERS = min(4, os.cpu_count() or 1)
+PROCESS_TIMEOUT = 120  # detik untuk satu batch gambar
+MAX_QUALITY = 85
+MIN_QUALITY = 60  # di bawah ini foto produk mulai terlihat blocky; perkecil dimensi
+MIN_DIMENSION = 800  # sisi terpanjang minimum saat memperkecil dimensi
+MAX_RESIZES = 3
+RESIZE_MARGIN = 0.95  # prediksi skala sedikit di bawah rasio ukuran
+VARIANT_WIDTHS = (200, 400, 800, 1600)
+VARIANT_FOLDER = 'variants'
+# Urutan = prioritas <source>; AVIF butuh Pillow dengan plugin AVIF (>= 11.2)
+VARIANT_FORMATS = ('avif', 'webp') if features.check('avif') else ('webp',)
+VARIANT_OPTIONS = {
+    'avif': {'quality': 60, 'speed': 8},
+    'webp': {'quality': 80, 'method': 4},
+}
+VARIANT_MIMETYPES = {'avif': 'image/avif', 'webp': 'image/webp'}
+ORIENTATION_PRIORITY = {'landscape': 0, 'square': 1, 'portrait': 2, 'unknown': 3}
+
+
+class ProcessedImage(NamedTuple):
+    path: str
+    orientation: str
+    width: int = 0
+    height: int = 0
+    error: str = None
+    variants: dict = None  # manifest generate_variants
+
+
+def orientation_for(width, height):
+    if width > height:
+        return 'landscape'
+    if height > width:
+        return 'portrait'
+    return 'square'
+
+
+def get_image_orientation(image_path):
+    """Determine if image is landscape or portrait (hanya membaca header)"""
+    try:
+        with Image.open(image_path) as img:
+            return orientation_for(*img.size)
+    except Exception as e:
+        print(f"[ERROR] Could not determine orientation for {image_path}: {e}")
+        return 'unknown'
+
+
+def _save_format(img):
+    """(format, opsi save) untuk format asli gambar"""
+    if img.format in ('JPEG', 'JPG'):
+        return 'JPEG', {'optimize': True}
+    if img.format == 'WEBP':
+        return 'WEBP', {'method': 4}
+    # PNG, dan format lain dikonversi ke PNG agar kualitas terjaga
+    return 'PNG', {'optimize': True}
+
+
+def _encode(img, save_format, options, quality=None):
+    buffer = io.BytesIO()
+    if quality is not None:
+        options = {**options, 'quality': quality}
+    img.save(buffer, save_format, **options)
+    return buffer.getvalue()
+
+
+def _encode_lossy(img, save_format, options, max_bytes):
+    """
+    Binary search kualitas tertinggi (MIN_QUALITY..MAX_QUALITY) yang muat di
+    max_bytes. Mengembalikan (data, muat); data = hasil terkecil jika tidak muat.
+    """
+    data = _encode(img, save_format, options, MAX_QUALITY)
+    if len(data) <= max_bytes:
+        return data, True
+    smallest = _encode(img, save_format, options, MIN_QUALITY)
+    if len(smallest) > max_bytes:
+        return smallest, False
+    low, high, best = MIN_QUALITY + 1, MAX_QUALITY - 1, smallest
+    while low <= high:
+        quality = (low + high) // 2
+        data = _encode(img, save_format, options, quality)
+        if len(data) <= max_bytes:
+            best, low = data, quality + 1
+        else:
+            high = quality - 1
+    return best, True
+
+
+def encode_to_target(img, max_bytes):
+    """
+    Encode img ke format aslinya di memori (BytesIO) dengan ukuran <= max_bytes.
+    Format lossy (JPEG/WebP) mencari kualitas dengan binary search; jika pada
+    MIN_QUALITY masih terlalu besar, atau untuk PNG, dimensi diperkecil dengan
+    skala yang diprediksi dari rasio ukuran (jumlah byte kira-kira sebanding
+    jumlah piksel), tidak lebih kecil dari MIN_DIMENSION.
+    Mengembalikan (data, format) dengan data terkecil yang bisa dicapai.
+    """
+    save_format, options = _save_format(img)
+    img.load()
+    if save_format == 'JPEG' and img.mode not in ('RGB', 'L', 'CMYK'):
+        img = img.convert('RGB')
+
+    for _ in range(MAX_RESIZES + 1):
+        if save_format == 'PNG':
+            data = _encode(img, save_format, options)
+            fits = len(data) <= max_bytes
+        else:
+            data, fits = _encode_lossy(img, save_format, options, max_bytes)
+        width, height = img.size
+        if fits or max(width, height) <= MIN_DIMENSION:
+            break
+        scale = max((max_bytes / len(data)) ** 0.5 * RESIZE_MARGIN,
+                    MIN_DIMENSION / max(width, height))
+        img = img.resize((max(1, int(width * scale)), max(1, int(height * scale))),
+                         Image.Resampling.LANCZOS)
+    return data, save_format
+
+
+def write_atomic(path, data):
+    """Tulis file lewat file sementara + os.replace (tidak pernah setengah jadi)"""
+    directory = os.path.dirname(path) or '.'
+    fd, partial = tempfile.mkstemp(dir=directory, prefix='.', suffix='.part')
+    try:
+        with os.fdopen(fd, 'wb') as output:
+            output.write(data)
+        os.replace(partial, path)
+    except BaseException:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+
+
+def _compress(img, image_path, max_size_mb):
+    """Kompresi img (sudah dibuka dari image_path) sampai di bawah max_size_mb"""
+    max_bytes = int(max_size_mb * 1024 * 1024)
+
+    # Check if file is already under size limit
+    if os.path.getsize(image_path) <= max_bytes:
+        return image_path  # No compression needed
+
+    # Don't compress animated GIFs - they lose animation
+    if img.format == 'GIF' and getattr(img, 'is_animated', False):
+        return image_path  # Keep animated GIFs as-is
+
+    data, _ = encode_to_target(img, max_bytes)
+    # Satu kali tulis ke disk; file asli tetap dipakai jika hasilnya tidak lebih kecil
+    if len(data) < os.path.getsize(image_path):
+        write_atomic(image_path, data)
+    return image_path
+
+
+def compress_image(image_path, max_size_mb=DEFAULT_MAX_SIZE_MB):
+    """Compress image to be under max_size_mb while preserving original format"""
+    try:
+        with Image.open(image_path) as img:
+            return _compress(img, image_path, max_size_mb)
+    except Exception as e:
+        print(f"[ERROR] Failed to compress image {image_path}: {e}")
+        return image_path
+
+
+def variant_widths(width):
+    """Lebar turunan untuk gambar selebar width (tidak pernah diperbesar)"""
+    widths = [w for w in VARIANT_WIDTHS if w < width]
+    # Lebar asli ikut sebagai turunan terbesar selama tidak melebihi VARIANT_WIDTHS[-1]
+    if width <= VARIANT_WIDTHS[-1]:
+        widths.append(width)
+    return widths
+
+
+def variant_name(image_path, width, fmt):
+    """Path turunan relatif terhadap folder gambar asli"""
+    stem = os.path.splitext(os.path.basename(image_path))[0]
+    return f'{VARIANT_FOLDER}/{stem}-{width}.{fmt}'
+
+
+def generate_variants(img, image_path):
+    """
+    Tulis turunan VARIANT_WIDTHS x VARIANT_FORMATS dari img (sudah dibuka dari
+    image_path). Mengembalikan manifest:
+    {'width': .., 'height': .., 'formats': {'webp': {'200': 'variants/x-200.webp'}}}
+    """
+    # Turunan tidak membawa EXIF, jadi rotasi kamera diterapkan ke piksel
+    img = ImageOps.exif_transpose(img)
+    img = img.convert('RGBA' if 'A' in img.getbands() or 'transparency' in img.info
+                      else 'RGB')
+    directory = os.path.dirname(image_path)
+    os.makedirs(os.path.join(directory, VARIANT_FOLDER), exist_ok=True)
+
+    formats = {fmt: {} for fmt in VARIANT_FORMATS}
+    # Dari lebar terbesar ke terkecil: setiap turunan di-resize dari turunan sebelumnya
+    source = img
+    for width in reversed(variant_widths(img.width)):
+        height = max(1, round(img.height * width / img.width))
+        if source.size != (width, height):
+            source = source.resize((width, height), Image.Resampling.LANCZOS)
+        for fmt in VARIANT_FORMATS:
+            name = variant_name(image_path, width, fmt)
+            buffer = io.BytesIO()
+            source.save(buffer, fmt.upper(), **VARIANT_OPTIONS[fmt])
+            write_atomic(os.path.join(directory, name), buffer.getvalue())
+            formats[fmt][str(width)] = name
+    return {'width': img.width, 'height': img.height, 'formats': formats}
+
+
+def remove_variants(image_path, manifest):
+    """Hapus file turunan milik gambar image_path"""
+    directory = os.path.dirname(image_path)
+    for names in (manifest or {}).get('formats', {}).values():
+        for name in names.values():
+            path = os.path.join(directory, name)
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def variant_srcset(image_url, manifest, fmt):
+    """'url 200w, url 400w, ...' untuk satu format, '' jika tidak ada"""
+    base = image_url.rsplit('/', 1)[0]
+    names = (manifest or {}).get('formats', {}).get(fmt, {})
+    return ', '.join(f'{base}/{name} {width}w'
+                     for width, name in sorted(names.items(), key=lambda item: int(item[0])))
+
+
+def picture_sources(image_url, manifest, sizes):
+    """Elemen <source> (AVIF, WebP) untuk dipasang di dalam <picture> sebelum <img>"""
+    if not image_url or not manifest:
+        return Markup('')
+    sources = []
+    for fmt in VARIANT_FORMATS:
+        srcset = variant_srcset(image_url, manifest, fmt)
+        if srcset:
+            sources.append(f'<source type="{VARIANT_MIMETYPES[fmt]}" '
+                           f'srcset="{escape(srcset)}" sizes="{escape(sizes)}">')
+    return Markup(''.join(sources))
+
+
+def process_image(image_path, max_size_mb=DEFAULT_MAX_SIZE_MB, variants=False):
+    """
+    Orientasi + kompresi (+ turunan responsif jika variants) satu gambar;
+    dijalankan di process pool. max_size_mb=None melewati kompresi.
+    """
+    try:
+        with Image.open(image_path) as img:
+            width, height = img.size
+            orientation = orientation_for(width, height)
+            if max_size_mb is not None:
+                try:
+                    _compress(img, image_path, max_size_mb)
+                except Exception as e:
+                    # Gambar asli tetap dipakai seperti compress_image
+                    print(f"[ERROR] Failed to compress image {image_path}: {e}")
+            manifest = None
+            if variants:
+                try:
+                    manifest = generate_variants(img, image_path)
+                except Exception as e:
+                    # Tanpa turunan template memakai gambar asli
+                    print(f"[ERROR] Failed to generate variants for {image_path}: {e}")
+            return ProcessedImage(image_path, orientation, width, height, variants=manifest)
+    except Exception as e:
+        return ProcessedImage(image_path, 'unknown', error=str(e))
+
+
+class ImagePipeline:
+    """Process pool untuk pemrosesan gambar upload"""
+
+    def __init__(self):
+        self.workers = DEFAULT_WORKERS
+        self._executor = None
+        self._pid = None
+        self._started_pid = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.workers = int(app.config.get('IMAGE_WORKERS', DEFAULT_WORKERS))
+        if 'fork' not in multiprocessing.get_all_start_methods():
+            self.workers = 0
+        # Didaftarkan sebelum before_request yang memulai thread background
+        app.before_request(self.start)
+
+    def start(self):
+        """
+        Buat pool dan fork semua proses worker-nya, sekali per proses (request
+        pertama, atau hook post_worker_init gunicorn). Pool yang di-reset setelah gagal
+        tidak dibuat ulang: saat itu thread lain sudah berjalan.
+        """
+        if self.workers <= 1 or self._started_pid == os.getpid():
+            return
+        with self._lock:
+            if self._started_pid == os.getpid():
+                return
+            self._started_pid = os.getpid()
+            executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context('fork'))
+            # Dengan fork semua proses worker dibuat saat submit pertama
+            executor.submit(os.getpid).result()
+            self._executor, self._pid = executor, os.getpid()
+            print(f"[INFO] Image process pool started with {self.workers} workers")
+
+    def _get_executor(self):
+        """Pool proses ini, None jika belum dibuat dengan start() atau sudah di-reset"""
+        with self._lock:
+            # Pool milik proses induk tidak bisa dipakai setelah fork (gunicorn --preload)
+            if self._executor is None or self._pid != os.getpid():
+                return None
+            return self._executor
+
+    def _reset(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+            if executor is None or self._pid != os.getpid():
+                return
+            # shutdown(wait=False) tidak menghentikan worker yang macet
+            for process in list((executor._processes or {}).values()):
+                process.terminate()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def process(self, paths, max_size_mb=DEFAULT_MAX_SIZE_MB, variants=False):
+        """ProcessedImage untuk setiap path, dengan urutan yang sama"""
+        paths = list(paths)
+        executor = self._get_executor() if len(paths) > 1 else None
+        if executor is None:
+            return [process_image(path, max_size_mb, variants) for path in paths]
+        try:
+            return list(executor.map(
+                process_image, paths, [max_size_mb] * len(paths), [variants] * len(paths),
+                timeout=PROCESS_TIMEOUT))
+        except (BrokenProcessPool, TimeoutError) as e:
+            # Worker mati (mis. kehabisan memori) atau macet. Pool tidak dibuat ulang
+            # dari thread request (lihat start()); proses ini lanjut tanpa pool
+            print(f"[ERROR] Image process pool failed ({type(e).__name__}), "
+                  f"processing inline until restart: {e}")
+            self._reset()
+            return [process_image(path, max_size_mb, variants) for path in paths]
+
+    def shutdown(self):
+        self._reset()
+
+
+def sort_by_orientation(images, key=lambda image: image.orientation):
+    """Landscape dulu, lalu square/portrait (urutan tampilan galeri produk)"""
+    return sorted(images, key=lambda image: ORIENTATION_PRIORITY.get(key(image), 3))
+
+
+image_pipeline = ImagePipeline()
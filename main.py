@@ -1,6 +1,6 @@
 import os
 import requests
-from flask import Flask, render_template, Response, request, redirect, url_for, jsonify, flash, session, send_file, send_from_directory
+from flask import Flask, render_template, Response, request, redirect, url_for, jsonify, flash, session, send_file, send_from_directory, abort
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
 from flask_migrate import Migrate
 from flask_wtf import FlaskForm
@@ -8,13 +8,14 @@ from flask_wtf.csrf import CSRFProtect
 from flask_cors import CORS
 from werkzeug.security import generate_password_hash, check_password_hash
 from werkzeug.utils import secure_filename
-from PIL import Image
+from werkzeug.exceptions import NotFound
 import stripe
 from datetime import datetime, timedelta
 from database import db
 from decimal import Decimal
 from models import get_utc_time, Product
 import uuid
+import hashlib
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import letter
 from reportlab.lib import colors
@@ -29,6 +30,7 @@ import midtransclient
 import json
 import jwt
 import sys  # Import sys to check command line arguments
+import click
 
 # Import Xendit and DOKU libraries
 try:
@@ -94,6 +96,27 @@ app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
     "pool_recycle": 300,
     "pool_pre_ping": True,
 }
+# Backend pencarian produk: 'memory' (in-process index) atau 'postgres' (ILIKE + index pg_trgm)
+app.config['SEARCH_BACKEND'] = os.environ.get('SEARCH_BACKEND', 'memory')
+# Page cache storefront: 'memory' (LRU per proses) atau 'redis' (PAGE_CACHE_REDIS_URL)
+app.config['PAGE_CACHE_ENABLED'] = os.environ.get('PAGE_CACHE_ENABLED', 'true').lower() == 'true'
+app.config['PAGE_CACHE_BACKEND'] = os.environ.get('PAGE_CACHE_BACKEND', 'memory')
+app.config['PAGE_CACHE_REDIS_URL'] = os.environ.get('PAGE_CACHE_REDIS_URL', '')
+app.config['PAGE_CACHE_TIMEOUT'] = int(os.environ.get('PAGE_CACHE_TIMEOUT', 300))
+# URL publik untuk sitemap.xml / product-feed.xml (dibangun di background)
+app.config['SITE_URL'] = os.environ.get('SITE_URL', 'https://www.hurtrock-store.com')
+# Export job (laporan Excel): worker 'thread' di proses web atau 'external' (flask --app main export-worker)
+app.config['EXPORT_WORKER'] = os.environ.get('EXPORT_WORKER', 'thread')
+app.config['EXPORT_FOLDER'] = os.environ.get('EXPORT_FOLDER', '')
+app.config['EXPORT_FILE_TTL'] = int(os.environ.get('EXPORT_FILE_TTL', 24 * 3600))
+# Proses untuk kompresi gambar upload produk, 0/1 = di proses web
+app.config['IMAGE_WORKERS'] = int(os.environ.get('IMAGE_WORKERS', min(4, os.cpu_count() or 1)))
+# Cache thumbnail on-demand /img/<w>x<h>/... (kosong = instance/image_cache)
+app.config['IMAGE_CACHE_FOLDER'] = os.environ.get('IMAGE_CACHE_FOLDER', '')
+app.config['IMAGE_CACHE_MAX_BYTES'] = int(os.environ.get('IMAGE_CACHE_MAX_MB', 512)) * 1024 * 1024
+# Pengiriman file media lewat web server: '' (Flask), 'nginx' (X-Accel-Redirect), 'sendfile' (X-Sendfile)
+app.config['MEDIA_OFFLOAD'] = os.environ.get('MEDIA_OFFLOAD', '').lower()
+app.config['MEDIA_ACCEL_PREFIX'] = os.environ.get('MEDIA_ACCEL_PREFIX', '/_protected')
 
 # Security configuration - Universal deployment ready
 is_production = os.environ.get('IS_PRODUCTION', 'false').lower() == 'true'
@@ -123,12 +146,42 @@ migrate = Migrate(app, db)
 csrf = CSRFProtect(app)
 
 
+# Product card: 4 kolom (lg), 3 (md), 2 (sm), 1 (mobile)
+LISTING_IMAGE_SIZES = ('(min-width: 992px) 25vw, (min-width: 768px) 33vw, '
+                       '(min-width: 576px) 50vw, 100vw')
+
+
+@app.template_global()
+def image_sources(image, sizes=LISTING_IMAGE_SIZES):
+    """<source> AVIF/WebP untuk ProductImage, dipakai di dalam <picture> sebelum <img>"""
+    if image is None:
+        return picture_sources(None, None, sizes)
+    return picture_sources(image.image_url, image.variant_manifest, sizes)
+
+
+# URL gambar yang bisa di-resize lewat /img/<w>x<h>/<sumber>/<file>
+RESIZABLE_IMAGE_PREFIXES = {
+    '/static/public/produk_images/': 'produk_images',
+    '/uploads/medias_sends/': 'medias_sends',
+}
+
+
+@app.template_global()
+def resized_image_url(url, width, height=0):
+    """URL thumbnail /img untuk gambar produk/chat; URL lain dikembalikan apa adanya"""
+    for prefix, source in RESIZABLE_IMAGE_PREFIXES.items():
+        if url and url.startswith(prefix):
+            return url_for('resized_image', width=width, height=height, source=source,
+                           filename=url[len(prefix):])
+    return url
+
+
 # Context processor to make store profile available in all templates
 @app.context_processor
 def inject_store_profile():
     """Make store profile available to all templates"""
     try:
-        profile = models.StoreProfile.get_active_profile()
+        profile = models.StoreProfile.get_cached_profile()
         return dict(store_profile=profile)
     except Exception as e:
         print(f"[ERROR] Failed to inject store profile: {e}")
@@ -187,93 +240,6 @@ def is_video_file(filename):
         '.', 1)[1].lower() in ALLOWED_VIDEO_EXTENSIONS
 
 
-def get_image_orientation(image_path):
-    """Determine if image is landscape or portrait"""
-    try:
-        img = Image.open(image_path)
-        width, height = img.size
-        if width > height:
-            return 'landscape'
-        elif height > width:
-            return 'portrait'
-        else:
-            return 'square'
-    except Exception as e:
-        print(f"[ERROR] Could not determine orientation for {image_path}: {e}")
-        return 'unknown'
-
-
-def compress_image(image_path, max_size_mb=1):
-    """Compress image to be under max_size_mb while preserving original format"""
-    try:
-        img = Image.open(image_path)
-        original_format = img.format
-
-        # Check if file is already under size limit
-        file_size_mb = os.path.getsize(image_path) / (1024 * 1024)
-        if file_size_mb <= max_size_mb:
-            return image_path  # No compression needed
-
-        # Don't compress animated GIFs - they lose animation
-        if original_format == 'GIF' and getattr(img, 'is_animated', False):
-            return image_path  # Keep animated GIFs as-is
-
-        # Set format-specific parameters
-        save_kwargs = {'optimize': True}
-        quality = 85
-
-        if original_format in ('JPEG', 'JPG'):
-            save_format = 'JPEG'
-            save_kwargs['quality'] = quality
-        elif original_format == 'PNG':
-            save_format = 'PNG'
-            # PNG doesn't use quality, but we can optimize
-            save_kwargs = {'optimize': True}
-        elif original_format == 'WEBP':
-            save_format = 'WEBP'
-            save_kwargs['quality'] = quality
-        else:
-            # For other formats, convert to PNG to preserve quality
-            save_format = 'PNG'
-            save_kwargs = {'optimize': True}
-
-        # Try compression with decreasing quality for lossy formats
-        max_iterations = 10
-        iteration = 0
-
-        while iteration < max_iterations:
-            iteration += 1
-
-            # Update quality for lossy formats
-            if save_format in ('JPEG', 'WEBP'):
-                save_kwargs = {'optimize': True, 'quality': quality}
-
-            img.save(image_path, save_format, **save_kwargs)
-
-            # Check file size
-            file_size_mb = os.path.getsize(image_path) / (1024 * 1024)
-
-            if file_size_mb <= max_size_mb:
-                break
-
-            # For lossless formats (PNG), try downscaling dimensions
-            current_width, current_height = img.size
-            if current_width > 800 or current_height > 800:
-                # Reduce by 80% each iteration
-                new_width = int(current_width * 0.8)
-                new_height = int(current_height * 0.8)
-                img = img.resize((new_width, new_height),
-                                 Image.Resampling.LANCZOS)
-            else:
-                # Can't compress further, break to avoid infinite loop
-                break
-
-        return image_path
-    except Exception as e:
-        print(f"[ERROR] Failed to compress image {image_path}: {e}")
-        return image_path
-
-
 # Login Manager setup
 login_manager = LoginManager()
 login_manager.init_app(app)
@@ -353,6 +319,128 @@ def generate_jwt_token(user):
 
 # Import models before routes
 import models
+from search_index import product_search_index
+import search_service
+import catalog_queries
+from catalog_queries import refresh_catalog_caches
+import sales_analytics
+import sales_rollup
+import sales_export
+import product_import
+from export_jobs import export_job_queue
+from image_cache import image_resize_cache
+from image_pipeline import (compress_image, image_pipeline, orientation_for,
+                            picture_sources, remove_variants, sort_by_orientation)
+import media_store
+from media_store import chat_media, product_media
+from media_serving import media_server
+from page_cache import page_cache
+from sitemap_builder import sitemap_builder
+
+# Pertama: pool gambar di-fork (request pertama) sebelum thread background dimulai
+image_pipeline.init_app(app)
+catalog_queries.catalog_sync.init_app(app)
+page_cache.init_app(app)
+sitemap_builder.init_app(app)
+sales_rollup.init_app(app)
+export_job_queue.init_app(app)
+image_resize_cache.init_app(app)
+media_store.init_app(app)
+media_server.init_app(app)
+
+
+def refresh_product_caches(product):
+    """Sinkronkan cache katalog setelah produk ditambah/diubah"""
+    product_search_index.update_product(product)
+    catalog_queries.invalidate_product_counts()
+
+
+def forget_product_caches(product_id):
+    """Buang produk dari cache katalog setelah dihapus"""
+    product_search_index.remove_product(product_id)
+    catalog_queries.invalidate_product_counts()
+
+
+@app.cli.command('backfill-slugs')
+def backfill_slugs_command():
+    """Isi slug semua produk yang belum punya slug (flask --app main backfill-slugs)"""
+    count = models.backfill_product_slugs()
+    refresh_catalog_caches()
+    print(f"[OK] Slug generated for {count} products")
+
+
+@app.cli.command('rebuild-sales-rollup')
+@click.option('--since', type=click.DateTime(formats=['%Y-%m-%d']), default=None,
+              help='Bangun ulang mulai tanggal ini saja (YYYY-MM-DD)')
+def rebuild_sales_rollup_command(since):
+    """Bangun ulang daily_sales_rollup dari orders (flask --app main rebuild-sales-rollup)"""
+    rows = sales_rollup.rebuild(since=since.date() if since else None)
+    print(f"[OK] Sales rollup rebuilt: {rows} rows")
+
+
+@app.cli.command('generate-image-variants')
+@click.option('--batch-size', type=int, default=50, help='Gambar per batch (satu commit)')
+def generate_image_variants_command(batch_size):
+    """Buat turunan responsif untuk gambar produk lama (flask --app main generate-image-variants)"""
+    ProductImage = models.ProductImage
+    generated = missing = 0
+    last_id = 0
+    while True:
+        images = ProductImage.query.filter(ProductImage.variants.is_(None),
+                                           ProductImage.id > last_id)\
+            .order_by(ProductImage.id).limit(batch_size).all()
+        if not images:
+            break
+        last_id = images[-1].id
+        paths = [os.path.join(app.root_path, image.image_url.lstrip('/')) for image in images]
+        existing = [(image, path) for image, path in zip(images, paths) if os.path.exists(path)]
+        missing += len(images) - len(existing)
+        # File asli tidak dikompres ulang (max_size_mb=None)
+        results = image_pipeline.process([path for _, path in existing],
+                                         max_size_mb=None, variants=True)
+        for (image, _), result in zip(existing, results):
+            if result.variants:
+                image.variants = json.dumps(result.variants)
+                generated += 1
+        db.session.commit()
+        print(f"[INFO] Processed product images up to ID {last_id}")
+    print(f"[OK] Variants generated for {generated} images, {missing} files missing")
+
+
+@app.cli.command('clear-image-cache')
+def clear_image_cache_command():
+    """Hapus semua thumbnail di cache /img (flask --app main clear-image-cache)"""
+    image_resize_cache.clear()
+    print("[OK] Image cache cleared")
+
+
+@app.cli.command('gc-media')
+@click.option('--grace-hours', type=int, default=media_store.GC_GRACE_SECONDS // 3600,
+              help='Jangan hapus file yang diupload/dipakai ulang dalam N jam terakhir')
+@click.option('--dry-run', is_flag=True, help='Hanya tampilkan file yang akan dihapus')
+def gc_media_command(grace_hours, dry_run):
+    """Hitung ulang referensi media store dan hapus file yatim (flask --app main gc-media)"""
+    removed, freed = media_store.collect_garbage(grace_seconds=grace_hours * 3600,
+                                                 dry_run=dry_run)
+    for url in removed:
+        print(f"[INFO] {'Would remove' if dry_run else 'Removed'}: {url}")
+    print(f"[OK] {len(removed)} orphan media files, {freed // 1024} KB"
+          f"{' (dry run)' if dry_run else ' freed'}")
+
+
+@app.cli.command('compress-static')
+@click.option('--force', is_flag=True, help='Tulis ulang walau file terkompresi masih baru')
+def compress_static_command(force):
+    """Buat file .gz/.br untuk CSS/JS di static/ (flask --app main compress-static)"""
+    written = media_server.compress_static(force=force)
+    print(f"[OK] {written} precompressed static files written")
+
+
+@app.cli.command('export-worker')
+@click.option('--once', is_flag=True, help='Berhenti setelah antrian kosong')
+def export_worker_command(once):
+    """Jalankan worker export job (EXPORT_WORKER=external)"""
+    export_job_queue.work(once=once)
 
 
 def setup_django_chat_service():
@@ -786,6 +874,17 @@ with app.app_context():
         db.create_all()
         print("[OK] Flask database tables created")
 
+        # daily_sales_rollup yang baru dibuat create_all() masih kosong
+        try:
+            rows = sales_rollup.backfill_if_empty()
+            if rows is not None:
+                print(f"[OK] Sales rollup backfilled from existing orders: {rows} rows")
+        except Exception as e:
+            # Mis. worker lain sedang mengisi tabel yang sama
+            print(f"[WARNING] Sales rollup backfill failed, run "
+                  f"'flask --app main rebuild-sales-rollup': {e}")
+            db.session.rollback()
+
         # Create default admin user if it doesn't exist
         admin_email = "admin@hurtrock.com"
 
@@ -896,55 +995,27 @@ def favicon():
 
 @app.route('/sitemap.xml')
 def sitemap_xml():
-    """Generate sitemap.xml for SEO"""
-    try:
-        # Get all active products with slugs
-        products = models.Product.query.filter_by(is_active=True).all()
-        categories = models.Category.query.filter_by(is_active=True).all()
+    """Sitemap (atau sitemap index) yang dibangun di background"""
+    return sitemap_builder.send('sitemap.xml')
 
-        # Ensure all products have slugs
-        for product in products:
-            if not product.slug:
-                product.ensure_slug()
 
-        db.session.commit()
-
-        current_date = datetime.utcnow().strftime('%Y-%m-%d')
-
-        response = render_template('sitemap.xml',
-                                   products=products,
-                                   categories=categories,
-                                   current_date=current_date)
+@app.route('/sitemap-<int:number>.xml')
+def sitemap_child(number):
+    """Child sitemap saat URL melebihi batas 50.000 per file"""
+    return sitemap_builder.send(f'sitemap-{number}.xml')
 
-        return response, 200, {'Content-Type': 'application/xml'}
-
-    except Exception as e:
-        print(f"[ERROR] Sitemap generation failed: {e}")
-        db.session.rollback()
-        return f"<?xml version='1.0' encoding='UTF-8'?><urlset xmlns='http://www.sitemaps.org/schemas/sitemap/0.9'></urlset>", 200, {
-            'Content-Type': 'application/xml'
-        }
 
 @app.route('/product-feed.xml')
 def product_feed():
-    # Ambil semua produk aktif
-    products = Product.query.filter_by(is_active=True).all()
-
-    # Render ke template XML
-    xml = render_template(
-        'product-feed.xml',
-        products=products,
-        current_date=datetime.utcnow().strftime("%Y-%m-%d")
-    )
-
-    # Kembalikan response sebagai XML
-    return Response(xml, mimetype='application/xml')
+    """Product feed (Google Merchant) yang dibangun di background"""
+    return sitemap_builder.send('product-feed.xml')
 
 # Routes
 @app.route('/')
+@page_cache.cached(tags=('catalog',))
 def index():
-    products = models.Product.query.filter_by(is_active=True).limit(8).all()
-    categories = models.Category.query.filter_by(is_active=True).all()
+    products = catalog_queries.homepage_products()
+    categories = catalog_queries.active_categories()
     return render_template('index.html',
                            products=products,
                            categories=categories)
@@ -962,20 +1033,15 @@ def download_file(filename):
     )
 
 @app.route('/products')
+@page_cache.cached(tags=('catalog',))
 def products():
     category_id = request.args.get('category')
     search_query = request.args.get('search', '')
-
-    query = models.Product.query.filter_by(is_active=True)
-
-    if category_id:
-        query = query.filter_by(category_id=category_id)
-
-    if search_query:
-        query = query.filter(models.Product.name.contains(search_query))
-
-    products = query.all()
-    categories = models.Category.query.filter_by(is_active=True).all()
+    sort = request.args.get('sort', 'name')
+    if sort not in catalog_queries.PRODUCT_SORTS:
+        sort = 'name'
+    page = request.args.get('page', 1, type=int)
+    cursor = request.args.get('after', '')
 
     # Safely convert category_id to int
     current_category = None
@@ -985,19 +1051,38 @@ def products():
         except (ValueError, TypeError):
             current_category = None
 
+    query = catalog_queries.active_products_query(category_id=current_category)
+
+    if search_query:
+        query = query.filter(models.Product.name.contains(search_query))
+
+    pagination = catalog_queries.paginate_products(
+        query,
+        count_key=('products', current_category, search_query),
+        sort=sort,
+        page=page,
+        cursor=cursor)
+    categories = catalog_queries.active_categories()
+
     return render_template('products.html',
-                           products=products,
+                           products=pagination.items,
+                           pagination=pagination,
                            categories=categories,
                            current_category=current_category,
+                           current_sort=sort,
                            search_query=search_query)
 
 
 @app.route('/produk/<slug>')
+@page_cache.cached()
 def product_detail(slug):
-    product = models.Product.query.filter_by(slug=slug).first_or_404()
+    product = catalog_queries.with_listing_relations(
+        models.Product.query.filter_by(slug=slug)).first_or_404()
+    page_cache.tag(f'product:{product.id}', f'category:{product.category_id}')
     valid_until = (datetime.utcnow() + timedelta(days=30)).strftime('%Y-%m-%d')
     return render_template('product_detail.html',
                            product=product,
+                           related_products=catalog_queries.related_products(product),
                            valid_until=valid_until)
 
 
@@ -1009,6 +1094,7 @@ def product_detail_by_id(product_id):
     valid_until = (datetime.utcnow() + timedelta(days=30)).strftime('%Y-%m-%d')
     return render_template('product_detail.html',
                            product=product,
+                           related_products=catalog_queries.related_products(product),
                            valid_until=valid_until)
 
 
@@ -1026,111 +1112,30 @@ def search():
     search_term_text = query or search_query_param
 
     try:
-        # Build base query for active products
-        search_query = models.Product.query.filter(
-            models.Product.is_active == True)
+        category_filter = int(category_id) if category_id.isdigit() else None
 
-        # Smart keyword search - flexible word order matching
         if search_term_text and len(search_term_text) >= 2:
-            # Split search term into keywords
-            keywords = search_term_text.lower().split()
-            
-            # Build OR conditions for each keyword across multiple fields
-            conditions = []
-            for keyword in keywords:
-                keyword_pattern = f"%{keyword}%"
-                conditions.append(
-                    db.or_(
-                        models.Product.name.ilike(keyword_pattern),
-                        models.Product.description.ilike(keyword_pattern),
-                        models.Product.brand.ilike(keyword_pattern),
-                        models.Product.model.ilike(keyword_pattern),
-                        models.Product.gtin.ilike(keyword_pattern)
-                    )
-                )
-            
-            # Combine all keyword conditions with AND (all keywords must match somewhere)
-            if conditions:
-                search_query = search_query.filter(db.and_(*conditions))
-
-        # Add category filter if specified
-        if category_id and category_id.isdigit():
-            search_query = search_query.filter(
-                models.Product.category_id == int(category_id))
-
-        # Order by relevance if text search is active, otherwise by name
-        if search_term_text and len(search_term_text) >= 2:
-            # Get all matching products for relevance scoring
-            all_products = search_query.all()
-            
-            # Score products by relevance
-            scored_products = []
-            for p in all_products:
-                score = 0
-                search_lower = search_term_text.lower()
-                name_lower = (p.name or '').lower()
-                brand_lower = (p.brand or '').lower()
-                model_lower = (p.model or '').lower()
-                gtin_lower = (p.gtin or '').lower()
-                
-                # Exact match in name gets highest score
-                if search_lower == name_lower:
-                    score += 100
-                # Starts with search term
-                elif name_lower.startswith(search_lower):
-                    score += 50
-                # Contains search term
-                elif search_lower in name_lower:
-                    score += 30
-                
-                # Brand/model matching
-                if search_lower in brand_lower:
-                    score += 20
-                if search_lower in model_lower:
-                    score += 20
-                
-                # GTIN exact match
-                if search_lower == gtin_lower:
-                    score += 80
-                    
-                # Keyword matching bonus
-                keywords = search_term_text.lower().split()
-                for kw in keywords:
-                    if kw in name_lower:
-                        score += 10
-                    if kw in brand_lower:
-                        score += 5
-                    if kw in model_lower:
-                        score += 5
-                
-                scored_products.append((p, score))
-            
-            # Sort by score descending
-            scored_products.sort(key=lambda x: x[1], reverse=True)
-            products = [p for p, score in scored_products[:10]]
+            products = search_service.search_storefront(
+                search_term_text, category_id=category_filter)
         else:
             # For category-only filter, show more results
-            products = search_query.order_by(
-                models.Product.name).limit(50).all()
+            products = search_service.browse_storefront(
+                category_id=category_filter)
 
         result = []
         for p in products:
-            # Check if product has multiple images for hover effect
-            has_multiple_images = len(p.images) > 0
-            last_image_url = p.images[-1].image_url if has_multiple_images else p.image_url
-            
             result.append({
-                'id': p.id,
-                'name': p.name,
-                'slug': p.slug,
-                'price': str(p.price),
-                'image_url': p.image_url or '/static/images/placeholder.jpg',
-                'brand': p.brand or '',
-                'description': p.description[:100] + '...' if p.description and len(p.description) > 100 else p.description or '',
-                'category': p.category.name if p.category else '',
-                'url': url_for('product_detail', slug=p.slug) if p.slug else url_for('product_detail_by_id', product_id=p.id),
-                'has_multiple_images': has_multiple_images,
-                'last_image_url': last_image_url
+                'id': p['id'],
+                'name': p['name'],
+                'slug': p['slug'],
+                'price': p['price'],
+                'image_url': p['image_url'] or '/static/images/placeholder.jpg',
+                'brand': p['brand'] or '',
+                'description': p['description'][:100] + '...' if p['description'] and len(p['description']) > 100 else p['description'] or '',
+                'category': p['category'],
+                'url': url_for('product_detail', slug=p['slug']) if p['slug'] else url_for('product_detail_by_id', product_id=p['id']),
+                'has_multiple_images': p['has_multiple_images'],
+                'last_image_url': p['last_image_url']
             })
         
         return jsonify(result)
@@ -1213,58 +1218,18 @@ def upload_chat_media():
 
         # Get file extension while preserving original format
         original_filename = secure_filename(file.filename)
-        file_ext = original_filename.rsplit(
-            '.', 1)[1].lower() if '.' in original_filename else 'jpg'
-
-        # Generate consistent filename with timestamp
-        timestamp = datetime.utcnow().strftime(
-            '%Y%m%d_%H%M%S_%f')[:19]  # YYYYMMDD_HHMMSS_microseconds
-        user_role = current_user.role if hasattr(current_user,
-                                                 'role') else 'user'
-        unique_filename = f"chat_{user_role}_{timestamp}_{current_user.id}.{file_ext}"
-
-        # Ensure upload directory exists with proper permissions
-        upload_dir = app.config['UPLOADS_MEDIA_FOLDER']
-        try:
-            if not os.path.exists(upload_dir):
-                os.makedirs(upload_dir, mode=0o755, exist_ok=True)
-                print(f"[DEBUG] Created directory: {upload_dir}")
-
-            # Verify directory permissions
-            if not os.access(upload_dir, os.W_OK):
-                os.chmod(upload_dir, 0o755)
-                print(f"[DEBUG] Fixed permissions for directory: {upload_dir}")
+        if '.' not in original_filename:
+            original_filename = f"{original_filename or 'media'}.jpg"
 
-        except Exception as dir_error:
-            print(f"[ERROR] Directory creation failed: {dir_error}")
-            return jsonify({
-                'success':
-                False,
-                'error':
-                f'Failed to create upload directory: {str(dir_error)}'
-            }), 500
-
-        # Save file to uploads/medias_sends folder with better error handling
-        file_path = os.path.join(upload_dir, unique_filename)
+        # Save file to the chat media store (uploads/medias_sends/<hash>);
+        # the same file sent again reuses the stored copy
         try:
-            # Save file in chunks to handle large files
-            with open(file_path, 'wb') as f:
-                file.seek(0)
-                while True:
-                    chunk = file.read(8192)  # 8KB chunks
-                    if not chunk:
-                        break
-                    f.write(chunk)
-
-            print(f"[DEBUG] File saved successfully: {file_path}")
-
-            # Verify file was saved
-            if not os.path.exists(file_path):
-                raise Exception(f"File was not saved properly: {file_path}")
-
-            # Check saved file size
-            saved_size = os.path.getsize(file_path)
-            print(f"[DEBUG] Saved file size: {saved_size} bytes")
+            file.seek(0)
+            stored = chat_media.save(file.stream, original_filename)
+            file_path = stored.path
+            unique_filename = os.path.basename(file_path)
+            print(f"[DEBUG] File saved successfully: {file_path} "
+                  f"({stored.size} bytes, new: {stored.created})")
 
         except Exception as save_error:
             print(f"[ERROR] File save failed: {save_error}")
@@ -1277,8 +1242,8 @@ def upload_chat_media():
         is_video = is_video_file(original_filename)
         media_type = 'video' if is_video else 'image'
 
-        # Compress images if needed (for images only)
-        if not is_video:
+        # Compress images if needed (for images only, once per stored file)
+        if not is_video and stored.created:
             try:
                 compress_image(file_path, max_size_mb=2)
                 print(f"[DEBUG] Image compressed: {file_path}")
@@ -1286,7 +1251,7 @@ def upload_chat_media():
                 print(f"[WARNING] Image compression failed: {e}")
 
         # Return media info dengan URL yang benar
-        media_url = f"/uploads/medias_sends/{unique_filename}"
+        media_url = stored.url
 
         result = {
             'success': True,
@@ -1853,52 +1818,59 @@ def orders():
 
 
 @app.route('/store-info')
+@page_cache.cached()
 def store_info():
     return render_template('store_info.html')
 
 
+def send_chat_media(filename):
+    """
+    File media chat dengan ETag/304, Range (video) dan offload web server.
+    File media store (nama = hash isi) tidak pernah berubah: cache 1 tahun.
+    """
+    try:
+        path = media_server.resolve(app.config['UPLOADS_MEDIA_FOLDER'], filename)
+        immutable = chat_media.owns(chat_media.url_for(path))
+        return media_server.send(path, max_age=31536000 if immutable else 86400,
+                                 immutable=immutable, cors=True)
+    except NotFound:
+        return jsonify({'error': 'File not found'}), 404
+    except OSError as e:
+        print(f"[MEDIA] Error serving file {filename}: {e}")
+        return jsonify({'error': 'File access error'}), 500
+
+
 @app.route('/uploads/medias_sends/<path:filename>')
 def serve_media_file(filename):
     """Serve uploaded media files"""
-    try:
-        print(f"[MEDIA] Serving media file: {filename}")
-        print(f"[MEDIA] From directory: {app.config['UPLOADS_MEDIA_FOLDER']}")
-        print(
-            f"[MEDIA] Full path: {os.path.join(app.config['UPLOADS_MEDIA_FOLDER'], filename)}"
-        )
+    return send_chat_media(filename)
+
+@app.route('/img/<int:width>x<int:height>/<source>/<path:filename>')
+def resized_image(width, height, source, filename):
+    """Thumbnail on-demand gambar produk/chat (lihat image_cache)"""
+    # Percobaan kedua: entri cache bisa terhapus eviction di antara get() dan send_file
+    for attempt in range(2):
+        try:
+            found = image_resize_cache.get(source, filename, width, height)
+            if found is None:
+                return jsonify({'error': 'File not found'}), 404
+            path, etag = found
+            return media_server.send(path, max_age=31536000, etag=etag,
+                                     immutable=True, cors=True)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        except (FileNotFoundError, NotFound):
+            if attempt:
+                return jsonify({'error': 'File not found'}), 404
+        except OSError as e:  # termasuk UnidentifiedImageError
+            print(f"[ERROR] Failed to resize image {source}/{filename}: {e}")
+            return jsonify({'error': 'Gambar tidak dapat diproses'}), 404
 
-        if not os.path.exists(
-                os.path.join(app.config['UPLOADS_MEDIA_FOLDER'], filename)):
-            print(f"[MEDIA] File not found: {filename}")
-            return jsonify({'error': 'File not found'}), 404
-
-        response = send_from_directory(app.config['UPLOADS_MEDIA_FOLDER'],
-                                       filename)
-        # Add CORS headers for cross-origin access
-        response.headers['Access-Control-Allow-Origin'] = '*'
-        response.headers['Access-Control-Allow-Methods'] = 'GET'
-        response.headers['Access-Control-Allow-Headers'] = 'Content-Type'
-        # Add cache headers for better performance
-        response.headers['Cache-Control'] = 'public, max-age=86400'  # 1 day
-        print(f"[MEDIA] Successfully served: {filename}")
-        return response
-    except Exception as e:
-        print(f"[MEDIA] Error serving file {filename}: {e}")
-        return jsonify({'error': 'File access error'}), 500
 
 @app.route('/static/chat_media/<path:filename>')
 def serve_chat_media(filename):
     """Serve chat media files (alternative endpoint)"""
-    try:
-        response = send_from_directory(app.config['UPLOADS_MEDIA_FOLDER'],
-                                       filename)
-        response.headers['Access-Control-Allow-Origin'] = '*'
-        response.headers['Access-Control-Allow-Methods'] = 'GET'
-        response.headers['Access-Control-Allow-Headers'] = 'Content-Type'
-        response.headers['Cache-Control'] = 'public, max-age=31536000'
-        return response
-    except FileNotFoundError:
-        return jsonify({'error': 'File not found'}), 404
+    return send_chat_media(filename)
 
 
 # WebSocket proxy routes for Cloudflare tunnel compatibility
@@ -2126,28 +2098,8 @@ def api_admin_search_products():
             # Return empty if query too short
             return jsonify({'success': True, 'products': []})
         
-        # Sederhanakan Kondisi Pencarian (Fokus pada ID, GTIN, dan Name)
-        search_conditions = []
-        
-        # 1. Exact ID match (prioritize)
-        if query.isdigit():
-            search_conditions.append(models.Product.id == int(query))
-        
-        # 2. GTIN exact or partial match
-        search_conditions.append(models.Product.gtin.ilike(f'{query}%')) # Diubah: Cari yang berawal dari query (lebih cepat)
-        
-        # 3. Name partial match
-        search_conditions.append(models.Product.name.ilike(f'%{query}%'))
-        
-        # Hapus Brand dan Description dari pencarian
-        
-        # Lakukan Query dengan Pengurutan Sederhana
-        products = models.Product.query.filter(
-            models.Product.is_active == True,
-            db.or_(*search_conditions)
-        ).order_by(
-            models.Product.name # Urutkan berdasarkan Nama Produk (Lebih Cepat)
-        ).limit(50).all() # Batasan 50 tetap dipertahankan
+        # Pencarian ID, GTIN, dan Name (limit 50) lewat search service
+        products = search_service.search_admin(query)
         
         # Format response (tetap sama)
         result = []
@@ -2183,38 +2135,7 @@ def admin_dashboard():
         models.Order.created_at.desc()).limit(5).all()
 
     # Analisis penjualan
-    from sqlalchemy import func, extract
-    from decimal import Decimal
-
-    # Total penjualan hari ini
-    today = datetime.utcnow().date()
-    today_sales = db.session.query(func.sum(models.Order.total_amount)).filter(
-        func.date(models.Order.created_at) == today,
-        models.Order.status.in_(['paid', 'shipped', 'delivered'
-                                 ])).scalar() or Decimal('0')
-
-    # Total penjualan bulan ini
-    current_month = datetime.utcnow().month
-    current_year = datetime.utcnow().year
-    monthly_sales = db.session.query(func.sum(
-        models.Order.total_amount)).filter(
-            extract('month', models.Order.created_at) == current_month,
-            extract('year', models.Order.created_at) == current_year,
-            models.Order.status.in_(['paid', 'shipped', 'delivered'
-                                     ])).scalar() or Decimal('0')
-
-    # Produk terlaris dengan explicit join
-    best_selling_products = db.session.query(
-        models.Product.name,
-        func.sum(models.OrderItem.quantity).label('total_sold')
-    ).select_from(models.Product)\
-    .join(models.OrderItem, models.OrderItem.product_id == models.Product.id)\
-    .join(models.Order, models.Order.id == models.OrderItem.order_id)\
-    .filter(
-        models.Order.status.in_(['paid', 'shipped', 'delivered'])
-    ).group_by(models.Product.id, models.Product.name).order_by(
-        func.sum(models.OrderItem.quantity).desc()
-    ).limit(5).all()
+    totals = sales_analytics.sales_totals()
 
     return render_template('admin/dashboard.html',
                            total_products=total_products,
@@ -2222,9 +2143,9 @@ def admin_dashboard():
                            total_users=total_users,
                            recent_orders=recent_orders,
                            current_date=datetime.utcnow(),
-                           today_sales=today_sales,
-                           monthly_sales=monthly_sales,
-                           best_selling_products=best_selling_products)
+                           today_sales=totals.today,
+                           monthly_sales=totals.month,
+                           best_selling_products=sales_analytics.best_sellers(limit=5))
 
 
 @app.route('/admin/products')
@@ -2240,21 +2161,6 @@ def admin_products():
              <= models.Product.low_stock_threshold, 3),
             else_=4), models.Product.name).all()
 
-    # Ensure all products have slugs
-    slug_updated = False
-    for product in products:
-        if not product.slug:
-            product.ensure_slug()
-            slug_updated = True
-
-    if slug_updated:
-        try:
-            db.session.commit()
-            print(f"[INFO] Updated slugs for products without slugs")
-        except Exception as e:
-            print(f"[ERROR] Failed to update slugs: {e}")
-            db.session.rollback()
-
     categories = models.Category.query.filter_by(is_active=True).all()
     suppliers = models.Supplier.query.filter_by(is_active=True).all()
 
@@ -2379,60 +2285,14 @@ def admin_add_product():
             ]
             print(f"[DEBUG] {len(valid_files)} valid files to process")
 
-            # First pass: save and process all images
-            for i, file in enumerate(valid_files):
-                if allowed_file(file.filename):
-                    try:
-                        # Generate unique filename
-                        filename = secure_filename(file.filename)
-                        filename = f"{uuid.uuid4()}_{filename}"
-                        filepath = os.path.join(app.config['UPLOAD_FOLDER'],
-                                                filename)
-
-                        # Create directory if it doesn't exist
-                        os.makedirs(os.path.dirname(filepath), exist_ok=True)
-
-                        # Save file
-                        file.save(filepath)
-                        print(f"[DEBUG] File saved: {filepath}")
-
-                        # Compress image
-                        compress_image(filepath)
-
-                        # Detect orientation
-                        orientation = get_image_orientation(filepath)
-
-                        image_url = f"/static/public/produk_images/{filename}"
-
-                        # Store image info for sorting
-                        processed_images.append({
-                            'url': image_url,
-                            'orientation': orientation,
-                            'original_index': i,
-                            'filepath': filepath
-                        })
-
-                        print(
-                            f"[DEBUG] Image processed: {filename}, orientation: {orientation}"
-                        )
-
-                    except Exception as img_error:
-                        print(
-                            f"[ERROR] Failed to process image {file.filename}: {str(img_error)}"
-                        )
-                        continue
+            # First pass: save all images, then compress them in parallel
+            saved_images = save_product_images(
+                (i, file) for i, file in enumerate(valid_files))
+            processed_images = process_product_images(saved_images)
 
             # Sort images: landscape first, then portrait/square
-            def sort_key(img):
-                orientation_priority = {
-                    'landscape': 0,
-                    'square': 1,
-                    'portrait': 2,
-                    'unknown': 3
-                }
-                return orientation_priority.get(img['orientation'], 3)
-
-            sorted_images = sorted(processed_images, key=sort_key)
+            sorted_images = sort_by_orientation(
+                processed_images, key=lambda img: img['orientation'])
             print(
                 f"[DEBUG] Images sorted by orientation: {[img['orientation'] for img in sorted_images]}"
             )
@@ -2451,7 +2311,8 @@ def admin_add_product():
                         product_id=new_product.id,
                         image_url=image_url,
                         is_thumbnail=is_thumbnail,
-                        display_order=display_order)
+                        display_order=display_order,
+                        variants=img_info['variants'])
                     db.session.add(product_image)
                     print(
                         f"[DEBUG] ProductImage created: {image_url}, orientation: {img_info['orientation']}, display_order: {display_order}, is_thumbnail: {is_thumbnail}"
@@ -2481,6 +2342,7 @@ def admin_add_product():
             )
 
         db.session.commit()
+        refresh_product_caches(new_product)
         print(
             f"[DEBUG] Product {new_product.name} saved successfully with {len(uploaded_images)} images"
         )
@@ -2505,6 +2367,75 @@ def admin_add_product():
     return redirect(url_for('admin_products'))
 
 
+def save_product_images(indexed_files):
+    """
+    Simpan file gambar upload produk ke media store produk (UPLOAD_FOLDER).
+    indexed_files berisi (index_asli, FileStorage); mengembalikan list dict
+    url/original_index/filepath/created untuk process_product_images.
+    """
+    saved = []
+    for i, file in indexed_files:
+        if not allowed_file(file.filename):
+            continue
+        try:
+            stored = product_media.save(file.stream, secure_filename(file.filename))
+            print(f"[DEBUG] File saved: {stored.path} (new: {stored.created})")
+            saved.append({
+                'url': stored.url,
+                'original_index': i,
+                'filepath': stored.path,
+                'created': stored.created
+            })
+        except Exception as img_error:
+            print(
+                f"[ERROR] Failed to save image {file.filename}: {str(img_error)}"
+            )
+    return saved
+
+
+def process_product_images(saved_images):
+    """
+    Kompresi + orientasi + turunan responsif gambar hasil save_product_images
+    di image process pool, urutan hasil sama dengan saved_images. File yang
+    sudah ada di media store memakai manifest turunan ProductImage lain yang
+    menunjuk file yang sama; setiap file diproses paling banyak sekali.
+    """
+    known = {}
+    for url in {img['url'] for img in saved_images if not img['created']}:
+        existing = models.ProductImage.query.filter(
+            models.ProductImage.image_url == url,
+            models.ProductImage.variants.isnot(None)).first()
+        if existing:
+            known[url] = existing.variants
+
+    pending = list(dict.fromkeys(img['filepath'] for img in saved_images
+                                 if img['url'] not in known))
+    results = dict(zip(pending, image_pipeline.process(pending, variants=True)))
+    processed = []
+    for img_info in saved_images:
+        if img_info['url'] in known:
+            variants = known[img_info['url']]
+            manifest = json.loads(variants)
+            orientation = orientation_for(manifest['width'], manifest['height'])
+        else:
+            result = results[img_info['filepath']]
+            if result.error:
+                print(
+                    f"[ERROR] Could not process image {img_info['filepath']}: {result.error}"
+                )
+            orientation = result.orientation
+            variants = json.dumps(result.variants) if result.variants else None
+        processed.append({
+            **img_info,
+            'orientation': orientation,
+            'variants': variants
+        })
+        print(
+            f"[DEBUG] Image processed: {img_info['url']}, orientation: {orientation}"
+        )
+    return processed
+
+
 @app.route('/admin/products/<int:product_id>/edit', methods=['POST'])
 @login_required
 @admin_required
@@ -2564,9 +2495,8 @@ def admin_edit_product(product_id):
         product.is_featured = 'is_featured' in request.form
         product.is_active = 'is_active' in request.form
 
-        # Always regenerate slug to ensure it's current (like add product)
-        product.slug = None  # Reset slug to force regeneration
-        product.ensure_slug()
+        # Regenerate slug from the current name (kept if still matching)
+        product.slug = product.generate_slug()
         print(
             f"[DEBUG] Edit: Slug regenerated for product {product.name}: {product.slug}"
         )
@@ -2580,16 +2510,22 @@ def admin_edit_product(product_id):
 
         # Handle deleted images
         deleted_images = request.form.getlist('deleted_images[]')
+        released_media = []
         if deleted_images:
             for img_id in deleted_images:
                 try:
                     image = models.ProductImage.query.filter_by(id=int(img_id), product_id=product.id).first()
                     if image:
-                        # Hapus file fisik
-                        file_path = os.path.join(app.root_path, image.image_url.lstrip('/'))
-                        if os.path.exists(file_path):
-                            os.remove(file_path)
-                            print(f"[DEBUG] Deleted image file: {file_path}")
+                        if product_media.owns(image.image_url):
+                            # File bisa dipakai gambar lain; dilepas setelah commit
+                            released_media.append((image.image_url, image.variant_manifest))
+                        else:
+                            # Hapus file fisik
+                            file_path = os.path.join(app.root_path, image.image_url.lstrip('/'))
+                            if os.path.exists(file_path):
+                                os.remove(file_path)
+                                print(f"[DEBUG] Deleted image file: {file_path}")
+                            remove_variants(file_path, image.variant_manifest)
 
                         # Hapus dari database
                         db.session.delete(image)
@@ -2611,55 +2547,15 @@ def admin_edit_product(product_id):
             files_to_process = request.files.getlist('images')
 
         if files_to_process:
-            # First pass: save and process all images
-            for i, file in enumerate(files_to_process):
-                if file and file.filename and allowed_file(file.filename):
-                    try:
-                        filename = secure_filename(file.filename)
-                        filename = f"{uuid.uuid4()}_{filename}"
-                        filepath = os.path.join(app.config['UPLOAD_FOLDER'],
-                                                filename)
-
-                        # Create directory if it doesn't exist
-                        os.makedirs(os.path.dirname(filepath), exist_ok=True)
-
-                        file.save(filepath)
-                        compress_image(filepath)
-
-                        # Detect orientation
-                        orientation = get_image_orientation(filepath)
-
-                        image_url = f"/static/public/produk_images/{filename}"
-
-                        # Store image info for sorting
-                        processed_images.append({
-                            'url': image_url,
-                            'orientation': orientation,
-                            'original_index': i,
-                            'filepath': filepath
-                        })
-
-                        print(
-                            f"[DEBUG] Edit: Image processed: {filename}, orientation: {orientation}"
-                        )
-
-                    except Exception as img_error:
-                        print(
-                            f"[ERROR] Failed to process image {file.filename}: {str(img_error)}"
-                        )
-                        continue
+            # First pass: save all images, then compress them in parallel
+            saved_images = save_product_images(
+                (i, file) for i, file in enumerate(files_to_process)
+                if file and file.filename)
+            processed_images = process_product_images(saved_images)
 
             # Sort images: landscape first, then portrait/square
-            def sort_key(img):
-                orientation_priority = {
-                    'landscape': 0,
-                    'square': 1,
-                    'portrait': 2,
-                    'unknown': 3
-                }
-                return orientation_priority.get(img['orientation'], 3)
-
-            sorted_images = sorted(processed_images, key=sort_key)
+            sorted_images = sort_by_orientation(
+                processed_images, key=lambda img: img['orientation'])
             print(
                 f"[DEBUG] Edit: Images sorted by orientation: {[img['orientation'] for img in sorted_images]}"
             )
@@ -2683,8 +2579,8 @@ def admin_edit_product(product_id):
                         image_url=image_url,
                         is_thumbnail=is_thumbnail,
                         display_order=existing_max_order + 1 +
-                        display_order_offset  # Add after existing images
-                    )
+                        display_order_offset,  # Add after existing images
+                        variants=img_info['variants'])
                     db.session.add(product_image)
                     print(
                         f"[DEBUG] Edit: ProductImage created: {image_url}, orientation: {img_info['orientation']}, display_order: {existing_max_order + 1 + display_order_offset}, is_thumbnail: {is_thumbnail}"
@@ -2720,6 +2616,9 @@ def admin_edit_product(product_id):
                 newest_images.is_thumbnail = True
 
         db.session.commit()
+        for image_url, manifest in released_media:
+            product_media.release(image_url, manifest)
+        refresh_product_caches(product)
         print(f"[SUCCESS] Product {product.name} updated successfully")
 
         # Always return success response for AJAX requests
@@ -2781,6 +2680,7 @@ def admin_delete_product(product_id):
         product_name = product.name
         db.session.delete(product)
         db.session.commit()
+        forget_product_caches(product_id)
 
         flash(f'Produk {product_name} berhasil dihapus!', 'success')
 
@@ -2853,16 +2753,24 @@ def delete_product_image(image_id):
         image = models.ProductImage.query.get_or_404(image_id)
         product_id = image.product_id
         
-        # Delete physical file
-        if image.image_url:
-            file_path = os.path.join(app.root_path, image.image_url.lstrip('/'))
+        # Delete physical file (file media store dilepas setelah commit)
+        image_url, manifest = image.image_url, image.variant_manifest
+        if image_url and not product_media.owns(image_url):
+            file_path = os.path.join(app.root_path, image_url.lstrip('/'))
             if os.path.exists(file_path):
                 os.remove(file_path)
                 print(f"[DEBUG] Deleted image file: {file_path}")
+            remove_variants(file_path, manifest)
         
         # Delete from database
         db.session.delete(image)
         db.session.commit()
+        if image_url:
+            product_media.release(image_url, manifest)
+
+        product = db.session.get(models.Product, product_id)
+        if product:
+            refresh_product_caches(product)
         
         print(f"[SUCCESS] Image {image_id} deleted successfully")
         return jsonify({'success': True, 'message': 'Gambar berhasil dihapus'})
@@ -2893,6 +2801,7 @@ def set_product_thumbnail(product_id, image_id):
         product.image_url = image.image_url
         
         db.session.commit()
+        refresh_product_caches(product)
         
         print(f"[SUCCESS] Thumbnail set for product {product_id}, image {image_id}")
         return jsonify({'success': True, 'message': 'Gambar utama berhasil diubah'})
@@ -2995,6 +2904,8 @@ def admin_edit_category(category_id):
         category.is_active = 'is_active' in request.form
 
         db.session.commit()
+        # Nama kategori ikut tersimpan di dokumen search index
+        refresh_catalog_caches()
         flash(f'Kategori {category.name} berhasil diperbarui!', 'success')
     except Exception as e:
         db.session.rollback()
@@ -4403,23 +4314,8 @@ def api_cashier_products():
         category_id = request.args.get('category_id')
         search = request.args.get('search', '').strip()
 
-        query = models.Product.query.filter_by(is_active=True)
-
-        if category_id:
-            query = query.filter_by(category_id=int(category_id))
-
-        if search:
-            query = query.filter(
-                db.or_(
-                    models.Product.id == int(search) if search.isdigit() else False,
-                    models.Product.name.ilike(f'%{search}%'),
-                    models.Product.description.ilike(f'%{search}%'),
-                    models.Product.brand.ilike(f'%{search}%'),
-                    models.Product.gtin.ilike(f'%{search}%')
-                )
-            )
-
-        products = query.all()
+        products = search_service.search_cashier(search,
+                                                 category_id=category_id)
 
         products_data = []
         for product in products:
@@ -4631,7 +4527,7 @@ def print_receipt():
     paper_widths = {'58': 58 * unit_mm, '80': 80 * unit_mm, '120': 120 * unit_mm}
     width = paper_widths.get(paper_size, 80 * unit_mm)
 
-    store_profile = models.StoreProfile.get_active_profile()
+    store_profile = models.StoreProfile.get_cached_profile()
 
     buffer = io.BytesIO()
     base_height = 150 * unit_mm + len(items) * 8 * unit_mm
@@ -4793,197 +4689,33 @@ def cashier_sessions():
 @login_required
 @staff_required
 def export_cashier_transactions():
-    """Export cashier transactions to Excel with full analytics"""
+    """Export cashier transactions to Excel, CSV or Parquet (?format=)"""
     if current_user.role not in ['admin', 'staff']:
         flash(
             'Akses ditolak. Hanya admin dan staff yang dapat mengekspor transaksi.',
             'error')
         return redirect(url_for('index'))
 
-    try:
-        from openpyxl import Workbook
-        from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-        from io import BytesIO
-        from openpyxl.utils import get_column_letter
-
-        # Get filter parameters
-        date_from = request.args.get('date_from')
-        date_to = request.args.get('date_to')
-
-        # Base query
-        query = models.OfflineTransaction.query.filter_by(
-            cashier_user_id=current_user.id)
-
-        # Apply date filters
-        if date_from:
-            try:
-                date_from_obj = datetime.strptime(date_from, '%Y-%m-%d')
-                query = query.filter(models.OfflineTransaction.transaction_date
-                                     >= date_from_obj)
-            except:
-                pass
-
-        if date_to:
-            try:
-                date_to_obj = datetime.strptime(date_to,
-                                                '%Y-%m-%d') + timedelta(days=1)
-                query = query.filter(
-                    models.OfflineTransaction.transaction_date < date_to_obj)
-            except:
-                pass
-
-        transactions = query.order_by(
-            models.OfflineTransaction.transaction_date.desc()).all()
-
-        # Create workbook
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "Laporan Transaksi Kasir"
-
-        # Add store logo/header
-        profile = models.StoreProfile.get_active_profile()
-        ws.merge_cells('A1:H1')
-        header_cell = ws['A1']
-        header_cell.value = profile.store_name if profile else "HURTROCK MUSIC STORE"
-        header_cell.font = Font(size=18, bold=True, color="FF6B35")
-        header_cell.alignment = Alignment(horizontal='center',
-                                          vertical='center')
-
-        ws.merge_cells('A2:H2')
-        subheader_cell = ws['A2']
-        subheader_cell.value = "LAPORAN TRANSAKSI KASIR"
-        subheader_cell.font = Font(size=14, bold=True)
-        subheader_cell.alignment = Alignment(horizontal='center',
-                                             vertical='center')
-
-        # Add report info
-        ws.merge_cells('A3:H3')
-        info_cell = ws['A3']
-        date_range = ""
-        if date_from and date_to:
-            date_range = f"Periode: {date_from} s/d {date_to}"
-        elif date_from:
-            date_range = f"Mulai: {date_from}"
-        elif date_to:
-            date_range = f"Sampai: {date_to}"
-        else:
-            date_range = "Semua Transaksi"
-        info_cell.value = f"{date_range} | Kasir: {current_user.name}"
-        info_cell.font = Font(size=10)
-        info_cell.alignment = Alignment(horizontal='center')
-
-        # Blank row
-        ws.append([])
-
-        # Define column headers
-        headers = [
-            'No', 'ID Transaksi', 'Tanggal & Waktu', 'Nama Pembeli',
-            'Metode Pembayaran', 'Daftar Barang', 'Total', 'Status'
-        ]
-
-        # Style for headers
-        header_fill = PatternFill(start_color='FF6B35',
-                                  end_color='FF6B35',
-                                  fill_type='solid')
-        header_font = Font(bold=True, color='FFFFFF', size=11)
-        border = Border(left=Side(style='thin'),
-                        right=Side(style='thin'),
-                        top=Side(style='thin'),
-                        bottom=Side(style='thin'))
-
-        # Write headers
-        header_row = ws.max_row + 1
-        for col, header in enumerate(headers, start=1):
-            cell = ws.cell(row=header_row, column=col)
-            cell.value = header
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.border = border
-            cell.alignment = Alignment(horizontal='center', vertical='center')
-
-        # Write transaction data
-        for idx, transaction in enumerate(transactions, start=1):
-            # Compile items list
-            items_list = []
-            for item in transaction.offline_items:
-                items_list.append(
-                    f"{item.product_name} x{item.quantity} (@Rp {item.product_price:,.0f})"
-                )
-            items_str = "; ".join(items_list)
-
-            row_data = [
-                idx, transaction.local_transaction_id,
-                transaction.transaction_date.strftime('%d/%m/%Y %H:%M:%S'),
-                transaction.customer_name or '-',
-                transaction.payment_method.title(), items_str,
-                float(transaction.total_amount), 'Tersinkron'
-                if transaction.sync_status == 'synced' else 'Pending'
-            ]
-
-            row_num = ws.max_row + 1
-            for col, value in enumerate(row_data, start=1):
-                cell = ws.cell(row=row_num, column=col)
-                cell.value = value
-                cell.border = border
-
-                # Format currency
-                if col == 7:  # Total column
-                    cell.number_format = 'Rp #,##0'
-                    cell.alignment = Alignment(horizontal='right')
-                else:
-                    cell.alignment = Alignment(horizontal='left',
-                                               vertical='center',
-                                               wrap_text=True)
-
-        # Add summary
-        ws.append([])
-        summary_row = ws.max_row + 1
-        ws.merge_cells(f'A{summary_row}:F{summary_row}')
-        summary_label = ws[f'A{summary_row}']
-        summary_label.value = "TOTAL PENJUALAN"
-        summary_label.font = Font(bold=True, size=12)
-        summary_label.alignment = Alignment(horizontal='right')
-
-        total_amount = sum(t.total_amount for t in transactions)
-        total_cell = ws[f'G{summary_row}']
-        total_cell.value = float(total_amount)
-        total_cell.number_format = 'Rp #,##0'
-        total_cell.font = Font(bold=True, size=12, color='FF6B35')
-        total_cell.alignment = Alignment(horizontal='right')
-        total_cell.fill = PatternFill(start_color='FFF3E0',
-                                      end_color='FFF3E0',
-                                      fill_type='solid')
-
-        # Adjust column widths
-        column_widths = [5, 25, 20, 20, 18, 50, 15, 12]
-        for idx, width in enumerate(column_widths, start=1):
-            ws.column_dimensions[get_column_letter(idx)].width = width
-
-        # Freeze header rows
-        ws.freeze_panes = 'A6'
-
-        # Save to bytes buffer
-        excel_file = BytesIO()
-        wb.save(excel_file)
-        excel_file.seek(0)
-
-        # Generate filename
-        filename = f"Laporan_Kasir_{current_user.name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-
-        return send_file(
-            excel_file,
-            mimetype=
-            'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-            as_attachment=True,
-            download_name=filename)
+    export_format = request.args.get('format', 'xlsx')
+    if export_format not in sales_export.EXPORT_FORMATS:
+        flash('Format export tidak valid!', 'error')
+        return redirect(url_for('cashier_transactions'))
 
-    except Exception as e:
-        print(f"[ERROR] Excel export failed: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        flash(f'Gagal mengekspor data: {str(e)}', 'error')
+    package = sales_export.missing_export_package(export_format)
+    if package:
+        flash(
+            f'Package {package} diperlukan untuk export {export_format.upper()}. Silakan install terlebih dahulu.',
+            'error')
         return redirect(url_for('cashier_transactions'))
 
+    kind = sales_export.export_kind('cashier_transactions', export_format)
+    job = export_job_queue.enqueue(kind, {
+        'cashier_user_id': current_user.id,
+        'date_from': request.args.get('date_from'),
+        'date_to': request.args.get('date_to'),
+    }, current_user.id)
+    return redirect(url_for('export_job_status', job_id=job.id))
+
 
 # ===========================
 # END OFFLINE CASHIER SYSTEM ROUTES
@@ -5027,11 +4759,7 @@ def download_import_template():
         ws.title = "Template Produk"
 
         # Define headers
-        headers = [
-            'nama_produk', 'deskripsi', 'harga', 'stok_awal', 'brand',
-            'kategori', 'berat_gram', 'dimensi_panjang', 'dimensi_lebar',
-            'dimensi_tinggi', 'warna', 'material', 'garansi_bulan', 'aktif'
-        ]
+        headers = product_import.IMPORT_HEADERS
 
         # Write headers with styling
         header_fill = PatternFill(start_color='4472C4',
@@ -5050,7 +4778,7 @@ def download_import_template():
             'Angka (contoh: 10)', 'Opsional', 'Nama kategori yang ada',
             'Angka dalam gram', 'Angka dalam cm', 'Angka dalam cm',
             'Angka dalam cm', 'Opsional', 'Opsional', 'Angka bulan garansi',
-            'true/false'
+            'true/false', 'Opsional, unik'
         ]
 
         for col, instruction in enumerate(instructions, 1):
@@ -5063,19 +4791,19 @@ def download_import_template():
                 'Gitar Akustik Yamaha F310',
                 'Gitar akustik pemula dengan kualitas suara yang baik',
                 1500000, 5, 'Yamaha', 'Gitar', 2500, 103, 38, 11, 'Natural',
-                'Kayu Spruce', 6, 'true'
+                'Kayu Spruce', 6, 'true', ''
             ],
             [
                 'Bass Elektrik Fender Jazz',
                 'Bass elektrik 4 senar dengan pickup jazz', 8500000, 2,
                 'Fender', 'Bass', 4000, 117, 32, 4, 'Sunburst', 'Kayu Alder',
-                12, 'true'
+                12, 'true', ''
             ],
             [
                 'Drum Set Pearl Export',
                 'Drum set lengkap 5 piece untuk pemula hingga menengah',
                 12000000, 1, 'Pearl', 'Drum', 25000, 140, 120, 150, 'Hitam',
-                'Poplar/Mahogany', 24, 'true'
+                'Poplar/Mahogany', 24, 'true', ''
             ]
         ]
 
@@ -5085,7 +4813,7 @@ def download_import_template():
 
         # Adjust column widths
         column_widths = [
-            20, 30, 15, 12, 15, 15, 12, 15, 15, 15, 12, 15, 15, 10
+            20, 30, 15, 12, 15, 15, 12, 15, 15, 15, 12, 15, 15, 10, 18
         ]
         for col, width in enumerate(column_widths, 1):
             ws.column_dimensions[ws.cell(
@@ -5101,19 +4829,27 @@ def download_import_template():
             "", "Kolom Wajib:",
             "- nama_produk: Nama produk (maksimal 200 karakter)",
             "- harga: Harga jual dalam rupiah (angka tanpa titik/koma)",
-            "- stok_awal: Jumlah stok awal (angka bulat)", "",
+            "- stok_awal: Jumlah stok awal (angka bulat)",
+            "- kategori: Nama kategori yang sudah ada di sistem", "",
             "Kolom Opsional:", "- deskripsi: Deskripsi produk",
             "- brand: Merek produk",
-            "- kategori: Nama kategori yang sudah ada di sistem",
             "- berat_gram: Berat produk dalam gram",
             "- dimensi_*: Dimensi dalam cm", "- warna: Warna produk",
             "- material: Material/bahan produk",
             "- garansi_bulan: Lama garansi dalam bulan",
-            "- aktif: true untuk produk aktif, false untuk non-aktif", "",
+            "  (warna, material dan garansi ditulis di akhir deskripsi)",
+            "- aktif: true untuk produk aktif, false untuk non-aktif",
+            "- gtin: Barcode/GTIN produk, harus unik", "",
+            "Mode Update (upsert):",
+            "- Produk dengan GTIN yang sama (atau nama yang sama jika gtin kosong)",
+            "  diupdate, produk lain ditambahkan sebagai produk baru",
+            "- Kolom opsional yang dikosongkan tidak mengubah nilai lama",
+            "- Cocok untuk update harga/stok dari price list supplier", "",
             "Tips:",
             "- Pastikan nama kategori sesuai dengan yang ada di sistem",
             "- Gunakan angka untuk kolom numerik (tanpa satuan)",
-            "- Maksimal 1000 produk per file", "- File maksimal 10MB"
+            f"- Maksimal {product_import.MAX_IMPORT_ROWS} produk per file",
+            f"- File maksimal {product_import.MAX_IMPORT_FILE_SIZE // (1024 * 1024)}MB"
         ]
 
         for row, instruction in enumerate(instructions_text, 1):
@@ -5140,220 +4876,113 @@ def download_import_template():
         return redirect(url_for('admin_products_import'))
 
 
-@app.route('/admin/products/import/upload', methods=['POST'])
-@login_required
-def upload_products_excel():
-    """Process uploaded Excel file and import products"""
-    if current_user.role != 'admin':
-        return jsonify({'success': False, 'error': 'Akses ditolak'}), 403
-
-    try:
-        if 'excel_file' not in request.files:
-            return jsonify({
-                'success': False,
-                'error': 'File tidak ditemukan'
-            }), 400
-
-        file = request.files['excel_file']
-        if file.filename == '':
-            return jsonify({
-                'success': False,
-                'error': 'File tidak dipilih'
-            }), 400
-
-        if not file.filename.lower().endswith(('.xlsx', '.xls')):
-            return jsonify({
-                'success': False,
-                'error': 'Format file harus Excel (.xlsx atau .xls)'
-            }), 400
+def save_import_upload():
+    """
+    Simpan file Excel dari request (excel_file), atau pakai upload_id hasil
+    validate_excel_file supaya file tidak diupload dan diparse dua kali.
+    Mengembalikan (upload_id, pesan_error).
+    """
+    upload_id = request.form.get('upload_id')
+    if upload_id:
+        try:
+            path = export_job_queue.upload_path(upload_id,
+                                                product_import.UPLOAD_EXTENSION)
+        except ValueError as e:
+            return None, str(e)
+        if not os.path.exists(path):
+            return None, 'File upload sudah kedaluwarsa, silakan upload ulang'
+        return upload_id, None
 
-        # Check file size (max 10MB)
-        file.seek(0, 2)  # Seek to end
-        file_size = file.tell()
-        file.seek(0)  # Reset to beginning
+    if 'excel_file' not in request.files:
+        return None, 'File tidak ditemukan'
 
-        if file_size > 10 * 1024 * 1024:  # 10MB
-            return jsonify({
-                'success': False,
-                'error': 'File terlalu besar (maksimal 10MB)'
-            }), 400
+    file = request.files['excel_file']
+    if file.filename == '':
+        return None, 'File tidak dipilih'
 
-        from openpyxl import load_workbook
+    if not file.filename.lower().endswith(('.xlsx', '.xls')):
+        return None, 'Format file harus Excel (.xlsx atau .xls)'
 
-        # Load workbook
-        wb = load_workbook(file, data_only=True)
-        ws = wb.active
+    # Check file size
+    file.seek(0, 2)  # Seek to end
+    file_size = file.tell()
+    file.seek(0)  # Reset to beginning
 
-        # Validate headers
-        expected_headers = [
-            'nama_produk', 'deskripsi', 'harga', 'stok_awal', 'brand',
-            'kategori', 'berat_gram', 'dimensi_panjang', 'dimensi_lebar',
-            'dimensi_tinggi', 'warna', 'material', 'garansi_bulan', 'aktif'
-        ]
+    if file_size > product_import.MAX_IMPORT_FILE_SIZE:
+        return None, f'File terlalu besar (maksimal {product_import.MAX_IMPORT_FILE_SIZE // (1024 * 1024)}MB)'
 
-        actual_headers = []
-        for col in range(1, len(expected_headers) + 1):
-            cell_value = ws.cell(row=1, column=col).value
-            actual_headers.append(
-                cell_value.strip().lower() if cell_value else '')
+    return export_job_queue.save_upload(file, product_import.UPLOAD_EXTENSION), None
 
-        if actual_headers != expected_headers:
-            return jsonify({
-                'success':
-                False,
-                'error':
-                f'Header tidak sesuai template. Expected: {expected_headers}, Got: {actual_headers}'
-            }), 400
 
-        # Get all categories for validation
-        categories = {
-            cat.name.lower(): cat.id
-            for cat in models.Category.query.all()
-        }
+@app.route('/admin/products/import/upload', methods=['POST'])
+@login_required
+def upload_products_excel():
+    """
+    Import produk dari file Excel. Default sebagai job background (mode=job)
+    yang bisa di-poll; mode=sync mengimpor langsung dan mengembalikan hasilnya.
+    import_mode=upsert mengupdate produk yang sudah ada (GTIN, atau nama).
+    """
+    if current_user.role != 'admin':
+        return jsonify({'success': False, 'error': 'Akses ditolak'}), 403
 
-        # Process data rows
-        imported_count = 0
-        error_count = 0
-        errors = []
+    import_mode = request.form.get('import_mode', 'insert')
+    if import_mode not in product_import.IMPORT_MODES:
+        return jsonify({'success': False, 'error': 'Mode import tidak valid'}), 400
 
-        max_row = ws.max_row
-        if max_row > 1002:  # 1000 data rows + 2 header rows
+    try:
+        upload_id, error = save_import_upload()
+        if error:
+            return jsonify({'success': False, 'error': error}), 400
+
+        if request.form.get('mode', 'job') != 'sync':
+            excel_file = request.files.get('excel_file')
+            job = export_job_queue.enqueue('product_import', {
+                'upload_id': upload_id,
+                'filename': excel_file.filename if excel_file else None,
+                'import_mode': import_mode,
+            }, current_user.id)
             return jsonify({
-                'success': False,
-                'error': 'Maksimal 1000 produk per file'
-            }), 400
-
-        for row_num in range(3, max_row +
-                             1):  # Start from row 3 (skip headers and example)
-            try:
-                # Read row data
-                row_data = []
-                for col in range(1, len(expected_headers) + 1):
-                    cell_value = ws.cell(row=row_num, column=col).value
-                    row_data.append(cell_value)
-
-                # Skip empty rows
-                if not any(row_data):
-                    continue
-
-                # Validate required fields
-                nama_produk = str(row_data[0]).strip() if row_data[0] else ''
-                harga = row_data[2]
-                stok_awal = row_data[3]
-
-                if not nama_produk:
-                    errors.append(f'Baris {row_num}: Nama produk wajib diisi')
-                    error_count += 1
-                    continue
-
-                if not harga or not isinstance(harga,
-                                               (int, float)) or harga <= 0:
-                    errors.append(
-                        f'Baris {row_num}: Harga harus berupa angka positif')
-                    error_count += 1
-                    continue
-
-                if not isinstance(stok_awal, (int, float)) or stok_awal < 0:
-                    errors.append(
-                        f'Baris {row_num}: Stok awal harus berupa angka non-negatif'
-                    )
-                    error_count += 1
-                    continue
-
-                # Validate category
-                kategori_name = str(
-                    row_data[5]).strip().lower() if row_data[5] else ''
-                category_id = None
-                if kategori_name:
-                    if kategori_name in categories:
-                        category_id = categories[kategori_name]
-                    else:
-                        errors.append(
-                            f'Baris {row_num}: Kategori "{row_data[5]}" tidak ditemukan'
-                        )
-                        error_count += 1
-                        continue
-
-                # Check if product already exists
-                existing_product = models.Product.query.filter_by(
-                    name=nama_produk).first()
-                if existing_product:
-                    errors.append(
-                        f'Baris {row_num}: Produk "{nama_produk}" sudah ada')
-                    error_count += 1
-                    continue
-
-                # Parse optional fields
-                deskripsi = str(row_data[1]).strip() if row_data[1] else ''
-                brand = str(row_data[4]).strip() if row_data[4] else ''
-                berat_gram = int(row_data[6]) if row_data[6] and isinstance(
-                    row_data[6], (int, float)) else None
-                dimensi_panjang = float(
-                    row_data[7]) if row_data[7] and isinstance(
-                        row_data[7], (int, float)) else None
-                dimensi_lebar = float(
-                    row_data[8]) if row_data[8] and isinstance(
-                        row_data[8], (int, float)) else None
-                dimensi_tinggi = float(
-                    row_data[9]) if row_data[9] and isinstance(
-                        row_data[9], (int, float)) else None
-                warna = str(row_data[10]).strip() if row_data[10] else ''
-                material = str(row_data[11]).strip() if row_data[11] else ''
-                garansi_bulan = int(
-                    row_data[12]) if row_data[12] and isinstance(
-                        row_data[12], (int, float)) else None
-
-                # Parse aktif field
-                aktif_value = str(
-                    row_data[13]).strip().lower() if row_data[13] else 'true'
-                is_active = aktif_value in ['true', '1', 'yes', 'ya', 'aktif']
-
-                # Create product
-                product = models.Product(
-                    name=nama_produk,
-                    description=deskripsi if deskripsi else None,
-                    price=float(harga),
-                    stock_quantity=int(stok_awal),
-                    brand=brand if brand else None,
-                    category_id=category_id,
-                    weight_grams=berat_gram,
-                    length_cm=dimensi_panjang,
-                    width_cm=dimensi_lebar,
-                    height_cm=dimensi_tinggi,
-                    color=warna if warna else None,
-                    material=material if material else None,
-                    warranty_months=garansi_bulan,
-                    is_active=is_active)
-
-                db.session.add(product)
-                imported_count += 1
-
-            except Exception as e:
-                errors.append(f'Baris {row_num}: Error - {str(e)}')
-                error_count += 1
-                continue
+                'success': True,
+                'job_id': job.id,
+                'status_url': url_for('api_export_job', job_id=job.id),
+                'job_url': url_for('export_job_status', job_id=job.id),
+                'message': 'Import sedang diproses di background'
+            }), 202
 
-        # Commit if there are successful imports
-        if imported_count > 0:
-            db.session.commit()
+        try:
+            result = product_import.import_rows(
+                product_import.parse_upload(upload_id), mode=import_mode)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        finally:
+            export_job_queue.remove_upload(upload_id)
+
+        if result.imported_count > 0 or result.updated_count > 0:
+            refresh_catalog_caches()
             print(
-                f"[EXCEL IMPORT] Successfully imported {imported_count} products"
+                f"[EXCEL IMPORT] Successfully imported {result.imported_count} products, "
+                f"updated {result.updated_count}"
             )
-        else:
-            db.session.rollback()
 
         # Prepare response
         response_data = {
             'success': True,
-            'imported_count': imported_count,
-            'error_count': error_count,
-            'errors': errors[:50],  # Limit error messages
+            'total_rows': result.total_rows,
+            'imported_count': result.imported_count,
+            'updated_count': result.updated_count,
+            'unchanged_count': result.unchanged_count,
+            'error_count': result.error_count,
+            'errors': [str(e) for e in result.errors[:50]],  # Limit error messages
             'message':
-            f'Import selesai: {imported_count} produk berhasil diimpor'
+            f'Import selesai: {result.imported_count} produk berhasil diimpor'
         }
 
-        if error_count > 0:
-            response_data['message'] += f', {error_count} error'
+        if import_mode == 'upsert':
+            response_data['message'] += (f', {result.updated_count} diupdate, '
+                                         f'{result.unchanged_count} tidak berubah')
+
+        if result.error_count > 0:
+            response_data['message'] += f', {result.error_count} error'
 
         return jsonify(response_data)
 
@@ -5369,66 +4998,49 @@ def upload_products_excel():
 @app.route('/admin/products/import/validate', methods=['POST'])
 @login_required
 def validate_excel_file():
-    """Validate Excel file before import (preview mode)"""
+    """
+    Validate Excel file before import (preview mode). upload_id di response
+    bisa dikirim ke upload_products_excel untuk mengimpor file yang sama.
+    """
     if current_user.role != 'admin':
         return jsonify({'success': False, 'error': 'Akses ditolak'}), 403
 
-    try:
-        if 'excel_file' not in request.files:
-            return jsonify({
-                'success': False,
-                'error': 'File tidak ditemukan'
-            }), 400
+    import_mode = request.form.get('import_mode', 'insert')
+    if import_mode not in product_import.IMPORT_MODES:
+        return jsonify({'success': False, 'error': 'Mode import tidak valid'}), 400
 
-        file = request.files['excel_file']
-        if file.filename == '':
-            return jsonify({
-                'success': False,
-                'error': 'File tidak dipilih'
-            }), 400
-
-        from openpyxl import load_workbook
-
-        # Load and validate file
-        wb = load_workbook(file, data_only=True)
-        ws = wb.active
-
-        # Check headers
-        expected_headers = [
-            'nama_produk', 'deskripsi', 'harga', 'stok_awal', 'brand',
-            'kategori', 'berat_gram', 'dimensi_panjang', 'dimensi_lebar',
-            'dimensi_tinggi', 'warna', 'material', 'garansi_bulan', 'aktif'
-        ]
-
-        actual_headers = []
-        for col in range(1, len(expected_headers) + 1):
-            cell_value = ws.cell(row=1, column=col).value
-            actual_headers.append(
-                cell_value.strip().lower() if cell_value else '')
+    try:
+        upload_id, error = save_import_upload()
+        if error:
+            return jsonify({'success': False, 'error': error}), 400
 
-        if actual_headers != expected_headers:
+        try:
+            rows = product_import.parse_upload(upload_id)
+            validated = product_import.validate_rows(rows, mode=import_mode)
+        except product_import.HeaderMismatch as e:
+            export_job_queue.remove_upload(upload_id)
             return jsonify({
                 'success': False,
                 'error': 'Header tidak sesuai template',
-                'expected_headers': expected_headers,
-                'actual_headers': actual_headers
+                'expected_headers': e.expected,
+                'actual_headers': e.actual
             }), 400
-
-        # Count data rows
-        data_rows = 0
-        for row_num in range(3, ws.max_row + 1):
-            row_data = [
-                ws.cell(row=row_num, column=col).value
-                for col in range(1,
-                                 len(expected_headers) + 1)
-            ]
-            if any(row_data):
-                data_rows += 1
+        except ValueError as e:
+            export_job_queue.remove_upload(upload_id)
+            return jsonify({'success': False, 'error': str(e)}), 400
 
         return jsonify({
             'success': True,
-            'total_rows': data_rows,
-            'message': f'File valid dengan {data_rows} baris data'
+            'upload_id': upload_id,
+            'import_mode': import_mode,
+            'total_rows': validated.total_rows,
+            'valid_rows': validated.valid_count,
+            'new_rows': len(validated.products),
+            'update_rows': len(validated.updates),
+            'unchanged_rows': validated.unchanged_count,
+            'error_count': len(validated.errors),
+            'errors': [str(e) for e in validated.errors[:50]],
+            'message': f'File valid dengan {validated.total_rows} baris data'
         })
 
     except Exception as e:
@@ -5459,54 +5071,77 @@ def api_cart_count():
         return jsonify({'count': 0})
 
 
+PRODUCT_API_MAX_IDS = 100
+PRODUCT_API_MAX_AGE = 60  # detik
+
+
+def product_api_dict(product, fields=None):
+    """Product.to_dict() + URL detail produk, opsional hanya field tertentu"""
+    data = product.to_dict()
+    # Generate product URL using slug if available, otherwise use ID
+    if product.slug:
+        data['url'] = url_for('product_detail', slug=product.slug, _external=False)
+    else:
+        data['url'] = url_for('product_detail_by_id', product_id=product.id,
+                              _external=False)
+    if fields:
+        data = {key: data[key] for key in data if key in fields or key == 'id'}
+    return data
+
+
+def parse_api_fields():
+    """Sparse fieldset dari ?fields=name,price (None = semua field)"""
+    fields = request.args.get('fields', '')
+    return {f.strip() for f in fields.split(',') if f.strip()} or None
+
+
+def conditional_json(payload):
+    """JSON response dengan strong ETag; 304 jika If-None-Match cocok"""
+    response = jsonify(payload)
+    response.set_etag(hashlib.sha1(response.get_data()).hexdigest())
+    response.cache_control.public = True
+    response.cache_control.max_age = PRODUCT_API_MAX_AGE
+    return response.make_conditional(request)
+
+
 # API endpoint for chat service to get product info
 @app.route('/api/products/<int:product_id>')
 def api_get_product(product_id):
     try:
-        product = models.Product.query.get_or_404(product_id)
-
-        # Ensure product has a slug
-        if not product.slug:
-            product.ensure_slug()
-            db.session.commit()
-
-        # Generate product URL using slug if available, otherwise use ID
-        if product.slug:
-            product_url = url_for('product_detail',
-                                  slug=product.slug,
-                                  _external=False)
-        else:
-            product_url = url_for('product_detail_by_id',
-                                  product_id=product.id,
-                                  _external=False)
-
-        return jsonify({
-            'id':
-            product.id,
-            'name':
-            product.name,
-            'slug':
-            product.slug,
-            'url':
-            product_url,
-            'price':
-            float(product.price),
-            'image_url':
-            product.image_url or '/static/images/placeholder.jpg',
-            'brand':
-            product.brand or '',
-            'description':
-            product.description or '',
-            'category':
-            product.category.name if product.category else '',
-            'is_active':
-            product.is_active
-        })
+        product = catalog_queries.with_listing_relations(
+            models.Product.query.filter_by(id=product_id)).first_or_404()
+        return conditional_json(product_api_dict(product, parse_api_fields()))
     except Exception as e:
         print(f"Error getting product {product_id}: {e}")
         return jsonify({'error': 'Product not found'}), 404
 
 
+@app.route('/api/products')
+def api_get_products():
+    """Bulk fetch: /api/products?ids=1,2,3&fields=name,price,url"""
+    try:
+        ids = [int(i) for i in request.args.get('ids', '').split(',') if i.strip()]
+    except ValueError:
+        return jsonify({'error': 'ids harus berupa daftar angka'}), 400
+    ids = list(dict.fromkeys(ids))
+    if not ids:
+        return jsonify({'error': 'Parameter ids wajib diisi'}), 400
+    if len(ids) > PRODUCT_API_MAX_IDS:
+        return jsonify({
+            'error': f'Maksimal {PRODUCT_API_MAX_IDS} produk per request'
+        }), 400
+
+    fields = parse_api_fields()
+    products = {
+        p.id: p for p in catalog_queries.with_listing_relations(
+            models.Product.query.filter(models.Product.id.in_(ids)))
+    }
+    return conditional_json({
+        'products': [product_api_dict(products[i], fields) for i in ids if i in products],
+        'missing': [i for i in ids if i not in products],
+    })
+
+
 # API endpoint for JWT token (for chat service)
 @app.route('/api/chat/token')
 @login_required
@@ -5895,7 +5530,7 @@ def print_professional_label(order_id):
     Standard ReportLab format, clean and readable
     """
     order = models.Order.query.get_or_404(order_id)
-    store_profile = models.StoreProfile.get_active_profile()
+    store_profile = models.StoreProfile.get_cached_profile()
 
     # Generate tracking number if not exists
     if not order.tracking_number:
@@ -6162,287 +5797,17 @@ def admin_create_invoice(order_id):
 @staff_required
 def admin_export_invoice_excel(invoice_id):
     """Export invoice to Excel dengan branding Hurtrock"""
-    try:
-        from openpyxl import Workbook
-        from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
-        from openpyxl.utils import get_column_letter
-        from openpyxl.drawing.image import Image as XLImage
-        import os
-        
-        invoice = models.Invoice.query.get_or_404(invoice_id)
-        order = invoice.order if invoice.order_id else None
-        
-        # Get store profile from database
-        store_profile = models.StoreProfile.get_active_profile()
-        
-        wb = Workbook()
-        ws = wb.active
-        ws.title = f"Invoice {invoice.invoice_number}"
-        
-        # Define colors (White background, Black text theme)
-        white_fill = PatternFill(start_color="FFFFFF", end_color="FFFFFF", fill_type="solid")
-        light_gray_fill = PatternFill(start_color="F5F5F5", end_color="F5F5F5", fill_type="solid")
-        
-        # Define fonts (Black text)
-        title_font = Font(name='Arial', size=20, bold=True, color="000000")
-        header_font = Font(name='Arial', size=12, bold=True, color="000000")
-        normal_font = Font(name='Arial', size=10, color="000000")
-        bold_font = Font(name='Arial', size=10, bold=True, color="000000")
-        
-        # Define alignment
-        center_align = Alignment(horizontal='center', vertical='center')
-        left_align = Alignment(horizontal='left', vertical='center')
-        right_align = Alignment(horizontal='right', vertical='center')
-        
-        # Define borders
-        thin_border = Border(
-            left=Side(style='thin'),
-            right=Side(style='thin'),
-            top=Side(style='thin'),
-            bottom=Side(style='thin')
-        )
-        
-        # Column widths
-        ws.column_dimensions['A'].width = 5
-        ws.column_dimensions['B'].width = 30
-        ws.column_dimensions['C'].width = 15
-        ws.column_dimensions['D'].width = 15
-        ws.column_dimensions['E'].width = 20
-        
-        # Header - Store Name "Hurtrock Music Store"
-        ws.merge_cells('A1:E1')
-        cell = ws['A1']
-        cell.value = "HURTROCK MUSIC STORE"
-        cell.font = title_font
-        cell.fill = white_fill
-        cell.alignment = center_align
-        ws.row_dimensions[1].height = 35
-        
-        # 5 rows spacing for store profile info
-        row = 2
-        
-        # Store Address
-        if store_profile and store_profile.store_address:
-            ws.merge_cells(f'A{row}:E{row}')
-            cell = ws[f'A{row}']
-            cell.value = f"Alamat: {store_profile.store_address}"
-            cell.font = normal_font
-            cell.alignment = center_align
-            ws.row_dimensions[row].height = 18
-            row += 1
-        
-        # Store Phone
-        if store_profile and store_profile.store_phone:
-            ws.merge_cells(f'A{row}:E{row}')
-            cell = ws[f'A{row}']
-            cell.value = f"Telp: {store_profile.store_phone}"
-            cell.font = normal_font
-            cell.alignment = center_align
-            ws.row_dimensions[row].height = 18
-            row += 1
-        
-        # Store Email
-        if store_profile and store_profile.store_email:
-            ws.merge_cells(f'A{row}:E{row}')
-            cell = ws[f'A{row}']
-            cell.value = f"Email: {store_profile.store_email}"
-            cell.font = normal_font
-            cell.alignment = center_align
-            ws.row_dimensions[row].height = 18
-            row += 1
-        
-        # Additional contact info if available
-        if store_profile and hasattr(store_profile, 'whatsapp_number') and store_profile.whatsapp_number:
-            ws.merge_cells(f'A{row}:E{row}')
-            cell = ws[f'A{row}']
-            cell.value = f"WhatsApp: {store_profile.whatsapp_number}"
-            cell.font = normal_font
-            cell.alignment = center_align
-            ws.row_dimensions[row].height = 18
-            row += 1
-        
-        # Website/Social media if available
-        if store_profile and hasattr(store_profile, 'website') and store_profile.website:
-            ws.merge_cells(f'A{row}:E{row}')
-            cell = ws[f'A{row}']
-            cell.value = f"Website: {store_profile.website}"
-            cell.font = normal_font
-            cell.alignment = center_align
-            ws.row_dimensions[row].height = 18
-            row += 1
-        
-        # Blank row
-        row += 1
-        ws.row_dimensions[row].height = 10
-        
-        # Invoice Title
-        row += 1
-        ws.merge_cells(f'A{row}:E{row}')
-        cell = ws[f'A{row}']
-        cell.value = "INVOICE"
-        cell.font = Font(name='Arial', size=16, bold=True, color="000000")
-        cell.alignment = center_align
-        ws.row_dimensions[row].height = 25
-        invoice_title_row = row
-        
-        # Invoice details
-        row += 2
-        ws[f'A{row}'] = "Invoice No:"
-        ws[f'A{row}'].font = bold_font
-        ws[f'B{row}'] = invoice.invoice_number
-        
-        row += 1
-        ws[f'A{row}'] = "Tanggal:"
-        ws[f'A{row}'].font = bold_font
-        ws[f'B{row}'] = invoice.created_at.strftime('%d-%m-%Y %H:%M')
-        
-        row += 1
-        ws[f'A{row}'] = "Status:"
-        ws[f'A{row}'].font = bold_font
-        ws[f'B{row}'] = invoice.status
-        
-        # Customer details
-        row += 2
-        ws.merge_cells(f'A{row}:E{row}')
-        cell = ws[f'A{row}']
-        cell.value = "CUSTOMER INFORMATION"
-        cell.font = header_font
-        cell.fill = light_gray_fill
-        cell.alignment = center_align
-        ws.row_dimensions[row].height = 25
-        
-        row += 1
-        ws[f'A{row}'] = "Nama:"
-        ws[f'A{row}'].font = bold_font
-        ws.merge_cells(f'B{row}:E{row}')
-        ws[f'B{row}'] = invoice.customer_name
-        
-        row += 1
-        ws[f'A{row}'] = "Email:"
-        ws[f'A{row}'].font = bold_font
-        ws.merge_cells(f'B{row}:E{row}')
-        ws[f'B{row}'] = invoice.customer_email or '-'
-        
-        row += 1
-        ws[f'A{row}'] = "Telepon:"
-        ws[f'A{row}'].font = bold_font
-        ws.merge_cells(f'B{row}:E{row}')
-        ws[f'B{row}'] = invoice.customer_phone or '-'
-        
-        row += 1
-        ws[f'A{row}'] = "Alamat:"
-        ws[f'A{row}'].font = bold_font
-        ws.merge_cells(f'B{row}:E{row}')
-        ws[f'B{row}'] = invoice.customer_address or '-'
-        
-        # Items table
-        row += 2
-        ws.merge_cells(f'A{row}:E{row}')
-        cell = ws[f'A{row}']
-        cell.value = "ITEMS"
-        cell.font = header_font
-        cell.fill = light_gray_fill
-        cell.alignment = center_align
-        ws.row_dimensions[row].height = 25
-        
-        # Table headers
-        row += 1
-        headers = ['No', 'Product', 'Qty', 'Price', 'Subtotal']
-        for col, header in enumerate(headers, start=1):
-            cell = ws.cell(row=row, column=col)
-            cell.value = header
-            cell.font = Font(name='Arial', size=10, bold=True, color="000000")
-            cell.fill = light_gray_fill
-            cell.alignment = center_align
-            cell.border = thin_border
-        
-        # Items data - support both order items and manual invoice items
-        if order and order.order_items:
-            # Invoice dari order
-            for idx, item in enumerate(order.order_items, start=1):
-                row += 1
-                ws.cell(row=row, column=1, value=idx).alignment = center_align
-                ws.cell(row=row, column=2, value=item.product.name).alignment = left_align
-                ws.cell(row=row, column=3, value=item.quantity).alignment = center_align
-                ws.cell(row=row, column=4, value=f"Rp {item.price:,.0f}").alignment = right_align
-                ws.cell(row=row, column=5, value=f"Rp {item.subtotal:,.0f}").alignment = right_align
-                
-                # Apply borders
-                for col in range(1, 6):
-                    ws.cell(row=row, column=col).border = thin_border
-        elif invoice.items:
-            # Invoice manual dengan custom items
-            for idx, item in enumerate(invoice.items, start=1):
-                row += 1
-                ws.cell(row=row, column=1, value=idx).alignment = center_align
-                ws.cell(row=row, column=2, value=item.item_name).alignment = left_align
-                ws.cell(row=row, column=3, value=item.quantity).alignment = center_align
-                ws.cell(row=row, column=4, value=f"Rp {item.unit_price:,.0f}").alignment = right_align
-                ws.cell(row=row, column=5, value=f"Rp {item.subtotal:,.0f}").alignment = right_align
-                
-                # Apply borders
-                for col in range(1, 6):
-                    ws.cell(row=row, column=col).border = thin_border
-        
-        # Totals
-        row += 2
-        ws.merge_cells(f'A{row}:D{row}')
-        cell = ws[f'A{row}']
-        cell.value = "Subtotal:"
-        cell.font = bold_font
-        cell.alignment = right_align
-        ws[f'E{row}'] = f"Rp {invoice.subtotal:,.0f}"
-        ws[f'E{row}'].alignment = right_align
-        ws[f'E{row}'].font = normal_font
-        
-        row += 1
-        ws.merge_cells(f'A{row}:D{row}')
-        cell = ws[f'A{row}']
-        cell.value = "Shipping Cost:"
-        cell.font = bold_font
-        cell.alignment = right_align
-        ws[f'E{row}'] = f"Rp {invoice.shipping_cost:,.0f}"
-        ws[f'E{row}'].alignment = right_align
-        ws[f'E{row}'].font = normal_font
-        
-        row += 1
-        ws.merge_cells(f'A{row}:D{row}')
-        cell = ws[f'A{row}']
-        cell.value = "TOTAL:"
-        cell.font = Font(name='Arial', size=12, bold=True, color="000000")
-        cell.fill = light_gray_fill
-        cell.alignment = right_align
-        cell_total = ws[f'E{row}']
-        cell_total.value = f"Rp {invoice.total_amount:,.0f}"
-        cell_total.font = Font(name='Arial', size=12, bold=True, color="000000")
-        cell_total.fill = light_gray_fill
-        cell_total.alignment = right_align
-        
-        # Footer
-        row += 3
-        ws.merge_cells(f'A{row}:E{row}')
-        cell = ws[f'A{row}']
-        cell.value = "Terima kasih atas kepercayaan Anda kepada Hurtrock Music Store!"
-        cell.font = Font(name='Arial', size=10, italic=True)
-        cell.alignment = center_align
-        
-        # Save to buffer
-        buffer = io.BytesIO()
-        wb.save(buffer)
-        buffer.seek(0)
-        
-        return send_file(
-            buffer,
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-            as_attachment=True,
-            download_name=f'invoice_{invoice.invoice_number}.xlsx'
-        )
-        
-    except Exception as e:
-        print(f"[ERROR] Failed to export invoice: {str(e)}")
-        flash(f'Gagal export invoice: {str(e)}', 'error')
+    invoice = models.Invoice.query.get_or_404(invoice_id)
+    if not sales_export.OPENPYXL_AVAILABLE:
+        flash(
+            'Package openpyxl diperlukan untuk export Excel. Silakan install terlebih dahulu.',
+            'error')
         return redirect(url_for('admin_invoices'))
 
+    job = export_job_queue.enqueue('invoice_excel', {'invoice_id': invoice.id},
+                                   current_user.id)
+    return redirect(url_for('export_job_status', job_id=job.id))
+
 
 @app.route('/admin/invoice/<int:invoice_id>/status', methods=['POST'])
 @login_required
@@ -6561,141 +5926,21 @@ def admin_create_manual_invoice():
 @login_required
 @admin_required
 def admin_analytics():
-    from sqlalchemy import func, case
     from decimal import Decimal
 
     try:
-        # Total penjualan hari ini (GABUNGAN ONLINE + KASIR)
-        today_start = datetime.utcnow().replace(hour=0,
-                                                minute=0,
-                                                second=0,
-                                                microsecond=0)
-        today_end = today_start + timedelta(days=1)
-
-        today_sales = db.session.query(
-            func.coalesce(func.sum(models.Order.total_amount), 0)).filter(
-                models.Order.created_at >= today_start, models.Order.created_at
-                < today_end,
-                models.Order.status.in_(['paid', 'shipped', 'delivered'
-                                         ])).scalar() or Decimal('0')
-
-        # Breakdown penjualan hari ini per sumber
-        today_online_sales = db.session.query(
-            func.coalesce(func.sum(models.Order.total_amount), 0)).filter(
-                models.Order.created_at >= today_start, models.Order.created_at
-                < today_end,
-                models.Order.status.in_(['paid', 'shipped', 'delivered']),
-                models.Order.source_type == 'online').scalar() or Decimal('0')
-
-        today_offline_sales = db.session.query(
-            func.coalesce(func.sum(models.Order.total_amount), 0)).filter(
-                models.Order.created_at >= today_start, models.Order.created_at
-                < today_end,
-                models.Order.status.in_(['paid', 'shipped', 'delivered']),
-                models.Order.source_type == 'offline').scalar() or Decimal('0')
-
-        # Total penjualan bulan ini (GABUNGAN ONLINE + KASIR)
-        now = datetime.utcnow()
-        month_start = now.replace(day=1,
-                                  hour=0,
-                                  minute=0,
-                                  second=0,
-                                  microsecond=0)
-        next_month = month_start + timedelta(days=32)
-        month_end = next_month.replace(day=1)
-
-        monthly_sales = db.session.query(
-            func.coalesce(func.sum(models.Order.total_amount), 0)).filter(
-                models.Order.created_at >= month_start, models.Order.created_at
-                < month_end,
-                models.Order.status.in_(['paid', 'shipped', 'delivered'
-                                         ])).scalar() or Decimal('0')
-
-        # Breakdown penjualan bulanan per sumber
-        monthly_online_sales = db.session.query(
-            func.coalesce(func.sum(models.Order.total_amount), 0)).filter(
-                models.Order.created_at >= month_start, models.Order.created_at
-                < month_end,
-                models.Order.status.in_(['paid', 'shipped', 'delivered']),
-                models.Order.source_type == 'online').scalar() or Decimal('0')
-
-        monthly_offline_sales = db.session.query(
-            func.coalesce(func.sum(models.Order.total_amount), 0)).filter(
-                models.Order.created_at >= month_start, models.Order.created_at
-                < month_end,
-                models.Order.status.in_(['paid', 'shipped', 'delivered']),
-                models.Order.source_type == 'offline').scalar() or Decimal('0')
-
-        # Produk terlaris (GABUNGAN ONLINE + KASIR) dengan explicit join
-        best_selling_products = db.session.query(
-            models.Product.name,
-            func.sum(models.OrderItem.quantity).label('total_sold'),
-            func.sum(case(
-                (models.Order.source_type == 'online', models.OrderItem.quantity),
-                else_=0
-            )).label('sold_online'),
-            func.sum(case(
-                (models.Order.source_type == 'offline', models.OrderItem.quantity),
-                else_=0
-            )).label('sold_offline')
-        ).select_from(models.Product)\
-        .join(models.OrderItem, models.OrderItem.product_id == models.Product.id)\
-        .join(models.Order, models.Order.id == models.OrderItem.order_id)\
-        .filter(
-            models.Order.status.in_(['paid', 'shipped', 'delivered'])
-        ).group_by(models.Product.id, models.Product.name).order_by(
-            func.sum(models.OrderItem.quantity).desc()
-        ).limit(10).all()
-
-        # Penjualan harian 7 hari terakhir
-        seven_days_ago = today_start - timedelta(days=6)
-        daily_sales_raw = db.session.query(
-            func.date_trunc('day', models.Order.created_at).label('date'),
-            func.coalesce(func.sum(models.Order.total_amount), 0).label('total'),
-            func.count(models.Order.id).label('orders_count')
-        ).filter(
-            models.Order.created_at >= seven_days_ago,
-            models.Order.status.in_(['paid', 'shipped', 'delivered'])
-        ).group_by(func.date_trunc('day', models.Order.created_at))\
-        .order_by(func.date_trunc('day', models.Order.created_at)).all()
-
-        daily_sales = [{
-            'date': row.date,
-            'total': row.total or 0,
-            'orders_count': row.orders_count or 0
-        } for row in daily_sales_raw]
-
-        # Pelanggan terbaik (Top 5 customers)
-        top_customers_raw = db.session.query(
-            models.User.name,
-            models.User.email,
-            func.count(models.Order.id).label('orders_count'),
-            func.coalesce(func.sum(models.Order.total_amount), 0).label('total_spent')
-        ).select_from(models.User)\
-        .join(models.Order, models.Order.user_id == models.User.id)\
-        .filter(
-            models.Order.status.in_(['paid', 'shipped', 'delivered']),
-            models.User.role == 'buyer'
-        ).group_by(models.User.id, models.User.name, models.User.email)\
-        .order_by(func.coalesce(func.sum(models.Order.total_amount), 0).desc()).limit(5).all()
-
-        top_customers = [{
-            'name': row.name,
-            'email': row.email,
-            'orders_count': row.orders_count or 0,
-            'total_spent': row.total_spent or 0
-        } for row in top_customers_raw]
+        totals = sales_analytics.sales_totals()
 
         return render_template('admin/analytics.html',
-                               today_sales=today_sales,
-                               today_online_sales=today_online_sales,
-                               today_offline_sales=today_offline_sales,
-                               monthly_sales=monthly_sales,
-                               monthly_online_sales=monthly_online_sales,
-                               monthly_offline_sales=monthly_offline_sales,
-                               best_selling_products=best_selling_products,
-                               daily_sales=daily_sales,
-                               top_customers=top_customers,
+                               today_sales=totals.today,
+                               today_online_sales=totals.today_online,
+                               today_offline_sales=totals.today_offline,
+                               monthly_sales=totals.month,
+                               monthly_online_sales=totals.month_online,
+                               monthly_offline_sales=totals.month_offline,
+                               best_selling_products=sales_analytics.best_sellers(limit=10),
+                               daily_sales=sales_analytics.daily_sales(days=7),
+                               top_customers=sales_analytics.top_customers(limit=5),
                                category_sales=[],
                                current_date=datetime.utcnow().date(),
                                datetime=datetime)
@@ -6932,25 +6177,18 @@ def admin_reset_password(user_id):
 @login_required
 @staff_required
 def export_sales(period):
-    try:
-        from openpyxl import Workbook
-        from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
-        from openpyxl.utils import get_column_letter
-    except ImportError:
+    export_format = request.args.get('format', 'xlsx')
+    if export_format not in sales_export.EXPORT_FORMATS:
+        flash('Format export tidak valid!', 'error')
+        return redirect(url_for('admin_analytics'))
+
+    package = sales_export.missing_export_package(export_format)
+    if package:
         flash(
-            'Package openpyxl diperlukan untuk export Excel. Silakan install terlebih dahulu.',
+            f'Package {package} diperlukan untuk export {export_format.upper()}. Silakan install terlebih dahulu.',
             'error')
         return redirect(url_for('admin_analytics'))
 
-    from sqlalchemy import func
-    import io
-    import calendar
-    from collections import defaultdict
-
-    # Get store profile
-    store_profile = models.StoreProfile.get_active_profile()
-    store_name = store_profile.store_name if store_profile else "Hurtrock Music Store"
-
     # Determine date range based on period
     today = datetime.utcnow().date()
     current_month = today.month
@@ -6997,502 +6235,70 @@ def export_sales(period):
         flash('Periode tidak valid!', 'error')
         return redirect(url_for('admin_analytics'))
 
-    # Get detailed sales data with products
-    start_datetime = datetime.combine(start_date, datetime.min.time())
-    end_datetime = datetime.combine(end_date, datetime.max.time())
-
-    try:
-        # Get all orders in period
-        orders = models.Order.query.filter(
-            models.Order.created_at >= start_datetime, models.Order.created_at
-            <= end_datetime,
-            models.Order.status.in_(['paid', 'shipped',
-                                     'delivered'])).order_by(
-                                         models.Order.created_at.desc()).all()
-
-        # Compile DETAILED product sales data dengan harga database
-        product_sales = defaultdict(
-            lambda: {
-                'product_name': '',
-                'product_price': 0,  # Harga dari database
-                'online_qty': 0,
-                'offline_qty': 0,
-                'online_amount': 0,
-                'offline_amount': 0,
-                'payment_methods': defaultdict(lambda: {
-                    'online': 0,
-                    'offline': 0
-                })  # Detail per channel
-            })
-
-        total_online = 0
-        total_offline = 0
-        payment_method_totals = defaultdict(lambda: {
-            'online': 0,
-            'offline': 0
-        })
-
-        for order in orders:
-            is_online = order.source_type == 'online'
-            # Standardize payment method names
-            payment_method_raw = (order.payment_method
-                                  or 'tidak diketahui').lower()
-
-            # Map payment methods dengan detail channel
-            if 'virtual' in payment_method_raw or 'va' in payment_method_raw or 'transfer' in payment_method_raw:
-                if is_online:
-                    payment_method = 'Virtual Account (Web/Marketplace)'
-                else:
-                    payment_method = 'Transfer Bank (Kasir)'
-            elif payment_method_raw == 'cash':
-                payment_method = 'Cash (Kasir Toko)'
-            elif payment_method_raw == 'debit':
-                payment_method = 'Debit Card (Kasir)'
-            elif payment_method_raw == 'qris':
-                if is_online:
-                    payment_method = 'QRIS (Web/Marketplace)'
-                else:
-                    payment_method = 'QRIS (Kasir Toko)'
-            elif 'ewallet' in payment_method_raw or 'wallet' in payment_method_raw:
-                payment_method = 'E-Wallet (OVO/Dana/LinkAja)'
-            elif 'credit' in payment_method_raw or 'kartu kredit' in payment_method_raw:
-                payment_method = 'Kartu Kredit'
-            else:
-                payment_method = payment_method_raw.title()
-
-            for item in order.order_items:
-                product_id = item.product_id
-                product_name = item.product.name if item.product else f"Product ID {product_id}"
-                product_price = float(
-                    item.product.price) if item.product else float(item.price)
-
-                product_sales[product_id]['product_name'] = product_name
-                product_sales[product_id][
-                    'product_price'] = product_price  # Harga dari database
+    job = export_job_queue.enqueue(sales_export.export_kind('sales_report', export_format), {
+        'period': period,
+        'period_text': period_text,
+        'start_date': start_date.isoformat(),
+        'end_date': end_date.isoformat(),
+    }, current_user.id)
+    return redirect(url_for('export_job_status', job_id=job.id))
+
+
+def get_export_job_or_404(job_id):
+    """Export job milik user yang sedang login (admin boleh melihat semua)"""
+    job = models.ExportJob.query.get_or_404(job_id)
+    if job.user_id != current_user.id and not current_user.is_admin:
+        abort(404)
+    return job
+
+
+def export_job_dict(job):
+    data = {
+        'id': job.id,
+        'kind': job.kind,
+        'status': job.status,
+        'progress': job.progress,
+        'message': job.message,
+        'result': job.result_dict,
+        'created_at': job.created_at.isoformat() if job.created_at else None,
+        'expires_at': job.expires_at.isoformat() if job.expires_at else None,
+        'download_url': None,
+    }
+    if job.status == 'done':
+        data['download_url'] = url_for('export_job_download', job_id=job.id)
+    return data
 
-                channel = 'online' if is_online else 'offline'
 
-                if is_online:
-                    product_sales[product_id]['online_qty'] += item.quantity
-                    product_sales[product_id]['online_amount'] += float(
-                        item.subtotal)
-                    total_online += float(item.subtotal)
-                else:
-                    product_sales[product_id]['offline_qty'] += item.quantity
-                    product_sales[product_id]['offline_amount'] += float(
-                        item.subtotal)
-                    total_offline += float(item.subtotal)
-
-                # Track payment per channel
-                product_sales[product_id]['payment_methods'][payment_method][
-                    channel] += float(item.subtotal)
-                payment_method_totals[payment_method][channel] += float(
-                    item.subtotal)
-
-    except Exception as query_error:
-        print(f"[ERROR] Query failed: {query_error}")
-        db.session.rollback()
-        flash(f'Error mengambil data penjualan: {str(query_error)}', 'error')
-        return redirect(url_for('admin_analytics'))
+@app.route('/exports/<int:job_id>')
+@login_required
+@staff_required
+def export_job_status(job_id):
+    """Halaman progress export; mem-poll api_export_job sampai file siap"""
+    job = get_export_job_or_404(job_id)
+    return render_template('admin/export_job.html', job=job,
+                           job_data=export_job_dict(job))
 
-    # Create Excel workbook
-    wb = Workbook()
-    ws = wb.active
-    ws.title = f"Laporan {period.title()}"
-
-    # Set page orientation to landscape
-    ws.page_setup.orientation = ws.ORIENTATION_LANDSCAPE
-    ws.page_setup.paperSize = ws.PAPERSIZE_A4
-
-    # Define styles - White Background, Black Text Theme
-    title_font = Font(name='Arial', size=18, bold=True, color='000000')
-    subtitle_font = Font(name='Arial', size=12, bold=True, color='000000')
-    normal_font = Font(name='Arial', size=10, color='000000')
-    table_header_font = Font(name='Arial', size=11, bold=True, color='000000')
-    subtotal_font = Font(name='Arial', size=11, bold=True, color='000000')
-    total_font = Font(name='Arial', size=12, bold=True, color='000000')
-
-    # White background, light gray for headers
-    white_fill = PatternFill(start_color='FFFFFF',
-                              end_color='FFFFFF',
-                              fill_type='solid')
-    light_gray_fill = PatternFill(start_color='F5F5F5',
-                                    end_color='F5F5F5',
-                                    fill_type='solid')
-
-    border = Border(left=Side(style='thin'),
-                    right=Side(style='thin'),
-                    top=Side(style='thin'),
-                    bottom=Side(style='thin'))
-
-    # Company Header - "Hurtrock Music Store"
-    ws.merge_cells('A1:I1')
-    company_cell = ws['A1']
-    company_cell.value = "HURTROCK MUSIC STORE"
-    company_cell.font = title_font
-    company_cell.fill = white_fill
-    company_cell.alignment = Alignment(horizontal='center', vertical='center')
-    ws.row_dimensions[1].height = 35
-
-    # Report Title
-    ws.merge_cells('A2:I2')
-    title_cell = ws['A2']
-    title_cell.value = "LAPORAN PENJUALAN DETAIL"
-    title_cell.font = Font(name='Arial', size=14, bold=True, color='000000')
-    title_cell.fill = white_fill
-    title_cell.alignment = Alignment(horizontal='center', vertical='center')
-    ws.row_dimensions[2].height = 22
-
-    # 5 rows for store profile info
-    row = 3
-    
-    # Store Address
-    if store_profile and store_profile.store_address:
-        ws.merge_cells(f'A{row}:I{row}')
-        cell = ws[f'A{row}']
-        cell.value = f"Alamat: {store_profile.store_address}"
-        cell.font = Font(name='Arial', size=9, color='000000')
-        cell.alignment = Alignment(horizontal='center', vertical='center')
-        ws.row_dimensions[row].height = 18
-        row += 1
-    
-    # Store Phone
-    if store_profile and store_profile.store_phone:
-        ws.merge_cells(f'A{row}:I{row}')
-        cell = ws[f'A{row}']
-        cell.value = f"Telp: {store_profile.store_phone}"
-        cell.font = Font(name='Arial', size=9, color='000000')
-        cell.alignment = Alignment(horizontal='center', vertical='center')
-        ws.row_dimensions[row].height = 18
-        row += 1
-    
-    # Store Email
-    if store_profile and store_profile.store_email:
-        ws.merge_cells(f'A{row}:I{row}')
-        cell = ws[f'A{row}']
-        cell.value = f"Email: {store_profile.store_email}"
-        cell.font = Font(name='Arial', size=9, color='000000')
-        cell.alignment = Alignment(horizontal='center', vertical='center')
-        ws.row_dimensions[row].height = 18
-        row += 1
-    
-    # WhatsApp if available
-    if store_profile and hasattr(store_profile, 'whatsapp_number') and store_profile.whatsapp_number:
-        ws.merge_cells(f'A{row}:I{row}')
-        cell = ws[f'A{row}']
-        cell.value = f"WhatsApp: {store_profile.whatsapp_number}"
-        cell.font = Font(name='Arial', size=9, color='000000')
-        cell.alignment = Alignment(horizontal='center', vertical='center')
-        ws.row_dimensions[row].height = 18
-        row += 1
-    
-    # Website if available
-    if store_profile and hasattr(store_profile, 'website') and store_profile.website:
-        ws.merge_cells(f'A{row}:I{row}')
-        cell = ws[f'A{row}']
-        cell.value = f"Website: {store_profile.website}"
-        cell.font = Font(name='Arial', size=9, color='000000')
-        cell.alignment = Alignment(horizontal='center', vertical='center')
-        ws.row_dimensions[row].height = 18
-        row += 1
-
-    # Period info
-    row += 1
-    ws.merge_cells(f'A{row}:I{row}')
-    period_cell = ws[f'A{row}']
-    period_cell.value = f"Periode: {period_text}"
-    period_cell.font = subtitle_font
-    period_cell.fill = light_gray_fill
-    period_cell.alignment = Alignment(horizontal='center', vertical='center')
-    ws.row_dimensions[row].height = 20
-
-    # Empty row
-    row += 1
-    ws.row_dimensions[row].height = 5
-
-    # Table headers - Light gray background, black text
-    row += 1
-    table_header_row = row
-    headers = [
-        'No', 'Nama Produk', 'Harga Satuan (DB)', 'Qty Online', 'Nilai Online',
-        'Qty Kasir', 'Nilai Kasir', 'Total Qty', 'Total Nilai',
-        'Metode Pembayaran (Detail per Channel)'
-    ]
-    for col, header in enumerate(headers, 1):
-        cell = ws.cell(row=row, column=col, value=header)
-        cell.font = table_header_font
-        cell.fill = light_gray_fill
-        cell.alignment = Alignment(horizontal='center',
-                                   vertical='center',
-                                   wrap_text=True)
-        cell.border = border
-    ws.row_dimensions[row].height = 35
-
-    # Data rows - Per product detail dengan harga database
-    row_num = row + 1
-    total_online_amount = 0
-    total_offline_amount = 0
-
-    for idx, (product_id, data) in enumerate(
-            sorted(
-                product_sales.items(),
-                key=lambda x: x[1]['online_amount'] + x[1]['offline_amount'],
-                reverse=True), 1):
-        # No
-        ws.cell(row=row_num, column=1, value=idx).border = border
-        ws.cell(row=row_num,
-                column=1).alignment = Alignment(horizontal='center')
-
-        # Product Name
-        ws.cell(row=row_num, column=2,
-                value=data['product_name']).border = border
-        ws.cell(row=row_num, column=2).alignment = Alignment(horizontal='left')
-        ws.cell(row=row_num, column=2).font = normal_font
-
-        # Harga Satuan (dari database) - Format IDR
-        price_cell = ws.cell(row=row_num, column=3)
-        price_cell.value = f"Rp {data['product_price']:,.0f}".replace(',', '.')
-        price_cell.border = border
-        price_cell.alignment = Alignment(horizontal='right')
-        price_cell.font = Font(name='Arial',
-                               size=10,
-                               bold=True,
-                               color='000000')
-
-        # Qty Online
-        ws.cell(row=row_num, column=4,
-                value=data['online_qty']).border = border
-        ws.cell(row=row_num,
-                column=4).alignment = Alignment(horizontal='center')
-
-        # Nilai Online - Format IDR
-        online_cell = ws.cell(row=row_num, column=5)
-        online_cell.value = f"Rp {data['online_amount']:,.0f}".replace(
-            ',', '.')
-        online_cell.border = border
-        online_cell.alignment = Alignment(horizontal='right')
-
-        # Qty Kasir
-        ws.cell(row=row_num, column=6,
-                value=data['offline_qty']).border = border
-        ws.cell(row=row_num,
-                column=6).alignment = Alignment(horizontal='center')
-
-        # Nilai Kasir - Format IDR
-        offline_cell = ws.cell(row=row_num, column=7)
-        offline_cell.value = f"Rp {data['offline_amount']:,.0f}".replace(
-            ',', '.')
-        offline_cell.border = border
-        offline_cell.alignment = Alignment(horizontal='right')
-
-        # Total Qty
-        total_qty = data['online_qty'] + data['offline_qty']
-        ws.cell(row=row_num, column=8, value=total_qty).border = border
-        ws.cell(row=row_num,
-                column=8).alignment = Alignment(horizontal='center')
-        ws.cell(row=row_num, column=8).font = Font(name='Arial',
-                                                   size=10,
-                                                   bold=True)
-
-        # Total Nilai - Format IDR
-        total_amount = data['online_amount'] + data['offline_amount']
-        total_cell = ws.cell(row=row_num, column=9)
-        total_cell.value = f"Rp {total_amount:,.0f}".replace(',', '.')
-        total_cell.border = border
-        total_cell.alignment = Alignment(horizontal='right')
-        total_cell.font = Font(name='Arial', size=10, bold=True)
-
-        # Payment Methods - DETAIL PER CHANNEL
-        payment_details = []
-        for method, channels in sorted(
-                data['payment_methods'].items(),
-                key=lambda x: x[1]['online'] + x[1]['offline'],
-                reverse=True):
-            if channels['online'] > 0:
-                payment_details.append(
-                    f"{method} [Online]: Rp {channels['online']:,.0f}".replace(
-                        ',', '.'))
-            if channels['offline'] > 0:
-                payment_details.append(
-                    f"{method} [Kasir]: Rp {channels['offline']:,.0f}".replace(
-                        ',', '.'))
-
-        payment_text = '; '.join(payment_details) if payment_details else '-'
-        ws.cell(row=row_num, column=10, value=payment_text).border = border
-        ws.cell(row=row_num,
-                column=10).alignment = Alignment(horizontal='left',
-                                                 wrap_text=True)
-        ws.cell(row=row_num, column=10).font = Font(name='Arial', size=9)
-
-        total_online_amount += data['online_amount']
-        total_offline_amount += data['offline_amount']
-        row_num += 1
-
-    # Summary Section - Total Online & Offline
-    row_num += 1
-    ws.merge_cells(f'A{row_num}:C{row_num}')
-    ws.cell(row=row_num, column=1,
-            value="TOTAL PENJUALAN ONLINE").font = subtotal_font
-    ws.cell(row=row_num, column=1).fill = light_gray_fill
-    ws.cell(row=row_num, column=1).alignment = Alignment(horizontal='right')
-    ws.cell(row=row_num, column=1).border = border
-
-    ws.merge_cells(f'D{row_num}:E{row_num}')
-    online_total_cell = ws.cell(row=row_num, column=4)
-    online_total_cell.value = f"Rp {total_online_amount:,.0f}".replace(
-        ',', '.')
-    online_total_cell.font = subtotal_font
-    online_total_cell.fill = light_gray_fill
-    online_total_cell.alignment = Alignment(horizontal='right')
-    online_total_cell.border = border
-
-    row_num += 1
-    ws.merge_cells(f'A{row_num}:C{row_num}')
-    ws.cell(row=row_num, column=1,
-            value="TOTAL PENJUALAN KASIR").font = subtotal_font
-    ws.cell(row=row_num, column=1).fill = light_gray_fill
-    ws.cell(row=row_num, column=1).alignment = Alignment(horizontal='right')
-    ws.cell(row=row_num, column=1).border = border
-
-    ws.merge_cells(f'D{row_num}:E{row_num}')
-    offline_total_cell = ws.cell(row=row_num, column=4)
-    offline_total_cell.value = f"Rp {total_offline_amount:,.0f}".replace(
-        ',', '.')
-    offline_total_cell.font = subtotal_font
-    offline_total_cell.fill = light_gray_fill
-    offline_total_cell.alignment = Alignment(horizontal='right')
-    offline_total_cell.border = border
-
-    # Grand Total
-    row_num += 1
-    ws.merge_cells(f'A{row_num}:C{row_num}')
-    ws.cell(row=row_num, column=1, value="GRAND TOTAL").font = total_font
-    ws.cell(row=row_num, column=1).fill = light_gray_fill
-    ws.cell(row=row_num, column=1).alignment = Alignment(horizontal='right')
-    ws.cell(row=row_num, column=1).border = border
-
-    ws.merge_cells(f'D{row_num}:E{row_num}')
-    grand_total = total_online_amount + total_offline_amount
-    grand_total_cell = ws.cell(row=row_num, column=4)
-    grand_total_cell.value = f"Rp {grand_total:,.0f}".replace(',', '.')
-    grand_total_cell.font = total_font
-    grand_total_cell.fill = light_gray_fill
-    grand_total_cell.alignment = Alignment(horizontal='right')
-    grand_total_cell.border = border
-
-    # Payment Method Breakdown - DETAIL PER CHANNEL
-    row_num += 2
-    ws.merge_cells(f'A{row_num}:J{row_num}')
-    ws.cell(
-        row=row_num,
-        column=1,
-        value=
-        "BREAKDOWN METODE PEMBAYARAN (Online Web/Marketplace & Offline Kasir Toko)"
-    ).font = subtitle_font
-    ws.cell(row=row_num, column=1).fill = light_gray_fill
-    ws.cell(row=row_num, column=1).alignment = Alignment(horizontal='center')
-    ws.cell(row=row_num, column=1).border = border
-
-    row_num += 1
-    # Header untuk breakdown
-    ws.merge_cells(f'A{row_num}:D{row_num}')
-    ws.cell(row=row_num, column=1,
-            value="Metode Pembayaran").font = Font(name='Arial',
-                                                   size=10,
-                                                   bold=True)
-    ws.cell(row=row_num, column=1).fill = light_gray_fill
-    ws.cell(row=row_num, column=1).alignment = Alignment(horizontal='center')
-    ws.cell(row=row_num, column=1).border = border
-
-    ws.merge_cells(f'E{row_num}:F{row_num}')
-    ws.cell(row=row_num, column=5,
-            value="Online (Web/Marketplace)").font = Font(name='Arial',
-                                                          size=10,
-                                                          bold=True)
-    ws.cell(row=row_num, column=5).fill = light_gray_fill
-    ws.cell(row=row_num, column=5).alignment = Alignment(horizontal='center')
-    ws.cell(row=row_num, column=5).border = border
-
-    ws.merge_cells(f'G{row_num}:H{row_num}')
-    ws.cell(row=row_num, column=7,
-            value="Offline (Kasir Toko)").font = Font(name='Arial',
-                                                      size=10,
-                                                      bold=True)
-    ws.cell(row=row_num, column=7).fill = light_gray_fill
-    ws.cell(row=row_num, column=7).alignment = Alignment(horizontal='center')
-    ws.cell(row=row_num, column=7).border = border
-
-    ws.merge_cells(f'I{row_num}:J{row_num}')
-    ws.cell(row=row_num, column=9, value="Total").font = Font(name='Arial',
-                                                              size=10,
-                                                              bold=True)
-    ws.cell(row=row_num, column=9).fill = light_gray_fill
-    ws.cell(row=row_num, column=9).alignment = Alignment(horizontal='center')
-    ws.cell(row=row_num, column=9).border = border
-
-    row_num += 1
-    for method, channels in sorted(
-            payment_method_totals.items(),
-            key=lambda x: x[1]['online'] + x[1]['offline'],
-            reverse=True):
-        ws.merge_cells(f'A{row_num}:D{row_num}')
-        ws.cell(row=row_num, column=1, value=method).border = border
-        ws.cell(row=row_num, column=1).alignment = Alignment(horizontal='left')
-        ws.cell(row=row_num, column=1).font = normal_font
-
-        # Online amount - Format IDR
-        ws.merge_cells(f'E{row_num}:F{row_num}')
-        online_payment_cell = ws.cell(row=row_num, column=5)
-        online_payment_cell.value = f"Rp {channels['online']:,.0f}".replace(
-            ',', '.')
-        online_payment_cell.border = border
-        online_payment_cell.alignment = Alignment(horizontal='right')
-
-        # Offline amount - Format IDR
-        ws.merge_cells(f'G{row_num}:H{row_num}')
-        offline_payment_cell = ws.cell(row=row_num, column=7)
-        offline_payment_cell.value = f"Rp {channels['offline']:,.0f}".replace(
-            ',', '.')
-        offline_payment_cell.border = border
-        offline_payment_cell.alignment = Alignment(horizontal='right')
-
-        # Total - Format IDR
-        total_method = channels['online'] + channels['offline']
-        ws.merge_cells(f'I{row_num}:J{row_num}')
-        total_payment_cell = ws.cell(row=row_num, column=9)
-        total_payment_cell.value = f"Rp {total_method:,.0f}".replace(',', '.')
-        total_payment_cell.border = border
-        total_payment_cell.alignment = Alignment(horizontal='right')
-        total_payment_cell.font = Font(name='Arial', size=10, bold=True)
-
-        row_num += 1
-
-    # Set column widths
-    column_widths = [5, 30, 15, 10, 15, 10, 15, 10, 15, 40]
-    for i, width in enumerate(column_widths, 1):
-        ws.column_dimensions[get_column_letter(i)].width = width
 
-    # Footer
-    row_num += 2
-    ws.merge_cells(f'A{row_num}:I{row_num}')
-    footer_cell = ws[f'A{row_num}']
-    footer_cell.value = f"Dicetak pada: {datetime.utcnow().strftime('%d %B %Y %H:%M:%S')} WIB"
-    footer_cell.font = Font(name='Arial', size=9, italic=True, color='666666')
-    footer_cell.alignment = Alignment(horizontal='center')
-
-    # Save to buffer
-    buffer = io.BytesIO()
-    wb.save(buffer)
-    buffer.seek(0)
+@app.route('/api/exports/<int:job_id>')
+@login_required
+@staff_required
+def api_export_job(job_id):
+    return jsonify(export_job_dict(get_export_job_or_404(job_id)))
 
-    filename = f'laporan_penjualan_{period}_{datetime.utcnow().strftime("%Y%m%d")}.xlsx'
 
-    return send_file(
-        buffer,
-        as_attachment=True,
-        download_name=filename,
-        mimetype=
-        'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+@app.route('/exports/<int:job_id>/download')
+@login_required
+@staff_required
+def export_job_download(job_id):
+    job = get_export_job_or_404(job_id)
+    if job.status != 'done':
+        flash('Export belum selesai.', 'warning')
+        return redirect(url_for('export_job_status', job_id=job.id))
+    if not job.file_path or not os.path.exists(job.file_path):
+        flash('File export sudah kedaluwarsa, silakan export ulang.', 'error')
+        return redirect(url_for('admin_dashboard'))
+    return send_file(job.file_path, as_attachment=True,
+                     download_name=job.download_name, mimetype=job.mimetype)
 
 
 @app.route('/admin/order/<int:order_id>/print_address')
@@ -7500,7 +6306,7 @@ def export_sales(period):
 @staff_required
 def print_order_address(order_id):
     order = models.Order.query.get_or_404(order_id)
-    store_profile = models.StoreProfile.get_active_profile()
+    store_profile = models.StoreProfile.get_cached_profile()
 
     # Create PDF alamat pengiriman thermal (120mm width)
     buffer = io.BytesIO()
@@ -8127,6 +6933,7 @@ def admin_store_profile():
             logo_url='/static/logo_perusahaan/default_music_icon.jpg')
         db.session.add(profile)
         db.session.commit()
+        models.StoreProfile.invalidate_cache()
 
     return render_template('admin/store_profile.html', profile=profile)
 
@@ -8199,6 +7006,7 @@ def admin_update_store_profile():
 
         profile.updated_at = models.get_utc_time()
         db.session.commit()
+        models.StoreProfile.invalidate_cache()
 
         flash('Profil toko berhasil diperbarui!', 'success')
     except Exception as e:
@@ -0,0 +1,192 @@
+"""
+Media serving untuk Hurtrock Music Store
+Satu jalur pengiriman file untuk media chat (/uploads/medias_sends,
+/static/chat_media), thumbnail /img dan file static:
+
+- conditional GET: ETag + Last-Modified, If-None-Match/If-Modified-Since -> 304
+- byte range (206) agar video chat (mp4, webm, mov) bisa di-seek tanpa
+  mengunduh seluruh file
+- MEDIA_OFFLOAD=nginx: respons kosong dengan X-Accel-Redirect ke
+  MEDIA_ACCEL_PREFIX/<path relatif root app>; nginx yang mengirim file dan
+  menangani ETag/Range. MEDIA_OFFLOAD=sendfile: header X-Sendfile (Apache
+  mod_xsendfile / lighttpd) dengan path absolut.
+- CSS/JS di static/: kirim <file>.br / <file>.gz hasil
+  `flask --app main compress-static` jika browser menerimanya dan file
+  terkompresi tidak lebih lama dari aslinya.
+"""
+
+import gzip
+import mimetypes
+import os
+
+from flask import request, send_file
+from werkzeug.exceptions import NotFound
+from werkzeug.security import safe_join
+
+from image_pipeline import write_atomic
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+OFFLOAD_MODES = ('', 'nginx', 'sendfile')
+DEFAULT_ACCEL_PREFIX = '/_protected'
+PRECOMPRESSED_EXTENSIONS = ('.css', '.js')
+# (Content-Encoding, akhiran file) urut prioritas
+PRECOMPRESSED_ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+# Tidak selalu ada di /etc/mime.types; tanpa ini video diputar sebagai octet-stream
+MEDIA_TYPES = {
+    '.mp4': 'video/mp4',
+    '.webm': 'video/webm',
+    '.mov': 'video/quicktime',
+    '.webp': 'image/webp',
+    '.avif': 'image/avif',
+}
+
+
+def _send_file(path, **kwargs):
+    try:
+        return send_file(path, conditional=True, **kwargs)
+    except FileNotFoundError:
+        raise NotFound()
+
+
+class MediaServer:
+    """Kirim file dengan conditional GET, Range dan offload ke web server"""
+
+    def __init__(self):
+        self.app = None
+        self.offload = ''
+        self.accel_prefix = DEFAULT_ACCEL_PREFIX
+
+    def init_app(self, app):
+        self.app = app
+        self.offload = app.config.get('MEDIA_OFFLOAD', '')
+        if self.offload not in OFFLOAD_MODES:
+            raise ValueError(f"MEDIA_OFFLOAD harus salah satu dari {OFFLOAD_MODES}")
+        self.accel_prefix = app.config.get('MEDIA_ACCEL_PREFIX',
+                                           DEFAULT_ACCEL_PREFIX).rstrip('/')
+        for extension, mimetype in MEDIA_TYPES.items():
+            mimetypes.add_type(mimetype, extension)
+        # Ganti view endpoint 'static' bawaan Flask agar file .br/.gz dipakai
+        app.view_functions['static'] = self.send_static
+
+    def resolve(self, directory, filename):
+        """Path absolut filename di directory, NotFound jika keluar dari directory"""
+        path = safe_join(os.path.join(self.app.root_path, directory), filename)
+        if path is None:
+            raise NotFound()
+        return path
+
+    def send(self, path, max_age, etag=True, immutable=False, cors=False):
+        """
+        Response untuk file path, NotFound jika file tidak ada (satu kali
+        stat, tanpa os.path.exists terpisah).
+        """
+        response = self._offload(path) if self.offload else None
+        if response is None:
+            # conditional=True: 304 untuk If-None-Match/If-Modified-Since, 206 untuk Range
+            response = _send_file(path, etag=etag, max_age=max_age)
+        response.headers['Cache-Control'] = (
+            f"public, max-age={max_age}{', immutable' if immutable else ''}")
+        if cors:
+            response.headers['Access-Control-Allow-Origin'] = '*'
+            response.headers['Access-Control-Allow-Methods'] = 'GET'
+            response.headers['Access-Control-Allow-Headers'] = 'Content-Type'
+        return response
+
+    def _offload(self, path):
+        if not os.path.isfile(path):
+            raise NotFound()
+        mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        response = self.app.response_class(mimetype=mimetype)
+        if self.offload == 'sendfile':
+            response.headers['X-Sendfile'] = os.path.abspath(path)
+            return response
+        relative = os.path.relpath(os.path.abspath(path), self.app.root_path)
+        if relative.startswith('..'):
+            return None  # Di luar root app (mis. IMAGE_CACHE_FOLDER absolut): lewat Flask
+        response.headers['X-Accel-Redirect'] = (
+            f"{self.accel_prefix}/{relative.replace(os.sep, '/')}")
+        return response
+
+    # ===========================
+    # STATIC (PRECOMPRESSED)
+    # ===========================
+
+    def send_static(self, filename):
+        """View endpoint 'static': seperti Flask, plus varian .br/.gz untuk CSS/JS"""
+        app = self.app
+        max_age = app.get_send_file_max_age(filename)
+        path = safe_join(app.static_folder, filename)
+        if path is None:
+            raise NotFound()
+        if not filename.endswith(PRECOMPRESSED_EXTENSIONS):
+            return _send_file(path, max_age=max_age)
+
+        encoded = self._precompressed(path)
+        if encoded:
+            encoding, encoded_path = encoded
+            response = _send_file(encoded_path, mimetype=mimetypes.guess_type(path)[0],
+                                  max_age=max_age)
+            response.headers['Content-Encoding'] = encoding
+        else:
+            response = _send_file(path, max_age=max_age)
+        response.vary.add('Accept-Encoding')
+        return response
+
+    def _precompressed(self, path):
+        """(encoding, path file terkompresi) yang diterima browser, atau None"""
+        try:
+            original_mtime = os.stat(path).st_mtime
+        except OSError:
+            return None
+        for encoding, suffix in PRECOMPRESSED_ENCODINGS:
+            if not request.accept_encodings.quality(encoding):
+                continue
+            try:
+                if os.stat(path + suffix).st_mtime >= original_mtime:
+                    return encoding, path + suffix
+            except OSError:
+                continue
+        return None
+
+    def compress_static(self, force=False):
+        """
+        Tulis <file>.gz (dan <file>.br jika package brotli terpasang) untuk
+        CSS/JS di static/. Mengembalikan jumlah file yang ditulis.
+        """
+        encoders = [('.gz', lambda data: gzip.compress(data, compresslevel=9, mtime=0))]
+        if BROTLI_AVAILABLE:
+            encoders.insert(0, ('.br', lambda data: brotli.compress(data, quality=11)))
+        written = 0
+        for directory, _, names in os.walk(self.app.static_folder):
+            for name in names:
+                if not name.endswith(PRECOMPRESSED_EXTENSIONS):
+                    continue
+                path = os.path.join(directory, name)
+                original_mtime = os.stat(path).st_mtime
+                data = None
+                for suffix, encode in encoders:
+                    target = path + suffix
+                    if (not force and os.path.exists(target)
+                            and os.stat(target).st_mtime >= original_mtime):
+                        continue
+                    if data is None:
+                        with open(path, 'rb') as source:
+                            data = source.read()
+                    encoded = encode(data)
+                    if len(encoded) >= len(data):
+                        # Tidak lebih kecil: jangan sajikan versi lama
+                        if os.path.exists(target):
+                            os.remove(target)
+                        continue
+                    write_atomic(target, encoded)
+                    os.chmod(target, 0o644)  # juga dibaca nginx (gzip_static)
+                    written += 1
+        return written
+
+
+media_server = MediaServer()
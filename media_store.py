@@ -0,0 +1,357 @@
+"""
+Media store untuk Hurtrock Music Store
+Upload foto produk dan media chat disimpan dengan nama dari hash isinya
+(BLAKE2b) di path bertingkat di dalam folder upload yang sudah ada:
+
+    static/public/produk_images/3f/a2/3fa2...c1.jpg
+    uploads/medias_sends/9b/04/9b04...7e.mp4
+
+File yang sama diupload dua kali hanya disimpan (dan dikompres/dibuatkan
+turunan) sekali, dan URL-nya sama sehingga cache browser, CDN dan /img ikut
+terpakai bersama. Hash dihitung dari isi upload asli; file yang tersimpan
+boleh sudah dikompres.
+
+Jumlah referensi per file disimpan di media_objects (ProductImage.image_url,
+Product.image_url dan ChatMessage.media_url), diperbarui incremental di
+after_flush. Pesan chat juga ditulis oleh layanan chat Django, jadi
+`flask --app main gc-media` menghitung ulang semua referensi sebelum
+menghapus file yang tidak lagi dipakai (lebih tua dari masa tenggang, agar
+upload yang belum sempat direferensikan tidak ikut terhapus).
+
+Waktu upload terakhir disimpan di media_objects.uploaded_at, bukan di mtime
+file: mtime dipakai cache key /img dan ETag, jadi upload ulang isi yang sama
+tidak boleh mengubahnya.
+"""
+
+import hashlib
+import os
+import re
+import tempfile
+import time
+from collections import Counter
+from itertools import chain
+from datetime import timezone
+from typing import NamedTuple
+
+from sqlalchemy import event, func, inspect
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+import models
+from database import db, upsert_insert
+from image_pipeline import VARIANT_FORMATS, VARIANT_WIDTHS, remove_variants, variant_name
+
+HASH_DIGEST_SIZE = 20  # byte BLAKE2b, 40 karakter hex
+CHUNK_SIZE = 64 * 1024
+EXTENSION_ALIASES = {'jpeg': 'jpg'}
+# Upload -> commit baris yang mereferensikannya; release() tidak menghapus file semuda ini
+PENDING_GRACE_SECONDS = 3600
+# Upload chat baru direferensikan saat pesannya dikirim lewat layanan chat
+GC_GRACE_SECONDS = 24 * 3600
+# mark_uploaded tidak menunggu baris yang sedang dikunci transaksi request
+UPLOAD_MARK_LOCK_TIMEOUT = '5s'
+SHARD = re.compile(r'^[0-9a-f]{2}$')
+STORED_NAME = re.compile(r'^[0-9a-f]{%d}\.[a-z0-9]+$' % (HASH_DIGEST_SIZE * 2))
+# Kolom yang menyimpan URL file media store
+REFERENCES = (
+    (models.ProductImage, 'image_url'),
+    (models.Product, 'image_url'),
+    (models.ChatMessage, 'media_url'),
+)
+
+
+class StoredMedia(NamedTuple):
+    url: str
+    path: str
+    content_hash: str
+    size: int
+    created: bool  # False: isi yang sama sudah tersimpan, file lama dipakai
+
+
+class MediaStore:
+    """File content-addressed di bawah satu folder upload"""
+
+    def __init__(self, folder_key, url_prefix):
+        self.folder_key = folder_key
+        self.url_prefix = url_prefix
+        self.root = None
+
+    def init_app(self, app):
+        self.root = os.path.join(app.root_path, app.config[self.folder_key])
+
+    def owns(self, url):
+        """True jika url menunjuk file yang dikelola store ini"""
+        if not url or not url.startswith(self.url_prefix + '/'):
+            return False
+        parts = url[len(self.url_prefix) + 1:].split('/')
+        return (len(parts) == 3 and STORED_NAME.match(parts[2]) is not None
+                and parts[0] == parts[2][:2] and parts[1] == parts[2][2:4])
+
+    def path_for(self, url):
+        return os.path.join(self.root, *url[len(self.url_prefix) + 1:].split('/'))
+
+    def url_for(self, path):
+        relative = os.path.relpath(path, self.root).replace(os.sep, '/')
+        return f'{self.url_prefix}/{relative}'
+
+    def save(self, fileobj, filename):
+        """
+        Simpan isi fileobj (file-like / FileStorage, dibaca dari posisi saat ini)
+        dengan ekstensi dari filename. Isi yang sudah ada tidak ditulis ulang.
+        """
+        extension = filename.rsplit('.', 1)[1].lower() if '.' in filename else 'bin'
+        extension = EXTENSION_ALIASES.get(extension, extension)
+        os.makedirs(self.root, exist_ok=True)
+
+        digest = hashlib.blake2b(digest_size=HASH_DIGEST_SIZE)
+        size = 0
+        fd, partial = tempfile.mkstemp(dir=self.root, prefix='.', suffix='.part')
+        try:
+            with os.fdopen(fd, 'wb') as output:
+                while True:
+                    chunk = fileobj.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    digest.update(chunk)
+                    output.write(chunk)
+                    size += len(chunk)
+            content_hash = digest.hexdigest()
+            path = os.path.join(self.root, content_hash[:2], content_hash[2:4],
+                                f'{content_hash}.{extension}')
+            if os.path.exists(path):
+                # Sudah ada: file tidak disentuh (mtime = cache key /img dan ETag)
+                created = False
+                os.remove(partial)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(partial, path)
+                created = True
+        except BaseException:
+            if os.path.exists(partial):
+                os.remove(partial)
+            raise
+        url = self.url_for(path)
+        mark_uploaded(url)
+        return StoredMedia(url, path, content_hash, size, created)
+
+    def files(self):
+        """os.DirEntry semua file yang tersimpan di store"""
+        if not os.path.isdir(self.root):
+            return
+        for first in os.scandir(self.root):
+            if not (first.is_dir() and SHARD.match(first.name)):
+                continue
+            for second in os.scandir(first.path):
+                if not (second.is_dir() and SHARD.match(second.name)):
+                    continue
+                for entry in os.scandir(second.path):
+                    if entry.is_file() and STORED_NAME.match(entry.name):
+                        yield entry
+
+    def remove(self, path, manifest=None):
+        """Hapus file beserta turunan responsifnya (semua kemungkinan jika manifest tidak ada)"""
+        if manifest is None:
+            manifest = {'formats': {fmt: {str(width): variant_name(path, width, fmt)
+                                          for width in VARIANT_WIDTHS}
+                                    for fmt in VARIANT_FORMATS}}
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        remove_variants(path, manifest)
+
+    def release(self, url, manifest=None):
+        """
+        Hapus file url jika tidak lagi direferensikan. Dipanggil setelah commit
+        yang menghapus referensinya; file yang baru saja diupload diserahkan ke gc.
+        """
+        if not self.owns(url) or reference_count(url) > 0:
+            return False
+        path = self.path_for(url)
+        try:
+            uploaded = last_uploaded(os.stat(path), uploaded_times([url]).get(url))
+        except FileNotFoundError:
+            return False
+        if time.time() - uploaded < PENDING_GRACE_SECONDS:
+            return False
+        self.remove(path, manifest)
+        print(f"[INFO] Media released: {url}")
+        return True
+
+
+product_media = MediaStore('UPLOAD_FOLDER', '/static/public/produk_images')
+chat_media = MediaStore('UPLOADS_MEDIA_FOLDER', '/uploads/medias_sends')
+MEDIA_STORES = (product_media, chat_media)
+
+
+def store_for(url):
+    return next((store for store in MEDIA_STORES if store.owns(url)), None)
+
+
+def reference_count(url):
+    return db.session.query(models.MediaObject.ref_count).filter_by(url=url).scalar() or 0
+
+
+# ===========================
+# WAKTU UPLOAD (MASA TENGGANG)
+# ===========================
+
+def mark_uploaded(url):
+    """
+    Catat uploaded_at url di koneksi terpisah (langsung commit): upload chat
+    baru direferensikan di request lain, jadi tidak ikut transaksi request ini.
+    """
+    table = models.MediaObject.__table__
+    now = models.get_utc_time()
+    try:
+        with db.engine.begin() as connection:
+            if connection.dialect.name == 'postgresql':
+                connection.exec_driver_sql(
+                    f"SET LOCAL lock_timeout = '{UPLOAD_MARK_LOCK_TIMEOUT}'")
+            stmt = upsert_insert(connection, table)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[table.c.url],
+                set_={'uploaded_at': stmt.excluded.uploaded_at})
+            connection.execute(stmt, {'url': url, 'ref_count': 0, 'created_at': now,
+                                      'updated_at': now, 'uploaded_at': now})
+    except SQLAlchemyError as e:
+        # Baris dikunci transaksi request ini = url sudah direferensikan di sana
+        print(f"[WARNING] Failed to record upload time for {url}: {e}")
+
+
+def uploaded_times(urls=None):
+    """{url: uploaded_at} dari media_objects (semua baris jika urls None)"""
+    query = db.session.query(models.MediaObject.url, models.MediaObject.uploaded_at)\
+        .filter(models.MediaObject.uploaded_at.isnot(None))
+    if urls is not None:
+        query = query.filter(models.MediaObject.url.in_(list(urls)))
+    return dict(query)
+
+
+def last_uploaded(stat, uploaded_at):
+    """Epoch upload terakhir: uploaded_at, atau mtime file (dibuat) jika lebih baru"""
+    if uploaded_at is None:
+        return stat.st_mtime
+    if uploaded_at.tzinfo is None:
+        uploaded_at = uploaded_at.replace(tzinfo=timezone.utc)
+    return max(stat.st_mtime, uploaded_at.timestamp())
+
+
+# ===========================
+# REFERENCE COUNTING
+# ===========================
+
+def _value(obj, key, old):
+    """Nilai atribut sebelum (old=True) atau sesudah flush"""
+    history = inspect(obj).attrs[key].history
+    if old and history.added:
+        return history.deleted[0] if history.deleted else None
+    return getattr(obj, key)
+
+
+def _collect_references(session, flush_context):
+    """Selisih referensi dari baris yang menyimpan URL media store (after_flush)"""
+    changed = list(chain(session.new, session.dirty, session.deleted))
+    new = set(session.new)
+    # Termasuk ProductImage / ChatMessage yang dihapus sebagai orphan (dilepas
+    # dari product.images / room.messages): tidak ada di session.deleted
+    deleted = {obj for obj in changed if flush_context.is_deleted(inspect(obj))}
+    deltas = Counter()
+    for obj in changed:
+        for model, key in REFERENCES:
+            if not isinstance(obj, model):
+                continue
+            before = None if obj in new else _value(obj, key, old=True)
+            after = None if obj in deleted else _value(obj, key, old=False)
+            if before == after:
+                continue
+            if store_for(before):
+                deltas[before] -= 1
+            if store_for(after):
+                deltas[after] += 1
+
+    rows = [{'url': url, 'ref_count': count} for url, count in deltas.items() if count]
+    if rows:
+        apply_deltas(session.connection(), rows)
+
+
+def apply_deltas(connection, rows):
+    """INSERT ... ON CONFLICT (url) DO UPDATE SET ref_count = ref_count + excluded.ref_count"""
+    table = models.MediaObject.__table__
+    stmt = upsert_insert(connection, table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.url],
+        set_={'ref_count': table.c.ref_count + stmt.excluded.ref_count,
+              'updated_at': stmt.excluded.updated_at})
+    now = models.get_utc_time()
+    connection.execute(stmt, [{**row, 'created_at': now, 'updated_at': now} for row in rows])
+
+
+def _load_old_value(target, value, oldvalue, initiator):
+    """No-op; didaftarkan dengan active_history agar URL lama selalu dimuat"""
+
+
+def init_app(app):
+    for store in MEDIA_STORES:
+        store.init_app(app)
+    for model, key in REFERENCES:
+        event.listen(getattr(model, key), 'set', _load_old_value, active_history=True)
+    event.listen(Session, 'after_flush', _collect_references)
+
+
+# ===========================
+# GARBAGE COLLECTION
+# ===========================
+
+def recount():
+    """Hitung ulang ref_count dari tabel referensi; mengembalikan {url: jumlah}"""
+    counts = Counter()
+    for model, key in REFERENCES:
+        column = getattr(model, key)
+        for store in MEDIA_STORES:
+            rows = db.session.query(column, func.count())\
+                .filter(column.like(store.url_prefix + '/%'))\
+                .group_by(column)
+            for url, count in rows:
+                if store.owns(url):
+                    counts[url] += count
+
+    objects = {obj.url: obj for obj in models.MediaObject.query}
+    for url, obj in objects.items():
+        if obj.ref_count != counts.get(url, 0):
+            obj.ref_count = counts.get(url, 0)
+    for url, count in counts.items():
+        if url not in objects:
+            db.session.add(models.MediaObject(url=url, ref_count=count))
+    db.session.commit()
+    return counts
+
+
+def collect_garbage(grace_seconds=GC_GRACE_SECONDS, dry_run=False):
+    """
+    Hapus file media store tanpa referensi yang lebih tua dari grace_seconds.
+    Mengembalikan (list URL yang dihapus, total byte).
+    """
+    counts = recount()
+    uploaded = uploaded_times()
+    cutoff = time.time() - grace_seconds
+    removed, kept, freed = [], set(), 0
+    for store in MEDIA_STORES:
+        for entry in store.files():
+            url = store.url_for(entry.path)
+            stat = entry.stat()
+            if counts.get(url) or last_uploaded(stat, uploaded.get(url)) > cutoff:
+                kept.add(url)
+                continue
+            if not dry_run:
+                store.remove(entry.path)
+            removed.append(url)
+            freed += stat.st_size
+
+    if not dry_run:
+        # Baris tanpa referensi yang filenya sudah tidak ada (dihapus di atas / release)
+        for obj in models.MediaObject.query.filter(models.MediaObject.ref_count <= 0):
+            if obj.url not in kept:
+                db.session.delete(obj)
+        db.session.commit()
+    return removed, freed
@@ -8,6 +8,7 @@ import os
 from flask import Flask
 from database import db
 import models  # pastikan ini mengimpor semua model kamu
+import sales_rollup
 from sqlalchemy import inspect, text
 
 # --- Flask app setup ---
@@ -96,6 +97,11 @@ def migrate_database():
         db.create_all()  # pastikan semua tabel ada
         auto_add_missing_columns()
 
+        # Tabel rollup yang baru dibuat masih kosong: isi dari order yang sudah ada
+        rows = sales_rollup.backfill_if_empty()
+        if rows is not None:
+            print(f"✅ Sales rollup backfilled: {rows} rows")
+
 
 if __name__ == "__main__":
     migrate_database()
@@ -0,0 +1,44 @@
+"""product search vector and trigram indexes
+
+Revision ID: 3f1c2a9b7d01
+Revises:
+Create Date: 2026-10-17 20:05:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c2a9b7d01'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+
+    # Weighted tsvector: name (A), brand/model/gtin (B), description (C)
+    op.execute("""
+        ALTER TABLE products ADD COLUMN IF NOT EXISTS search_vector tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('simple', coalesce(name, '')), 'A') ||
+            setweight(to_tsvector('simple',
+                coalesce(brand, '') || ' ' || coalesce(model, '') || ' ' || coalesce(gtin, '')), 'B') ||
+            setweight(to_tsvector('simple', coalesce(description, '')), 'C')
+        ) STORED
+    """)
+    op.execute('CREATE INDEX IF NOT EXISTS ix_products_search_vector '
+               'ON products USING gin (search_vector)')
+
+    for column in ('name', 'brand', 'model', 'gtin'):
+        op.execute(f'CREATE INDEX IF NOT EXISTS ix_products_{column}_trgm '
+                   f'ON products USING gin ({column} gin_trgm_ops)')
+
+
+def downgrade():
+    for column in ('name', 'brand', 'model', 'gtin'):
+        op.execute(f'DROP INDEX IF EXISTS ix_products_{column}_trgm')
+    op.execute('DROP INDEX IF EXISTS ix_products_search_vector')
+    op.execute('ALTER TABLE products DROP COLUMN IF EXISTS search_vector')
@@ -0,0 +1,73 @@
+"""daily sales rollup table
+
+Revision ID: 5e7b9d3c2f48
+Revises: 8c4d2e6f1a35
+Create Date: 2026-10-17 23:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e7b9d3c2f48'
+down_revision = '8c4d2e6f1a35'
+branch_labels = None
+depends_on = None
+
+SALES_STATUSES = "o.status IN ('paid', 'shipped', 'delivered')"
+
+
+def upgrade():
+    # Tabel bisa sudah dibuat (kosong) oleh db.create_all() saat main.py diimpor
+    if not sa.inspect(op.get_bind()).has_table('daily_sales_rollup'):
+        op.create_table(
+            'daily_sales_rollup',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('sales_date', sa.Date(), nullable=False),
+            sa.Column('source_type', sa.String(length=20), nullable=False),
+            sa.Column('payment_method', sa.String(length=50), nullable=False, server_default=''),
+            sa.Column('product_id', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('orders_count', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('total_amount', sa.Numeric(precision=14, scale=2), nullable=False, server_default='0'),
+            sa.Column('quantity', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('revenue', sa.Numeric(precision=14, scale=2), nullable=False, server_default='0'),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('sales_date', 'source_type', 'payment_method', 'product_id',
+                                name='uq_daily_sales_rollup_key'),
+        )
+
+    if not op.get_bind().execute(sa.text('SELECT 1 FROM daily_sales_rollup LIMIT 1')).first():
+        _backfill()
+
+
+def _backfill():
+    """Isi awal dari order yang sudah ada (sama dengan sales_rollup.rebuild)"""
+    op.execute(f"""
+        INSERT INTO daily_sales_rollup
+            (sales_date, source_type, payment_method, product_id,
+             orders_count, total_amount, quantity, revenue, updated_at)
+        SELECT date(o.created_at), COALESCE(o.source_type, 'online'),
+               COALESCE(o.payment_method, ''), 0,
+               count(o.id), sum(o.total_amount), 0, 0, now()
+        FROM orders o
+        WHERE {SALES_STATUSES}
+        GROUP BY 1, 2, 3
+    """)
+    op.execute(f"""
+        INSERT INTO daily_sales_rollup
+            (sales_date, source_type, payment_method, product_id,
+             orders_count, total_amount, quantity, revenue, updated_at)
+        SELECT date(o.created_at), COALESCE(o.source_type, 'online'),
+               COALESCE(o.payment_method, ''), oi.product_id,
+               0, 0, sum(oi.quantity), sum(oi.quantity * oi.price), now()
+        FROM order_items oi
+        JOIN orders o ON o.id = oi.order_id
+        WHERE {SALES_STATUSES}
+        GROUP BY 1, 2, 3, 4
+    """)
+
+
+def downgrade():
+    op.drop_table('daily_sales_rollup')
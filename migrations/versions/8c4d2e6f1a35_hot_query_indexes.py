@@ -0,0 +1,70 @@
+"""indexes for hot order, cart, product and cashier queries
+
+Revision ID: 8c4d2e6f1a35
+Revises: 3f1c2a9b7d01
+Create Date: 2026-10-17 21:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c4d2e6f1a35'
+down_revision = '3f1c2a9b7d01'
+branch_labels = None
+depends_on = None
+
+SALES_STATUSES = "status IN ('paid', 'shipped', 'delivered')"
+
+# (nama index, tabel, kolom, opsi postgresql_*)
+INDEXES = [
+    ('ix_orders_user_id_created_at', 'orders', ['user_id', 'created_at'], {}),
+    ('ix_orders_created_at', 'orders', ['created_at'], {}),
+    ('ix_orders_sales_created_at', 'orders', ['created_at'], {
+        'postgresql_include': ['source_type', 'total_amount'],
+        'postgresql_where': sa.text(SALES_STATUSES),
+    }),
+    ('ix_orders_pending_created_at', 'orders', ['created_at'], {
+        'postgresql_where': sa.text("status = 'pending'"),
+    }),
+    ('ix_orders_local_transaction_id', 'orders', ['local_transaction_id'], {
+        'postgresql_where': sa.text('local_transaction_id IS NOT NULL'),
+    }),
+    ('ix_order_items_order_id', 'order_items', ['order_id'], {}),
+    ('ix_order_items_product_id', 'order_items', ['product_id'], {}),
+    ('ix_cart_items_user_id_product_id', 'cart_items', ['user_id', 'product_id'], {}),
+    ('ix_products_active_name_id', 'products', ['name', 'id'], {
+        'postgresql_where': sa.text('is_active'),
+    }),
+    ('ix_products_active_created_at_id', 'products', ['created_at', 'id'], {
+        'postgresql_where': sa.text('is_active'),
+    }),
+    ('ix_products_active_category_name_id', 'products', ['category_id', 'name', 'id'], {
+        'postgresql_where': sa.text('is_active'),
+    }),
+    ('ix_products_active_category_created_at_id', 'products',
+     ['category_id', 'created_at', 'id'], {
+        'postgresql_where': sa.text('is_active'),
+    }),
+    ('ix_product_images_product_id', 'product_images', ['product_id'], {}),
+    ('ix_offline_transactions_cashier_user_id_transaction_date', 'offline_transactions',
+     ['cashier_user_id', 'transaction_date'], {}),
+]
+
+
+def upgrade():
+    # CONCURRENTLY agar tabel orders/products tidak terkunci selama build index
+    with op.get_context().autocommit_block():
+        for name, table, columns, options in INDEXES:
+            op.create_index(name, table, columns, if_not_exists=True,
+                            postgresql_concurrently=True, **options)
+        for table in {table for _, table, _, _ in INDEXES}:
+            op.execute(f'ANALYZE {table}')
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, if_exists=True,
+                          postgresql_concurrently=True)
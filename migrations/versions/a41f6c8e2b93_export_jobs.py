@@ -0,0 +1,50 @@
+"""export jobs queue
+
+Revision ID: a41f6c8e2b93
+Revises: 5e7b9d3c2f48
+Create Date: 2026-10-18 09:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a41f6c8e2b93'
+down_revision = '5e7b9d3c2f48'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Tabel bisa sudah dibuat oleh db.create_all() saat main.py diimpor
+    if sa.inspect(op.get_bind()).has_table('export_jobs'):
+        op.create_index('ix_export_jobs_status_id', 'export_jobs', ['status', 'id'],
+                        if_not_exists=True)
+        return
+    op.create_table(
+        'export_jobs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('kind', sa.String(length=50), nullable=False),
+        sa.Column('params', sa.Text(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('progress', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('message', sa.Text(), nullable=True),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('file_path', sa.String(length=500), nullable=True),
+        sa.Column('download_name', sa.String(length=255), nullable=True),
+        sa.Column('mimetype', sa.String(length=100), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.Column('expires_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_export_jobs_status_id', 'export_jobs', ['status', 'id'])
+
+
+def downgrade():
+    op.drop_index('ix_export_jobs_status_id', table_name='export_jobs', if_exists=True)
+    op.drop_table('export_jobs')
@@ -0,0 +1,36 @@
+"""drop unused product search vector
+
+Revision ID: a7c3e5f9b281
+Revises: d2f6a8c4e917
+Create Date: 2026-10-24 09:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7c3e5f9b281'
+down_revision = 'd2f6a8c4e917'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Pencarian memfilter dengan ILIKE (index trigram); search_vector hanya
+    # dipakai sebagai tie-breaker ts_rank, tapi tetap dihitung di setiap tulis produk
+    op.execute('DROP INDEX IF EXISTS ix_products_search_vector')
+    op.execute('ALTER TABLE products DROP COLUMN IF EXISTS search_vector')
+
+
+def downgrade():
+    op.execute("""
+        ALTER TABLE products ADD COLUMN IF NOT EXISTS search_vector tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('simple', coalesce(name, '')), 'A') ||
+            setweight(to_tsvector('simple',
+                coalesce(brand, '') || ' ' || coalesce(model, '') || ' ' || coalesce(gtin, '')), 'B') ||
+            setweight(to_tsvector('simple', coalesce(description, '')), 'C')
+        ) STORED
+    """)
+    op.execute('CREATE INDEX IF NOT EXISTS ix_products_search_vector '
+               'ON products USING gin (search_vector)')
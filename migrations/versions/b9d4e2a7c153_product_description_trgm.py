@@ -0,0 +1,25 @@
+"""product description trigram index
+
+Revision ID: b9d4e2a7c153
+Revises: f3a8c1d6e947
+Create Date: 2026-10-22 09:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'b9d4e2a7c153'
+down_revision = 'f3a8c1d6e947'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Pencarian postgres mencocokkan description dengan ILIKE (sama dengan backend memory)
+    op.execute('CREATE INDEX IF NOT EXISTS ix_products_description_trgm '
+               'ON products USING gin (description gin_trgm_ops)')
+
+
+def downgrade():
+    op.execute('DROP INDEX IF EXISTS ix_products_description_trgm')
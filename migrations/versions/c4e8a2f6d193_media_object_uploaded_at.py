@@ -0,0 +1,24 @@
+"""media object upload time
+
+Revision ID: c4e8a2f6d193
+Revises: a7c3e5f9b281
+Create Date: 2026-10-25 09:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4e8a2f6d193'
+down_revision = 'a7c3e5f9b281'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Kolom bisa sudah ditambahkan oleh migrate_db.py
+    op.execute('ALTER TABLE media_objects ADD COLUMN IF NOT EXISTS uploaded_at TIMESTAMP')
+
+
+def downgrade():
+    op.execute('ALTER TABLE media_objects DROP COLUMN IF EXISTS uploaded_at')
@@ -0,0 +1,24 @@
+"""export job result summary
+
+Revision ID: c7e2f9a4b516
+Revises: a41f6c8e2b93
+Create Date: 2026-10-19 10:05:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7e2f9a4b516'
+down_revision = 'a41f6c8e2b93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Kolom bisa sudah ditambahkan oleh db.create_all() / migrate_db.py
+    op.execute('ALTER TABLE export_jobs ADD COLUMN IF NOT EXISTS result TEXT')
+
+
+def downgrade():
+    op.execute('ALTER TABLE export_jobs DROP COLUMN IF EXISTS result')
@@ -0,0 +1,24 @@
+"""export job heartbeat
+
+Revision ID: d2f6a8c4e917
+Revises: b9d4e2a7c153
+Create Date: 2026-10-23 09:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2f6a8c4e917'
+down_revision = 'b9d4e2a7c153'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Kolom bisa sudah ditambahkan oleh db.create_all() / migrate_db.py
+    op.execute('ALTER TABLE export_jobs ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP')
+
+
+def downgrade():
+    op.execute('ALTER TABLE export_jobs DROP COLUMN IF EXISTS updated_at')
@@ -0,0 +1,24 @@
+"""product image responsive variants manifest
+
+Revision ID: e5b1d7a3c820
+Revises: c7e2f9a4b516
+Create Date: 2026-10-20 09:30:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5b1d7a3c820'
+down_revision = 'c7e2f9a4b516'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Kolom bisa sudah ditambahkan oleh migrate_db.py
+    op.execute('ALTER TABLE product_images ADD COLUMN IF NOT EXISTS variants TEXT')
+
+
+def downgrade():
+    op.execute('ALTER TABLE product_images DROP COLUMN IF EXISTS variants')
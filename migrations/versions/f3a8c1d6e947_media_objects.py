@@ -0,0 +1,36 @@
+"""media store reference counts
+
+Revision ID: f3a8c1d6e947
+Revises: e5b1d7a3c820
+Create Date: 2026-10-21 10:15:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3a8c1d6e947'
+down_revision = 'e5b1d7a3c820'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Tabel bisa sudah dibuat oleh db.create_all() saat main.py diimpor
+    if sa.inspect(op.get_bind()).has_table('media_objects'):
+        return
+    op.create_table(
+        'media_objects',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('url', sa.String(length=500), nullable=False),
+        sa.Column('ref_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('url'),
+    )
+
+
+def downgrade():
+    op.execute('DROP TABLE IF EXISTS media_objects')
@@ -1,11 +1,14 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 from datetime import datetime
-from sqlalchemy import String, Text, Numeric, Boolean, DateTime, Integer, ForeignKey
+from sqlalchemy import String, Text, Numeric, Boolean, Date, DateTime, Integer, ForeignKey, text
 from sqlalchemy.dialects.postgresql import TIMESTAMP
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, Session
+import json
 import pytz
 import re
+import threading
+import time
 import unicodedata
 
 # Import db instance from database module
@@ -81,6 +84,17 @@ class Category(db.Model):
 
 class Product(db.Model):
     __tablename__ = 'products'
+    # Listing storefront: produk aktif, urut nama atau terbaru (keyset (kolom, id))
+    __table_args__ = (
+        db.Index('ix_products_active_name_id', 'name', 'id',
+                 postgresql_where=text('is_active')),
+        db.Index('ix_products_active_created_at_id', 'created_at', 'id',
+                 postgresql_where=text('is_active')),
+        db.Index('ix_products_active_category_name_id', 'category_id', 'name', 'id',
+                 postgresql_where=text('is_active')),
+        db.Index('ix_products_active_category_created_at_id', 'category_id',
+                 'created_at', 'id', postgresql_where=text('is_active')),
+    )
 
     id = db.Column(Integer, primary_key=True)
     name = db.Column(String(200), nullable=False)
@@ -158,17 +172,13 @@ class Product(db.Model):
         """Generate unique slug from product name"""
         if not self.name:
             return None
-
-        base_slug = slugify(self.name)
-        slug = base_slug
-        counter = 1
-
-        while Product.query.filter(Product.slug == slug, Product.id != self.id).first():
-            slug = f"{base_slug}-{counter}"
-            counter += 1
-
-        return slug
+        return unique_product_slugs([self])[0]
     
+    @property
+    def thumbnail_image(self):
+        """ProductImage milik image_url (untuk srcset), None jika tidak ada"""
+        return next((image for image in self.images if image.image_url == self.image_url), None)
+
     def generate_gtin(self):
         """Generate GTIN with format hrtbrg+timestamp if not provided"""
         if not self.gtin:
@@ -180,17 +190,7 @@ class Product(db.Model):
     def ensure_slug(self):
         """Ensure product has a slug, generate if missing"""
         if not self.slug:
-            from slugify import slugify
-            base_slug = slugify(self.name)
-            slug = base_slug
-            counter = 1
-
-            # Check for existing slugs and make unique
-            while Product.query.filter_by(slug=slug).first():
-                slug = f"{base_slug}-{counter}"
-                counter += 1
-
-            self.slug = slug
+            self.slug = unique_product_slugs([self])[0]
 
     @property
     def seo_title(self):
@@ -240,24 +240,37 @@ class Product(db.Model):
             'description': self.description or '',
             'category': self.category.name if self.category else '',
             'is_active': self.is_active,
-            'images': [{'url': img.image_url, 'is_thumbnail': img.is_thumbnail} for img in self.images]
+            'images': [{'url': img.image_url, 'is_thumbnail': img.is_thumbnail}
+                       for img in sorted(self.images, key=lambda img: (img.display_order or 0, img.id))]
         }
 
 class ProductImage(db.Model):
     __tablename__ = 'product_images'
+    __table_args__ = (
+        db.Index('ix_product_images_product_id', 'product_id'),
+    )
 
     id = db.Column(Integer, primary_key=True)
     product_id = db.Column(Integer, ForeignKey('products.id'), nullable=False)
     image_url = db.Column(String(255), nullable=False)
     is_thumbnail = db.Column(Boolean, default=False)  # True if this is the main thumbnail
     display_order = db.Column(Integer, default=0)  # Order for displaying images
+    # Manifest JSON turunan responsif (image_pipeline.generate_variants)
+    variants = db.Column(Text)
     created_at = db.Column(DateTime, default=get_utc_time)
 
     def __repr__(self):
         return f'<ProductImage {self.product_id}:{self.image_url}>'
 
+    @property
+    def variant_manifest(self):
+        return json.loads(self.variants) if self.variants else None
+
 class CartItem(db.Model):
     __tablename__ = 'cart_items'
+    __table_args__ = (
+        db.Index('ix_cart_items_user_id_product_id', 'user_id', 'product_id'),
+    )
 
     id = db.Column(Integer, primary_key=True)
     user_id = db.Column(Integer, ForeignKey('users.id'), nullable=False)
@@ -274,6 +287,22 @@ class CartItem(db.Model):
 
 class Order(db.Model):
     __tablename__ = 'orders'
+    __table_args__ = (
+        # Riwayat order pelanggan (/orders) dan join top customers
+        db.Index('ix_orders_user_id_created_at', 'user_id', 'created_at'),
+        # Order terbaru (dashboard, daftar order admin)
+        db.Index('ix_orders_created_at', 'created_at'),
+        # Agregat penjualan per rentang tanggal (+ per source_type), index-only scan
+        db.Index('ix_orders_sales_created_at', 'created_at',
+                 postgresql_include=['source_type', 'total_amount'],
+                 postgresql_where=text("status IN ('paid', 'shipped', 'delivered')")),
+        # Fallback callback pembayaran: order pending terbaru
+        db.Index('ix_orders_pending_created_at', 'created_at',
+                 postgresql_where=text("status = 'pending'")),
+        # Idempotency sync transaksi kasir
+        db.Index('ix_orders_local_transaction_id', 'local_transaction_id',
+                 postgresql_where=text('local_transaction_id IS NOT NULL')),
+    )
 
     id = db.Column(Integer, primary_key=True)
     user_id = db.Column(Integer, ForeignKey('users.id'), nullable=False)
@@ -310,6 +339,10 @@ class Order(db.Model):
 
 class OrderItem(db.Model):
     __tablename__ = 'order_items'
+    __table_args__ = (
+        db.Index('ix_order_items_order_id', 'order_id'),
+        db.Index('ix_order_items_product_id', 'product_id'),
+    )
 
     id = db.Column(Integer, primary_key=True)
     order_id = db.Column(Integer, ForeignKey('orders.id'), nullable=False)
@@ -329,6 +362,103 @@ class OrderItem(db.Model):
         return f"Rp {self.subtotal:,.0f}".replace(',', '.')
 
 
+class DailySalesRollup(db.Model):
+    """
+    Agregat penjualan harian (tanggal UTC x sumber x metode bayar x produk),
+    dipelihara incremental oleh sales_rollup saat status order berubah.
+    product_id = 0 menyimpan total level order (orders_count, total_amount);
+    baris per produk menyimpan quantity dan revenue item.
+    """
+    __tablename__ = 'daily_sales_rollup'
+    __table_args__ = (
+        db.UniqueConstraint('sales_date', 'source_type', 'payment_method', 'product_id',
+                            name='uq_daily_sales_rollup_key'),
+    )
+
+    ORDER_TOTAL_PRODUCT_ID = 0
+
+    id = db.Column(Integer, primary_key=True)
+    sales_date = db.Column(Date, nullable=False)
+    source_type = db.Column(String(20), nullable=False)  # 'online' atau 'offline'
+    payment_method = db.Column(String(50), nullable=False, default='')
+    product_id = db.Column(Integer, nullable=False, default=0)  # Tanpa FK: histori tetap ada walau produk dihapus
+    orders_count = db.Column(Integer, nullable=False, default=0)
+    total_amount = db.Column(Numeric(14, 2), nullable=False, default=0)
+    quantity = db.Column(Integer, nullable=False, default=0)
+    revenue = db.Column(Numeric(14, 2), nullable=False, default=0)
+    updated_at = db.Column(DateTime, default=get_utc_time, onupdate=get_utc_time)
+
+    def __repr__(self):
+        return f'<DailySalesRollup {self.sales_date} {self.source_type} {self.product_id}>'
+
+
+class ExportJob(db.Model):
+    """
+    Antrian export/laporan yang dikerjakan worker di background (export_jobs).
+    File hasil disimpan di EXPORT_FOLDER dan dihapus setelah expires_at.
+    """
+    __tablename__ = 'export_jobs'
+    __table_args__ = (
+        # Worker mengambil job queued tertua
+        db.Index('ix_export_jobs_status_id', 'status', 'id'),
+    )
+
+    id = db.Column(Integer, primary_key=True)
+    kind = db.Column(String(50), nullable=False)  # sales_report, cashier_transactions, product_import, ...
+    params = db.Column(Text, nullable=False, default='{}')  # JSON
+    user_id = db.Column(Integer, ForeignKey('users.id'), nullable=False)
+    status = db.Column(String(20), nullable=False, default='queued')  # queued, running, done, failed
+    progress = db.Column(Integer, nullable=False, default=0)  # 0 - 100
+    message = db.Column(Text)  # Pesan error jika gagal
+    attempts = db.Column(Integer, nullable=False, default=0)
+    file_path = db.Column(String(500))
+    download_name = db.Column(String(255))
+    mimetype = db.Column(String(100))
+    result = db.Column(Text)  # JSON ringkasan hasil, mis. jumlah produk diimpor
+    created_at = db.Column(DateTime, default=get_utc_time)
+    started_at = db.Column(DateTime)
+    updated_at = db.Column(DateTime)  # Heartbeat worker selama job running
+    finished_at = db.Column(DateTime)
+    expires_at = db.Column(DateTime)
+
+    user = relationship('User', backref='export_jobs', lazy=True)
+
+    def __repr__(self):
+        return f'<ExportJob {self.id} {self.kind} {self.status}>'
+
+    @property
+    def params_dict(self):
+        return json.loads(self.params or '{}')
+
+    @property
+    def result_dict(self):
+        return json.loads(self.result) if self.result else None
+
+    @property
+    def is_finished(self):
+        return self.status in ('done', 'failed')
+
+
+class MediaObject(db.Model):
+    """
+    Jumlah referensi file di media store (media_store), per URL file.
+    Dipelihara incremental saat ProductImage / Product / ChatMessage berubah
+    dan dihitung ulang penuh oleh `flask --app main gc-media`.
+    """
+    __tablename__ = 'media_objects'
+
+    id = db.Column(Integer, primary_key=True)
+    url = db.Column(String(500), unique=True, nullable=False)
+    ref_count = db.Column(Integer, nullable=False, default=0)
+    # Upload terakhir (juga isi yang sama), masa tenggang gc; mtime file tidak diubah
+    uploaded_at = db.Column(DateTime)
+    created_at = db.Column(DateTime, default=get_utc_time)
+    updated_at = db.Column(DateTime, default=get_utc_time, onupdate=get_utc_time)
+
+    def __repr__(self):
+        return f'<MediaObject {self.url} refs={self.ref_count}>'
+
+
 class Invoice(db.Model):
     __tablename__ = 'invoices'
     
@@ -668,6 +798,10 @@ class DokuTransaction(db.Model):
 
 class OfflineTransaction(db.Model):
     __tablename__ = 'offline_transactions'
+    __table_args__ = (
+        db.Index('ix_offline_transactions_cashier_user_id_transaction_date',
+                 'cashier_user_id', 'transaction_date'),
+    )
 
     id = db.Column(Integer, primary_key=True)
     local_transaction_id = db.Column(String(100), unique=True, nullable=False)  # UUID from local storage
@@ -873,6 +1007,13 @@ class StoreProfile(db.Model):
     created_at = db.Column(DateTime, default=get_utc_time)
     updated_at = db.Column(DateTime, default=get_utc_time, onupdate=get_utc_time)
 
+    # Cache profil aktif per proses, lihat get_cached_profile()
+    CACHE_RECHECK_SECONDS = 30
+    _cache_lock = threading.Lock()
+    _cached_profile = None
+    _cached_version = None
+    _cache_checked_at = None
+
     def __repr__(self):
         return f'<StoreProfile {self.store_name}>'
 
@@ -881,6 +1022,45 @@ class StoreProfile(db.Model):
         """Get the active store profile"""
         return cls.query.filter_by(is_active=True).first()
 
+    @classmethod
+    def get_cached_profile(cls):
+        """
+        Profil aktif (read-only, detached dari session) dari cache proses.
+        Tanpa query selama cache lebih muda dari CACHE_RECHECK_SECONDS; setelah
+        itu hanya (id, updated_at) yang dicek sehingga perubahan dari proses
+        lain terlihat paling lambat CACHE_RECHECK_SECONDS detik kemudian.
+        Untuk mengubah profil tetap gunakan get_active_profile().
+        """
+        now = time.monotonic()
+        with cls._cache_lock:
+            if (cls._cache_checked_at is not None
+                    and now - cls._cache_checked_at < cls.CACHE_RECHECK_SECONDS):
+                return cls._cached_profile
+            cached_version = cls._cached_version
+
+        # Session terpisah agar objek di session request tidak ikut terlepas
+        with Session(db.engine) as session:
+            row = session.query(cls.id, cls.updated_at).filter_by(
+                is_active=True).order_by(cls.id).first()
+            version = tuple(row) if row else None
+            if version is not None and version == cached_version:
+                profile = cls._cached_profile
+            else:
+                profile = session.get(cls, version[0]) if version else None
+
+        with cls._cache_lock:
+            cls._cached_profile = profile
+            cls._cached_version = version
+            cls._cache_checked_at = now
+        return profile
+
+    @classmethod
+    def invalidate_cache(cls):
+        """Paksa get_cached_profile() membaca ulang profil (setelah update)"""
+        with cls._cache_lock:
+            cls._cached_version = None
+            cls._cache_checked_at = None
+
     @property
     def formatted_address(self):
         """Get formatted address for labels"""
@@ -919,6 +1099,84 @@ class StoreProfile(db.Model):
             contact_parts.append(f"WA: {self.whatsapp_number}")
         return ' | '.join(contact_parts)
 
+PRODUCT_SLUG_MAX_LENGTH = 240  # sisakan ruang untuk suffix -N (kolom 255)
+SLUG_BATCH_SIZE = 500
+
+
+def product_slug_base(name):
+    """Slug dasar dari nama produk (python-slugify, sama dengan slug yang sudah ada)"""
+    from slugify import slugify as python_slugify
+    return python_slugify(name or '', max_length=PRODUCT_SLUG_MAX_LENGTH) or 'produk'
+
+
+def unique_product_slugs(products):
+    """
+    Alokasikan slug unik untuk banyak produk sekaligus.
+    Semua slug yang berawalan salah satu slug dasar diambil dengan satu query
+    (slug LIKE 'base%'), lalu bentrokan diselesaikan di memori dengan suffix
+    -N berikutnya, termasuk bentrokan antar produk dalam batch yang sama.
+    Slug lama yang masih sesuai nama (base atau base-N) dipertahankan.
+    Mengembalikan list slug dengan urutan yang sama dengan products.
+    """
+    bases = [product_slug_base(p.name) for p in products]
+    own_ids = [p.id for p in products if p.id is not None]
+
+    query = db.session.query(Product.slug).filter(
+        db.or_(*[Product.slug.like(f'{base}%') for base in set(bases)]))
+    if own_ids:
+        query = query.filter(Product.id.notin_(own_ids))
+    taken = {slug for (slug,) in query}
+
+    # Suffix berikutnya per base = suffix numerik terbesar yang sudah dipakai + 1
+    next_suffix = {}
+    for base in set(bases):
+        suffixes = [
+            int(slug[len(base) + 1:]) for slug in taken
+            if slug.startswith(f'{base}-') and slug[len(base) + 1:].isdigit()
+        ]
+        next_suffix[base] = max(suffixes, default=0) + 1
+
+    slugs = []
+    for product, base in zip(products, bases):
+        current = product.slug or ''
+        suffix = current[len(base) + 1:]
+        if current not in taken and (current == base or (
+                current.startswith(f'{base}-') and suffix.isdigit())):
+            slug = current
+        else:
+            slug = base
+        while slug in taken:
+            slug = f'{base}-{next_suffix[base]}'
+            next_suffix[base] += 1
+        taken.add(slug)
+        slugs.append(slug)
+    return slugs
+
+
+def assign_slugs(products):
+    """Isi slug untuk produk yang belum punya slug (tanpa commit)"""
+    missing = [p for p in products if not p.slug]
+    for start in range(0, len(missing), SLUG_BATCH_SIZE):
+        batch = missing[start:start + SLUG_BATCH_SIZE]
+        with db.session.no_autoflush:
+            slugs = unique_product_slugs(batch)
+        for product, slug in zip(batch, slugs):
+            product.slug = slug
+    return len(missing)
+
+
+def backfill_product_slugs():
+    """Isi slug semua produk lama yang belum punya slug, commit per batch"""
+    total = 0
+    while True:
+        batch = Product.query.filter(Product.slug.is_(None)).order_by(
+            Product.id).limit(SLUG_BATCH_SIZE).all()
+        if not batch:
+            return total
+        total += assign_slugs(batch)
+        db.session.commit()
+
+
 # Chat System Models
 class ChatRoom(db.Model):
     __tablename__ = 'chat_rooms'
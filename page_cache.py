@@ -0,0 +1,289 @@
+"""
+Page cache untuk Hurtrock Music Store
+Cache HTML hasil render halaman storefront (beranda, katalog, detail produk,
+info toko) dengan key route + args + status login, dan invalidasi berbasis tag:
+
+- product:<id>   : halaman detail produk
+- category:<id>  : halaman yang menampilkan produk satu kategori
+- catalog        : listing produk (beranda, /products)
+- store_profile  : semua halaman (header/footer memakai profil toko)
+
+Tag di-invalidasi otomatis setelah commit yang mengubah Product, ProductImage,
+Category atau StoreProfile, jadi route admin, kasir dan checkout tidak perlu
+memanggil invalidasi manual.
+
+Backend 'memory' adalah LRU per proses yang dibatasi ukuran total (bytes).
+Backend 'redis' (PAGE_CACHE_BACKEND=redis) dipakai bersama oleh semua worker
+sehingga invalidasi dari satu proses berlaku di proses lain.
+"""
+
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from functools import wraps
+
+from flask import current_app, g, make_response, request, session
+from flask_login import current_user
+from flask_wtf.csrf import generate_csrf
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+PAGE_CACHE_BACKENDS = ('memory', 'redis')
+DEFAULT_TIMEOUT = 300  # detik
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+
+# Token CSRF berbeda per session, disimpan di cache sebagai placeholder
+# lalu diganti token milik request yang sedang dilayani
+CSRF_PLACEHOLDER = b'__PAGE_CACHE_CSRF_TOKEN__'
+
+# Perubahan kolom ini hanya mempengaruhi halaman detail produk
+PRODUCT_DETAIL_ONLY_FIELDS = {'stock_quantity', 'updated_at'}
+
+
+class MemoryPageCache:
+    """LRU in-process, dibatasi total ukuran body"""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (body, content_type, tags, expires_at)
+        self._tags = defaultdict(set)
+        self._size = 0
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if not entry:
+            return
+        self._size -= len(entry[0])
+        for tag in entry[2]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if not entry:
+                return None
+            if entry[3] < time.monotonic():
+                self._discard(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[0], entry[1]
+
+    def set(self, key, body, content_type, tags, timeout):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            self._discard(key)
+            self._entries[key] = (body, content_type, frozenset(tags),
+                                  time.monotonic() + timeout)
+            self._size += len(body)
+            for tag in tags:
+                self._tags[tag].add(key)
+            while self._size > self.max_bytes:
+                self._discard(next(iter(self._entries)))
+
+    def invalidate(self, tags):
+        with self._lock:
+            for tag in tags:
+                for key in list(self._tags.get(tag, ())):
+                    self._discard(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+            self._size = 0
+
+
+class RedisPageCache:
+    """Cache bersama di Redis; tag disimpan sebagai SET berisi key halaman"""
+
+    def __init__(self, url, prefix='hurtrock:page_cache:'):
+        self._redis = redis.Redis.from_url(url)
+        self._prefix = prefix
+
+    def _tag_key(self, tag):
+        return f'{self._prefix}tag:{tag}'
+
+    def get(self, key):
+        body, content_type = self._redis.hmget(self._prefix + key,
+                                               'body', 'content_type')
+        if body is None:
+            return None
+        return body, content_type.decode()
+
+    def set(self, key, body, content_type, tags, timeout):
+        full_key = self._prefix + key
+        pipe = self._redis.pipeline()
+        pipe.delete(full_key)
+        pipe.hset(full_key, mapping={'body': body, 'content_type': content_type})
+        pipe.expire(full_key, timeout)
+        for tag in tags:
+            pipe.sadd(self._tag_key(tag), full_key)
+            pipe.expire(self._tag_key(tag), timeout)
+        pipe.execute()
+
+    def invalidate(self, tags):
+        for tag in tags:
+            tag_key = self._tag_key(tag)
+            keys = self._redis.smembers(tag_key)
+            self._redis.delete(tag_key, *keys)
+
+    def clear(self):
+        keys = list(self._redis.scan_iter(f'{self._prefix}*'))
+        if keys:
+            self._redis.delete(*keys)
+
+
+class PageCache:
+    """Decorator cache halaman + invalidasi tag"""
+
+    def __init__(self):
+        self.backend = None
+        self.timeout = DEFAULT_TIMEOUT
+
+    def init_app(self, app):
+        backend = app.config.get('PAGE_CACHE_BACKEND', 'memory')
+        self.timeout = app.config.get('PAGE_CACHE_TIMEOUT', DEFAULT_TIMEOUT)
+
+        if not app.config.get('PAGE_CACHE_ENABLED', True):
+            self.backend = None
+        elif backend == 'redis' and REDIS_AVAILABLE and app.config.get('PAGE_CACHE_REDIS_URL'):
+            self.backend = RedisPageCache(app.config['PAGE_CACHE_REDIS_URL'])
+        else:
+            if backend != 'memory':
+                print(f"[WARNING] Page cache backend '{backend}' not available, using memory")
+            self.backend = MemoryPageCache(
+                app.config.get('PAGE_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES))
+
+        event.listen(Session, 'after_flush', _collect_model_tags)
+        event.listen(Session, 'after_commit', self._after_commit)
+        event.listen(Session, 'after_rollback', _discard_model_tags)
+
+    def _after_commit(self, session):
+        self.invalidate(*session.info.pop('page_cache_tags', ()))
+
+    def _cache_key(self):
+        if current_user.is_authenticated:
+            auth = f'{current_user.role}:{current_user.id}'
+        else:
+            auth = 'anon'
+        args = '&'.join(f'{k}={v}' for k, v in sorted(request.args.items(multi=True)))
+        view_args = '&'.join(f'{k}={v}' for k, v in sorted((request.view_args or {}).items()))
+        return f'{request.endpoint}|{view_args}|{args}|{auth}'
+
+    def tag(self, *tags):
+        """Tambahkan tag ke halaman yang sedang dirender (dipanggil dari view)"""
+        page_tags = g.get('page_cache_tags')
+        if page_tags is not None:
+            page_tags.update(tags)
+
+    def invalidate(self, *tags):
+        if self.backend and tags:
+            try:
+                self.backend.invalidate(tags)
+            except Exception as e:
+                print(f"[ERROR] Page cache invalidation failed: {e}")
+
+    def clear(self):
+        if self.backend:
+            self.backend.clear()
+
+    def cached(self, tags=(), timeout=None):
+        """
+        Cache response HTML 200 dari view GET. Halaman dengan flash message
+        yang belum ditampilkan tidak diambil dari / disimpan ke cache.
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                if (self.backend is None or request.method not in ('GET', 'HEAD')
+                        or session.get('_flashes')):
+                    return view(*args, **kwargs)
+
+                key = self._cache_key()
+                try:
+                    hit = self.backend.get(key)
+                except Exception as e:
+                    print(f"[ERROR] Page cache read failed: {e}")
+                    hit = None
+                if hit:
+                    body, content_type = hit
+                    if CSRF_PLACEHOLDER in body:
+                        body = body.replace(CSRF_PLACEHOLDER, generate_csrf().encode())
+                    response = make_response(body)
+                    response.content_type = content_type
+                    response.headers['X-Page-Cache'] = 'HIT'
+                    response.vary.add('Cookie')
+                    return response
+
+                g.page_cache_tags = {'store_profile', *tags}
+                response = make_response(view(*args, **kwargs))
+                if (response.status_code != 200 or response.mimetype != 'text/html'
+                        or response.is_streamed):
+                    return response
+
+                body = response.get_data()
+                csrf_token = g.get(current_app.config.get('WTF_CSRF_FIELD_NAME', 'csrf_token'))
+                if csrf_token:
+                    body = body.replace(csrf_token.encode(), CSRF_PLACEHOLDER)
+                try:
+                    self.backend.set(key, body, response.content_type,
+                                     g.page_cache_tags, timeout or self.timeout)
+                except Exception as e:
+                    print(f"[ERROR] Page cache write failed: {e}")
+                response.headers['X-Page-Cache'] = 'MISS'
+                response.vary.add('Cookie')
+                return response
+            return wrapper
+        return decorator
+
+
+def _model_tags(obj, created=False):
+    """Tag halaman yang terpengaruh oleh perubahan satu baris model"""
+    import models
+
+    if isinstance(obj, models.Product):
+        tags = {f'product:{obj.id}', f'category:{obj.category_id}'}
+        state = inspect(obj)
+        changed = {attr.key for attr in state.attrs if attr.history.has_changes()}
+        for old_category in state.attrs.category_id.history.deleted:
+            tags.add(f'category:{old_category}')
+        if created or state.deleted or changed - PRODUCT_DETAIL_ONLY_FIELDS:
+            tags.add('catalog')
+        return tags
+    if isinstance(obj, models.ProductImage):
+        return {f'product:{obj.product_id}', 'catalog'}
+    if isinstance(obj, models.Category):
+        return {f'category:{obj.id}', 'catalog'}
+    if isinstance(obj, models.StoreProfile):
+        return {'store_profile'}
+    return set()
+
+
+def _collect_model_tags(session, flush_context):
+    tags = session.info.setdefault('page_cache_tags', set())
+    for obj in session.new:
+        tags |= _model_tags(obj, created=True)
+    for obj in session.dirty:
+        if session.is_modified(obj, include_collections=False):
+            tags |= _model_tags(obj)
+    for obj in session.deleted:
+        tags |= _model_tags(obj)
+
+
+def _discard_model_tags(session):
+    session.info.pop('page_cache_tags', None)
+
+
+page_cache = PageCache()
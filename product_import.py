@@ -0,0 +1,481 @@
+"""
+Product import untuk Hurtrock Music Store
+Import produk massal dari file Excel template sebagai pipeline:
+
+1. read_rows: workbook dibuka read-only dan dibaca dengan
+   iter_rows(values_only=True), tanpa objek Cell per sel.
+2. validate_rows: satu pass di memori; kategori, nama dan GTIN yang sudah ada
+   dimuat sekali ke dict/set sehingga tidak ada query per baris.
+3. insert_products: INSERT executemany per IMPORT_CHUNK_SIZE baris, slug
+   dialokasikan per chunk dengan models.unique_product_slugs.
+
+Mode 'upsert' (refresh price list supplier): baris dicocokkan ke produk yang
+sudah ada lewat GTIN, atau nama jika kolom gtin kosong. Produk yang cocok
+diupdate, sisanya ditambahkan, dan baris yang nilainya sama persis dihitung
+sebagai unchanged tanpa ditulis. Sel opsional yang kosong mempertahankan nilai
+lama. upsert_products menulis per chunk dengan INSERT ... ON CONFLICT (gtin)
+DO UPDATE; produk yang cocok lewat nama diupdate per primary key.
+
+Satu file bisa berisi hingga MAX_IMPORT_ROWS produk.
+
+File besar diimpor sebagai export job 'product_import' (lihat export_jobs):
+file disimpan dengan save_upload, diparse sekali (hasil parse di-cache di
+samping file upload sehingga validate lalu import tidak membaca Excel dua
+kali), lalu worker mengimpor dan menulis workbook laporan error berisi
+baris yang gagal. Laporan tersebut bisa diperbaiki dan diupload ulang.
+"""
+
+import json
+import os
+from dataclasses import dataclass, field
+from datetime import datetime
+from decimal import Decimal
+from typing import NamedTuple
+from types import SimpleNamespace
+
+from sqlalchemy import insert, or_, update
+
+import models
+from catalog_queries import refresh_catalog_caches
+from database import db, upsert_insert
+from excel_styles import XLSX_MIMETYPE, RowWriter, register_styles, set_column_widths
+from export_jobs import export_job_queue
+
+IMPORT_HEADERS = [
+    'nama_produk', 'deskripsi', 'harga', 'stok_awal', 'brand',
+    'kategori', 'berat_gram', 'dimensi_panjang', 'dimensi_lebar',
+    'dimensi_tinggi', 'warna', 'material', 'garansi_bulan', 'aktif', 'gtin'
+]
+REQUIRED_HEADER_COUNT = 14  # template lama tanpa kolom gtin tetap diterima
+DATA_START_ROW = 3  # baris 2 berisi petunjuk pengisian
+MAX_IMPORT_ROWS = 50000
+MAX_IMPORT_FILE_SIZE = 10 * 1024 * 1024
+IMPORT_CHUNK_SIZE = models.SLUG_BATCH_SIZE  # satu query slug per chunk
+TRUE_VALUES = ('true', '1', 'yes', 'ya', 'aktif')
+UPLOAD_EXTENSION = '.xlsx'
+PARSED_EXTENSION = '.rows.json'
+IMPORT_MODES = ('insert', 'upsert')
+# Kolom yang ditulis ulang saat upsert (slug dan created_at tidak pernah diubah)
+UPDATE_COLUMNS = ('name', 'description', 'price', 'stock_quantity', 'brand', 'category_id',
+                  'weight', 'shipping_weight', 'length', 'width', 'height', 'is_active')
+# Sel kosong: default untuk produk baru, nilai lama untuk produk yang diupdate
+COLUMN_DEFAULTS = {'description': None, 'brand': None, 'weight': 0, 'shipping_weight': 0,
+                   'length': 0, 'width': 0, 'height': 0, 'is_active': True}
+CENT = Decimal('0.01')
+
+
+class HeaderMismatch(ValueError):
+    """Header baris pertama tidak sesuai template"""
+
+    def __init__(self, actual):
+        self.expected = IMPORT_HEADERS
+        self.actual = actual
+        super().__init__(
+            f'Header tidak sesuai template. Expected: {IMPORT_HEADERS}, Got: {actual}')
+
+
+class RowError(NamedTuple):
+    row_num: int
+    values: list
+    message: str
+
+    def __str__(self):
+        return f'Baris {self.row_num}: {self.message}'
+
+
+class ValidatedRows(NamedTuple):
+    products: list  # dict kolom produk baru
+    updates: list  # dict kolom + id produk yang sudah ada (mode upsert)
+    unchanged_count: int
+    errors: list  # RowError
+    total_rows: int
+
+    @property
+    def valid_count(self):
+        return len(self.products) + len(self.updates) + self.unchanged_count
+
+
+@dataclass
+class ImportResult:
+    total_rows: int = 0
+    imported_count: int = 0
+    updated_count: int = 0
+    unchanged_count: int = 0
+    errors: list = field(default_factory=list)  # RowError
+    mode: str = 'insert'
+
+    @property
+    def error_count(self):
+        return len(self.errors)
+
+    @property
+    def processed_count(self):
+        return self.imported_count + self.updated_count + self.unchanged_count
+
+    def summary(self):
+        return {'mode': self.mode, 'total_rows': self.total_rows,
+                'imported_count': self.imported_count, 'updated_count': self.updated_count,
+                'unchanged_count': self.unchanged_count, 'error_count': self.error_count}
+
+
+def _no_progress(done, total):
+    pass
+
+
+def read_rows(fileobj, progress=_no_progress):
+    """
+    Yield (nomor_baris, values) untuk setiap baris data yang tidak kosong.
+    values selalu sepanjang IMPORT_HEADERS. HeaderMismatch jika header salah.
+    """
+    from openpyxl import load_workbook
+
+    wb = load_workbook(fileobj, read_only=True, data_only=True)
+    try:
+        ws = wb.active
+        total = ws.max_row or 0  # dari tag dimension, bisa kosong
+        rows = ws.iter_rows(max_col=len(IMPORT_HEADERS), values_only=True)
+        headers = [str(value).strip().lower() if value else ''
+                   for value in next(rows, ())]
+        headers += [''] * (len(IMPORT_HEADERS) - len(headers))
+        if (headers[:REQUIRED_HEADER_COUNT] != IMPORT_HEADERS[:REQUIRED_HEADER_COUNT]
+                or headers[REQUIRED_HEADER_COUNT] not in ('', 'gtin')):
+            raise HeaderMismatch(headers)
+        has_gtin = headers[REQUIRED_HEADER_COUNT] == 'gtin'
+
+        for row_num, values in enumerate(rows, 2):
+            progress(row_num, total)
+            if row_num < DATA_START_ROW:
+                continue
+            values = list(values) + [None] * (len(IMPORT_HEADERS) - len(values))
+            if not has_gtin:
+                values[REQUIRED_HEADER_COUNT] = None
+            if any(value not in (None, '') for value in values):
+                yield row_num, values
+    finally:
+        wb.close()
+
+
+def parse_upload(upload_id, progress=_no_progress):
+    """
+    Baris data file upload (list (nomor_baris, values)). Hasil parse disimpan
+    sebagai JSON di samping file upload dan dipakai ulang pada panggilan berikutnya.
+    """
+    path = export_job_queue.upload_path(upload_id, UPLOAD_EXTENSION)
+    parsed_path = export_job_queue.upload_path(upload_id, PARSED_EXTENSION)
+    if os.path.exists(parsed_path):
+        with open(parsed_path) as parsed:
+            return [(row_num, values) for row_num, values in json.load(parsed)]
+
+    with open(path, 'rb') as fileobj:
+        rows = list(read_rows(fileobj, progress))
+    with open(parsed_path + '.part', 'w') as parsed:
+        json.dump(rows, parsed, default=str)  # sel tanggal disimpan sebagai teks
+    os.replace(parsed_path + '.part', parsed_path)
+    return rows
+
+
+def _text(value):
+    return str(value).strip() if value not in (None, '') else ''
+
+
+def _number(value):
+    """Angka dari sel Excel, None jika kosong atau bukan angka"""
+    if isinstance(value, bool) or not isinstance(value, (int, float, Decimal)):
+        return None
+    return value
+
+
+def _description(values):
+    """Deskripsi + warna/material/garansi (tidak punya kolom sendiri di products)"""
+    deskripsi, warna, material = _text(values[1]), _text(values[10]), _text(values[11])
+    garansi = _number(values[12])
+    specs = []
+    if warna:
+        specs.append(f'Warna: {warna}')
+    if material:
+        specs.append(f'Material: {material}')
+    if garansi:
+        specs.append(f'Garansi: {int(garansi)} bulan')
+    parts = [part for part in (deskripsi, '\n'.join(specs)) if part]
+    return '\n\n'.join(parts) or None
+
+
+def _existing_products():
+    """Kolom import semua produk, dimuat sekali untuk pencocokan upsert"""
+    Product = models.Product
+    columns = [Product.id, Product.gtin, Product.slug] + [
+        getattr(Product, column) for column in UPDATE_COLUMNS]
+    return {row.id: row._asdict() for row in db.session.query(*columns)}
+
+
+def _match_existing(name, gtin, existing, by_gtin, by_name):
+    """(id produk yang diupdate atau None, pesan_error)"""
+    if gtin and gtin in by_gtin:
+        return by_gtin[gtin], None
+    ids = by_name.get(name, [])
+    if len(ids) > 1:
+        return None, f'Nama "{name}" dipakai {len(ids)} produk, isi kolom gtin'
+    if not ids:
+        return None, None
+    current_gtin = existing[ids[0]]['gtin']
+    if gtin and current_gtin:
+        return None, f'Produk "{name}" sudah ada dengan GTIN lain ({current_gtin})'
+    return ids[0], None
+
+
+def _differs(value, current):
+    if isinstance(current, Decimal) and value is not None:
+        return Decimal(str(value)).quantize(CENT) != current
+    return value != current
+
+
+def validate_rows(rows, max_rows=MAX_IMPORT_ROWS, mode='insert'):
+    """
+    Validasi semua baris sekaligus, mengembalikan ValidatedRows. Mode insert
+    menolak nama/GTIN yang sudah ada; mode upsert menjadikannya update.
+    ValueError jika jumlah baris melebihi max_rows.
+    """
+    if mode not in IMPORT_MODES:
+        raise ValueError(f'Mode import tidak dikenal: {mode}')
+    Product = models.Product
+    categories = {name.lower(): category_id for category_id, name
+                  in db.session.query(models.Category.id, models.Category.name)}
+    if mode == 'upsert':
+        existing = _existing_products()
+        names = {product['name'] for product in existing.values()}
+        gtins = {product['gtin'] for product in existing.values() if product['gtin']}
+        by_gtin = {product['gtin']: product_id for product_id, product in existing.items()
+                   if product['gtin']}
+        by_name = {}
+        for product_id, product in existing.items():
+            by_name.setdefault(product['name'], []).append(product_id)
+    else:
+        names = {name for (name,) in db.session.query(Product.name)}
+        gtins = {gtin for (gtin,) in db.session.query(Product.gtin).filter(
+            Product.gtin.isnot(None))}
+
+    products = []
+    updates = []
+    unchanged_count = 0
+    matched = set()  # id produk yang sudah dicocokkan baris sebelumnya
+    errors = []
+    total_rows = 0
+    for row_num, values in rows:
+        total_rows += 1
+        if total_rows > max_rows:
+            raise ValueError(f'Maksimal {max_rows} produk per file')
+
+        nama_produk = _text(values[0])
+        harga = _number(values[2])
+        stok_awal = _number(values[3])
+        kategori = _text(values[5])
+        gtin = _text(values[14]) or None
+
+        if not nama_produk:
+            errors.append(RowError(row_num, values, 'Nama produk wajib diisi'))
+            continue
+        if len(nama_produk) > 200:
+            errors.append(RowError(row_num, values, 'Nama produk maksimal 200 karakter'))
+            continue
+        if harga is None or harga <= 0:
+            errors.append(RowError(row_num, values, 'Harga harus berupa angka positif'))
+            continue
+        if stok_awal is None or stok_awal < 0:
+            errors.append(RowError(row_num, values, 'Stok awal harus berupa angka non-negatif'))
+            continue
+        if not kategori:
+            errors.append(RowError(row_num, values, 'Kategori wajib diisi'))
+            continue
+        if kategori.lower() not in categories:
+            errors.append(RowError(row_num, values, f'Kategori "{kategori}" tidak ditemukan'))
+            continue
+        if gtin and len(gtin) > 100:
+            errors.append(RowError(row_num, values, 'GTIN maksimal 100 karakter'))
+            continue
+
+        target = None
+        if mode == 'upsert':
+            target, message = _match_existing(nama_produk, gtin, existing, by_gtin, by_name)
+            if message:
+                errors.append(RowError(row_num, values, message))
+                continue
+            if target in matched:
+                errors.append(RowError(row_num, values,
+                                       'Produk yang sama sudah ada di baris lain dalam file'))
+                continue
+
+        if target is None or nama_produk != existing[target]['name']:
+            if nama_produk in names:
+                errors.append(RowError(row_num, values, f'Produk "{nama_produk}" sudah ada'))
+                continue
+            names.add(nama_produk)
+        if gtin and (target is None or gtin != existing[target]['gtin']):
+            if gtin in gtins:
+                errors.append(RowError(row_num, values, f'GTIN "{gtin}" sudah dipakai'))
+                continue
+            gtins.add(gtin)
+
+        weight = _number(values[6])
+        aktif = _text(values[13]).lower()
+        product = {
+            'name': nama_produk,
+            'description': _description(values),
+            'price': harga,
+            'stock_quantity': int(stok_awal),
+            'brand': _text(values[4])[:100] or None,
+            'category_id': categories[kategori.lower()],
+            'gtin': gtin,
+            'weight': weight,
+            'shipping_weight': weight,
+            'length': _number(values[7]),
+            'width': _number(values[8]),
+            'height': _number(values[9]),
+            'is_active': aktif in TRUE_VALUES if aktif else None,
+        }
+
+        if target is None:
+            for column, default in COLUMN_DEFAULTS.items():
+                if product[column] is None:
+                    product[column] = default
+            products.append(product)
+            continue
+
+        matched.add(target)
+        current = existing[target]
+        for column in list(COLUMN_DEFAULTS) + ['gtin']:
+            if product[column] is None:
+                product[column] = current[column]
+        if not any(_differs(product[column], current[column])
+                   for column in UPDATE_COLUMNS + ('gtin',)):
+            unchanged_count += 1
+            continue
+        product['id'] = target
+        product['slug'] = current['slug']
+        # Cocok lewat GTIN: ikut upsert ON CONFLICT (gtin), selain itu update per id
+        product['by_gtin'] = gtin is not None and gtin == current['gtin']
+        updates.append(product)
+    return ValidatedRows(products, updates, unchanged_count, errors, total_rows)
+
+
+def insert_products(products, chunk_size=IMPORT_CHUNK_SIZE, progress=_no_progress):
+    """INSERT executemany per chunk beserta slug unik (tanpa commit)"""
+    for start in range(0, len(products), chunk_size):
+        progress(start, len(products))
+        chunk = products[start:start + chunk_size]
+        _assign_slugs(chunk)
+        db.session.execute(insert(models.Product), chunk)
+    return len(products)
+
+
+def _assign_slugs(products):
+    # Chunk sebelumnya sudah ter-insert di transaksi yang sama, jadi ikut
+    # terhitung saat mencari slug yang sudah dipakai
+    slugs = models.unique_product_slugs(
+        [SimpleNamespace(id=None, name=p['name'], slug=None) for p in products])
+    for product, slug in zip(products, slugs):
+        product['slug'] = slug
+
+
+def _upsert_statement(connection):
+    table = models.Product.__table__
+    stmt = upsert_insert(connection, table)
+    # WHERE: baris yang nilainya sama tidak ditulis ulang
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.gtin],
+        set_={column: stmt.excluded[column] for column in UPDATE_COLUMNS},
+        where=or_(*(table.c[column].is_distinct_from(stmt.excluded[column])
+                    for column in UPDATE_COLUMNS)))
+
+
+def upsert_products(products, updates, chunk_size=IMPORT_CHUNK_SIZE, progress=_no_progress):
+    """
+    Mode upsert (tanpa commit): produk baru dan produk yang cocok lewat GTIN
+    ditulis per chunk dengan INSERT ... ON CONFLICT (gtin) DO UPDATE, produk
+    yang cocok lewat nama dengan UPDATE executemany per primary key.
+    """
+    upserts = products + [{key: value for key, value in product.items()
+                           if key not in ('id', 'by_gtin')}
+                          for product in updates if product['by_gtin']]
+    by_id = [{key: value for key, value in product.items() if key != 'by_gtin'}
+             for product in updates if not product['by_gtin']]
+    total = len(upserts) + len(by_id)
+    stmt = _upsert_statement(db.session.connection())
+    for start in range(0, len(upserts), chunk_size):
+        progress(start, total)
+        chunk = upserts[start:start + chunk_size]
+        _assign_slugs([product for product in chunk if 'slug' not in product])
+        db.session.execute(stmt, chunk)
+    for start in range(0, len(by_id), chunk_size):
+        progress(len(upserts) + start, total)
+        db.session.execute(update(models.Product), by_id[start:start + chunk_size])
+    return total
+
+
+def import_rows(rows, progress=_no_progress, mode='insert'):
+    """Validasi + insert/upsert baris hasil read_rows/parse_upload lalu commit"""
+    validated = validate_rows(rows, mode=mode)
+    try:
+        if mode == 'upsert':
+            upsert_products(validated.products, validated.updates, progress=progress)
+        else:
+            insert_products(validated.products, progress=progress)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return ImportResult(total_rows=validated.total_rows,
+                        imported_count=len(validated.products),
+                        updated_count=len(validated.updates),
+                        unchanged_count=validated.unchanged_count,
+                        errors=validated.errors, mode=mode)
+
+
+def import_products(fileobj, mode='insert'):
+    """Jalankan pipeline import dan commit; ImportResult berisi ringkasan"""
+    return import_rows(read_rows(fileobj), mode=mode)
+
+
+def write_error_report(fileobj, result):
+    """
+    Workbook laporan import: baris yang gagal (nilai asli + pesan error, disorot
+    merah) dengan format template, jadi bisa diperbaiki lalu diupload ulang.
+    """
+    from openpyxl import Workbook
+
+    wb = register_styles(Workbook(write_only=True))
+    ws = wb.create_sheet('Baris Gagal')
+    ws.freeze_panes = f'A{DATA_START_ROW}'
+    set_column_widths(ws, [20, 30, 15, 12, 15, 15, 12, 15, 15, 15, 12, 15, 15, 10, 18, 50])
+    sheet = RowWriter(ws)
+    sheet.append(IMPORT_HEADERS + ['error'], 'hr_import_header')
+    summary = f'Import {result.processed_count} dari {result.total_rows} baris berhasil'
+    if result.mode == 'upsert':
+        summary += (f' ({result.imported_count} baru, {result.updated_count} diupdate, '
+                    f'{result.unchanged_count} tidak berubah)')
+    sheet.append([summary + '. Perbaiki baris di bawah lalu upload ulang file ini.'],
+                 'hr_import_hint')
+    row_styles = ['hr_error_cell'] * len(IMPORT_HEADERS) + ['hr_error_message']
+    for error in result.errors:
+        sheet.append(list(error.values) + [str(error)], row_styles)
+    wb.save(fileobj)
+
+
+# ===========================
+# EXPORT JOB HANDLER
+# ===========================
+
+@export_job_queue.handler('product_import', XLSX_MIMETYPE, '.xlsx')
+def product_import_job(params, fileobj, progress):
+    # Progress: parse file = 0-50%, insert = 50-100%
+    rows = parse_upload(params['upload_id'],
+                        progress=lambda done, total: progress(done, total * 2))
+    result = import_rows(rows, progress=lambda done, total: progress(total + done, total * 2),
+                         mode=params.get('import_mode', 'insert'))
+    write_error_report(fileobj, result)
+    export_job_queue.remove_upload(params['upload_id'])
+    if result.imported_count or result.updated_count:
+        refresh_catalog_caches()
+    print(f"[EXCEL IMPORT] Imported {result.imported_count} products, "
+          f"updated {result.updated_count}, {result.error_count} errors "
+          f"({params.get('filename')})")
+    return f"hasil_import_produk_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx", result.summary()
@@ -0,0 +1,158 @@
+"""
+Sales analytics untuk Hurtrock Music Store
+Query agregat penjualan yang dipakai admin_dashboard() dan admin_analytics().
+Total, penjualan harian dan produk terlaris dibaca dari tabel daily_sales_rollup
+(dipelihara oleh sales_rollup), bukan dari orders/order_items. Total hari ini /
+bulan ini x semua / online / offline dihitung dalam satu query dengan
+SUM(...) FILTER (WHERE ...). Top customers tetap dari orders karena pelanggan
+bukan dimensi rollup.
+"""
+
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from sqlalchemy import case, func
+
+import models
+from database import db
+
+SALES_STATUSES = ('paid', 'shipped', 'delivered')
+
+
+@dataclass(frozen=True)
+class SalesTotals:
+    """Total penjualan per periode dan sumber (online = web, offline = kasir)"""
+    today: Decimal = Decimal('0')
+    today_online: Decimal = Decimal('0')
+    today_offline: Decimal = Decimal('0')
+    month: Decimal = Decimal('0')
+    month_online: Decimal = Decimal('0')
+    month_offline: Decimal = Decimal('0')
+
+
+@dataclass(frozen=True)
+class BestSeller:
+    name: str
+    total_sold: int
+    sold_online: int
+    sold_offline: int
+
+
+@dataclass(frozen=True)
+class DailySales:
+    date: date
+    total: Decimal
+    orders_count: int
+
+
+@dataclass(frozen=True)
+class TopCustomer:
+    name: str
+    email: str
+    orders_count: int
+    total_spent: Decimal
+
+
+def month_range(day=None):
+    """(awal, akhir) bulan UTC yang memuat day"""
+    day = day or datetime.utcnow().date()
+    start = datetime(day.year, day.month, 1)
+    return start, (start + timedelta(days=32)).replace(day=1)
+
+
+def _sales_filter():
+    return models.Order.status.in_(SALES_STATUSES)
+
+
+def _order_totals():
+    """Baris rollup level order (product_id = 0)"""
+    Rollup = models.DailySalesRollup
+    return Rollup.product_id == Rollup.ORDER_TOTAL_PRODUCT_ID
+
+
+def sales_totals(day=None):
+    """Total hari ini dan bulan ini (semua/online/offline) dalam satu query"""
+    today = day or datetime.utcnow().date()
+    month_start, month_end = month_range(day)
+    Rollup = models.DailySalesRollup
+
+    def total(*conditions):
+        return func.coalesce(func.sum(Rollup.total_amount).filter(*conditions), 0)
+
+    is_today = Rollup.sales_date == today
+    online = Rollup.source_type == 'online'
+    offline = Rollup.source_type == 'offline'
+
+    row = db.session.query(
+        total(is_today),
+        total(is_today, online),
+        total(is_today, offline),
+        total(),
+        total(online),
+        total(offline),
+    ).filter(
+        _order_totals(),
+        Rollup.sales_date >= month_start.date(),
+        Rollup.sales_date < month_end.date(),
+    ).one()
+    return SalesTotals(*(Decimal(value or 0) for value in row))
+
+
+def best_sellers(limit=10):
+    """Produk terlaris (semua order terjual) beserta pembagian online/offline"""
+    Rollup, Product = models.DailySalesRollup, models.Product
+    rows = db.session.query(
+        Product.name,
+        func.sum(Rollup.quantity).label('total_sold'),
+        func.sum(case((Rollup.source_type == 'online', Rollup.quantity),
+                      else_=0)).label('sold_online'),
+        func.sum(case((Rollup.source_type == 'offline', Rollup.quantity),
+                      else_=0)).label('sold_offline'),
+    ).select_from(Product)\
+        .join(Rollup, Rollup.product_id == Product.id)\
+        .group_by(Product.id, Product.name)\
+        .having(func.sum(Rollup.quantity) > 0)\
+        .order_by(func.sum(Rollup.quantity).desc())\
+        .limit(limit).all()
+    return [
+        BestSeller(row.name, int(row.total_sold or 0), int(row.sold_online or 0),
+                   int(row.sold_offline or 0)) for row in rows
+    ]
+
+
+def daily_sales(days=7, day=None):
+    """Penjualan per hari untuk `days` hari terakhir (termasuk hari ini)"""
+    today = day or datetime.utcnow().date()
+    since = today - timedelta(days=days - 1)
+    Rollup = models.DailySalesRollup
+    rows = db.session.query(
+        Rollup.sales_date.label('date'),
+        func.coalesce(func.sum(Rollup.total_amount), 0).label('total'),
+        func.coalesce(func.sum(Rollup.orders_count), 0).label('orders_count'),
+    ).filter(
+        _order_totals(),
+        Rollup.sales_date >= since,
+        Rollup.sales_date <= today,
+    ).group_by(Rollup.sales_date)\
+        .having(func.sum(Rollup.orders_count) > 0)\
+        .order_by(Rollup.sales_date).all()
+    return [DailySales(row.date, row.total or Decimal('0'), row.orders_count or 0)
+            for row in rows]
+
+
+def top_customers(limit=5):
+    """Pelanggan (role buyer) dengan total belanja terbesar"""
+    spent = func.coalesce(func.sum(models.Order.total_amount), 0)
+    rows = db.session.query(
+        models.User.name,
+        models.User.email,
+        func.count(models.Order.id).label('orders_count'),
+        spent.label('total_spent'),
+    ).select_from(models.User)\
+        .join(models.Order, models.Order.user_id == models.User.id)\
+        .filter(_sales_filter(), models.User.role == 'buyer')\
+        .group_by(models.User.id, models.User.name, models.User.email)\
+        .order_by(spent.desc()).limit(limit).all()
+    return [TopCustomer(row.name, row.email, row.orders_count or 0,
+                        row.total_spent or Decimal('0')) for row in rows]
@@ -0,0 +1,635 @@
+"""
+Sales export untuk Hurtrock Music Store
+Laporan penjualan detail (Excel) yang ditulis secara streaming: data diambil
+dengan satu query daily_sales_rollup JOIN products (yield_per, urut total
+penjualan produk), lalu setiap produk langsung ditulis ke worksheet openpyxl
+mode write-only, jadi memori tidak bertambah mengikuti panjang periode laporan.
+
+Laporan penjualan, laporan transaksi kasir dan invoice Excel dikerjakan
+sebagai export job di background (lihat export_jobs) dan memakai NamedStyle
+bersama dari excel_styles.
+
+Data penjualan dan transaksi kasir juga bisa diekspor sebagai CSV (streaming)
+atau Parquet (kolumnar, membutuhkan pyarrow) untuk pipeline akuntansi; ketiga
+format membaca dari query yang sama (iter_product_sales dan
+cashier_transactions_query).
+"""
+
+import csv
+import io
+import json
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from itertools import groupby
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import selectinload
+
+import models
+from database import db
+from export_jobs import export_job_queue
+
+from excel_styles import (OPENPYXL_AVAILABLE, XLSX_MIMETYPE, RowWriter, register_styles,
+                          set_column_widths)
+
+if OPENPYXL_AVAILABLE:
+    from openpyxl import Workbook
+    from openpyxl.worksheet.worksheet import Worksheet
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+EXPORT_BATCH_SIZE = 500
+EXPORT_FORMATS = ('xlsx', 'csv', 'parquet')
+CSV_MIMETYPE = 'text/csv'
+PARQUET_MIMETYPE = 'application/vnd.apache.parquet'
+
+PRODUCT_HEADERS = [
+    'No', 'Nama Produk', 'Harga Satuan (DB)', 'Qty Online', 'Nilai Online',
+    'Qty Kasir', 'Nilai Kasir', 'Total Qty', 'Total Nilai',
+    'Metode Pembayaran (Detail per Channel)'
+]
+COLUMN_WIDTHS = [5, 30, 15, 10, 15, 10, 15, 10, 15, 40]
+
+# Kolom export CSV/Parquet: (nama, tipe Parquet)
+SALES_COLUMNS = [
+    ('period_start', 'date'), ('period_end', 'date'),
+    ('product_id', 'int'), ('product_name', 'string'), ('unit_price', 'float'),
+    ('online_qty', 'int'), ('online_amount', 'float'),
+    ('offline_qty', 'int'), ('offline_amount', 'float'),
+    ('total_qty', 'int'), ('total_amount', 'float'),
+    ('payment_methods', 'string'),  # JSON {metode: {online, offline}}
+]
+CASHIER_COLUMNS = [
+    ('transaction_id', 'int'), ('local_transaction_id', 'string'),
+    ('transaction_date', 'timestamp'), ('cashier_name', 'string'),
+    ('customer_name', 'string'), ('payment_method', 'string'),
+    ('items', 'string'), ('item_count', 'int'),
+    ('subtotal', 'float'), ('tax_amount', 'float'), ('discount_amount', 'float'),
+    ('total_amount', 'float'), ('sync_status', 'string'),
+]
+
+
+def format_idr(amount):
+    return f"Rp {amount:,.0f}".replace(',', '.')
+
+
+def payment_method_label(payment_method, is_online):
+    """Nama metode pembayaran standar beserta channel-nya"""
+    raw = (payment_method or 'tidak diketahui').lower()
+    if 'virtual' in raw or 'va' in raw or 'transfer' in raw:
+        return 'Virtual Account (Web/Marketplace)' if is_online else 'Transfer Bank (Kasir)'
+    if raw == 'cash':
+        return 'Cash (Kasir Toko)'
+    if raw == 'debit':
+        return 'Debit Card (Kasir)'
+    if raw == 'qris':
+        return 'QRIS (Web/Marketplace)' if is_online else 'QRIS (Kasir Toko)'
+    if 'ewallet' in raw or 'wallet' in raw:
+        return 'E-Wallet (OVO/Dana/LinkAja)'
+    if 'credit' in raw or 'kartu kredit' in raw:
+        return 'Kartu Kredit'
+    return raw.title()
+
+
+def missing_export_package(export_format):
+    """Nama package yang belum terpasang untuk format export, None jika siap"""
+    if export_format == 'xlsx' and not OPENPYXL_AVAILABLE:
+        return 'openpyxl'
+    if export_format == 'parquet' and not PYARROW_AVAILABLE:
+        return 'pyarrow'
+    return None
+
+
+def export_kind(report, export_format):
+    """Kind export job untuk laporan + format, mis. sales_report_csv"""
+    return report if export_format == 'xlsx' else f'{report}_{export_format}'
+
+
+@dataclass
+class ProductSales:
+    """Penjualan satu produk dalam periode, per channel dan metode bayar"""
+    product_id: int
+    name: str
+    price: float
+    online_qty: int = 0
+    offline_qty: int = 0
+    online_amount: float = 0.0
+    offline_amount: float = 0.0
+    payment_methods: dict = field(default_factory=dict)  # label -> {'online', 'offline'}
+
+    @property
+    def total_qty(self):
+        return self.online_qty + self.offline_qty
+
+    @property
+    def total_amount(self):
+        return self.online_amount + self.offline_amount
+
+
+def count_products(start_date, end_date):
+    """Jumlah produk terjual dalam rentang tanggal (untuk progress export)"""
+    Rollup = models.DailySalesRollup
+    return db.session.scalar(select(func.count(func.distinct(Rollup.product_id))).where(
+        Rollup.sales_date >= start_date,
+        Rollup.sales_date <= end_date,
+        Rollup.product_id != Rollup.ORDER_TOTAL_PRODUCT_ID,
+    )) or 0
+
+
+def iter_product_sales(start_date, end_date, batch_size=EXPORT_BATCH_SIZE):
+    """
+    ProductSales per produk untuk rentang tanggal [start_date, end_date],
+    urut total penjualan menurun. Baris dibaca bertahap (yield_per).
+    """
+    Rollup, Product = models.DailySalesRollup, models.Product
+    revenue = func.sum(Rollup.revenue)
+    product_total = func.sum(revenue).over(partition_by=Rollup.product_id)
+    stmt = select(
+        Rollup.product_id, Product.name, Product.price,
+        Rollup.source_type, Rollup.payment_method,
+        func.sum(Rollup.quantity).label('quantity'),
+        revenue.label('revenue'),
+    ).outerjoin(Product, Product.id == Rollup.product_id).where(
+        Rollup.sales_date >= start_date,
+        Rollup.sales_date <= end_date,
+        Rollup.product_id != Rollup.ORDER_TOTAL_PRODUCT_ID,
+    ).group_by(
+        Rollup.product_id, Product.name, Product.price,
+        Rollup.source_type, Rollup.payment_method,
+    ).order_by(product_total.desc(), Rollup.product_id).execution_options(
+        yield_per=batch_size)
+
+    rows = db.session.execute(stmt)
+    for product_id, group in groupby(rows, key=lambda row: row.product_id):
+        sales = None
+        for row in group:
+            quantity = int(row.quantity or 0)
+            amount = float(row.revenue or 0)
+            if not quantity and not amount:
+                continue
+            if sales is None:
+                # Harga dari database; produk yang sudah dihapus memakai harga rata-rata
+                price = float(row.price) if row.price is not None else (
+                    amount / quantity if quantity else 0)
+                sales = ProductSales(product_id, row.name or f"Product ID {product_id}", price)
+
+            channel = 'online' if row.source_type == 'online' else 'offline'
+            if channel == 'online':
+                sales.online_qty += quantity
+                sales.online_amount += amount
+            else:
+                sales.offline_qty += quantity
+                sales.offline_amount += amount
+            label = payment_method_label(row.payment_method, channel == 'online')
+            channels = sales.payment_methods.setdefault(label, {'online': 0, 'offline': 0})
+            channels[channel] += amount
+        if sales:
+            yield sales
+
+
+def _no_progress(done, total):
+    pass
+
+
+def _store_info_lines(store_profile):
+    """Baris kontak toko yang terisi, mis. 'Telp: 0812...'"""
+    if not store_profile:
+        return []
+    store_info = [
+        ('Alamat', store_profile.store_address),
+        ('Telp', store_profile.store_phone),
+        ('Email', store_profile.store_email),
+        ('WhatsApp', getattr(store_profile, 'whatsapp_number', None)),
+        ('Website', getattr(store_profile, 'website', None)),
+    ]
+    return [f"{label}: {value}" for label, value in store_info if value]
+
+
+def write_sales_report(fileobj, store_profile, period, period_text, start_date, end_date,
+                       progress=_no_progress):
+    """Tulis laporan penjualan detail (xlsx) ke fileobj"""
+    wb = register_styles(Workbook(write_only=True))
+    ws = wb.create_sheet(f"Laporan {period.title()}")
+    ws.page_setup.orientation = Worksheet.ORIENTATION_LANDSCAPE
+    ws.page_setup.paperSize = Worksheet.PAPERSIZE_A4
+    set_column_widths(ws, COLUMN_WIDTHS)
+    sheet = RowWriter(ws)
+    full_width = [('A', 'I')]
+
+    # Header toko
+    sheet.append(["HURTROCK MUSIC STORE"], 'hr_title', height=35, merges=full_width)
+    sheet.append(["LAPORAN PENJUALAN DETAIL"], 'hr_subtitle', height=22, merges=full_width)
+    for line in _store_info_lines(store_profile):
+        sheet.append([line], 'hr_info', height=18, merges=full_width)
+
+    sheet.skip()
+    sheet.append([f"Periode: {period_text}"], 'hr_period', height=20, merges=full_width)
+    sheet.skip(height=5)
+
+    sheet.append(PRODUCT_HEADERS, 'hr_table_header', height=35)
+
+    # Baris per produk, ditulis langsung dari hasil query
+    product_styles = [
+        'hr_cell_center', 'hr_cell_text', 'hr_cell_money_bold', 'hr_cell_center',
+        'hr_cell_money', 'hr_cell_center', 'hr_cell_money', 'hr_cell_center_bold',
+        'hr_cell_money_bold', 'hr_cell_note',
+    ]
+    total_online_amount = 0
+    total_offline_amount = 0
+    payment_method_totals = {}
+    product_count = count_products(start_date, end_date)
+
+    for idx, sales in enumerate(iter_product_sales(start_date, end_date), 1):
+        progress(idx, product_count)
+        payment_details = []
+        for method, channels in sorted(sales.payment_methods.items(),
+                                       key=lambda x: x[1]['online'] + x[1]['offline'],
+                                       reverse=True):
+            if channels['online'] > 0:
+                payment_details.append(f"{method} [Online]: {format_idr(channels['online'])}")
+            if channels['offline'] > 0:
+                payment_details.append(f"{method} [Kasir]: {format_idr(channels['offline'])}")
+            totals = payment_method_totals.setdefault(method, {'online': 0, 'offline': 0})
+            totals['online'] += channels['online']
+            totals['offline'] += channels['offline']
+
+        sheet.append([
+            idx, sales.name, format_idr(sales.price),
+            sales.online_qty, format_idr(sales.online_amount),
+            sales.offline_qty, format_idr(sales.offline_amount),
+            sales.total_qty, format_idr(sales.total_amount),
+            '; '.join(payment_details) if payment_details else '-',
+        ], product_styles)
+        total_online_amount += sales.online_amount
+        total_offline_amount += sales.offline_amount
+
+    # Ringkasan total online, kasir dan grand total
+    sheet.skip()
+    summary = [
+        ("TOTAL PENJUALAN ONLINE", total_online_amount, 'hr_subtotal'),
+        ("TOTAL PENJUALAN KASIR", total_offline_amount, 'hr_subtotal'),
+        ("GRAND TOTAL", total_online_amount + total_offline_amount, 'hr_grand_total'),
+    ]
+    for label, amount, style in summary:
+        sheet.append([label, None, None, format_idr(amount)], style,
+                     merges=[('A', 'C'), ('D', 'E')])
+
+    # Breakdown metode pembayaran per channel
+    sheet.skip()
+    sheet.append(["BREAKDOWN METODE PEMBAYARAN (Online Web/Marketplace & Offline Kasir Toko)"],
+                 'hr_section_title', merges=[('A', 'J')])
+    breakdown_merges = [('A', 'D'), ('E', 'F'), ('G', 'H'), ('I', 'J')]
+    sheet.append(["Metode Pembayaran", None, None, None, "Online (Web/Marketplace)", None,
+                  "Offline (Kasir Toko)", None, "Total"],
+                 'hr_table_header_small', merges=breakdown_merges)
+    breakdown_styles = ['hr_cell_text', None, None, None, 'hr_cell_money', None,
+                        'hr_cell_money', None, 'hr_cell_money_bold']
+    for method, channels in sorted(payment_method_totals.items(),
+                                   key=lambda x: x[1]['online'] + x[1]['offline'],
+                                   reverse=True):
+        sheet.append([method, None, None, None, format_idr(channels['online']), None,
+                      format_idr(channels['offline']), None,
+                      format_idr(channels['online'] + channels['offline'])],
+                     breakdown_styles, merges=breakdown_merges)
+
+    # Footer
+    sheet.skip()
+    sheet.append([f"Dicetak pada: {datetime.utcnow().strftime('%d %B %Y %H:%M:%S')} WIB"],
+                 'hr_footer', merges=full_width)
+
+    wb.save(fileobj)
+
+
+def cashier_transactions_query(cashier, date_from=None, date_to=None):
+    """Transaksi milik satu kasir, difilter tanggal 'YYYY-MM-DD' (tanpa urutan)"""
+    # Base query
+    query = models.OfflineTransaction.query.filter_by(
+        cashier_user_id=cashier.id).options(
+            selectinload(models.OfflineTransaction.offline_items))
+
+    # Apply date filters
+    if date_from:
+        try:
+            date_from_obj = datetime.strptime(date_from, '%Y-%m-%d')
+            query = query.filter(models.OfflineTransaction.transaction_date
+                                 >= date_from_obj)
+        except:
+            pass
+
+    if date_to:
+        try:
+            date_to_obj = datetime.strptime(date_to,
+                                            '%Y-%m-%d') + timedelta(days=1)
+            query = query.filter(
+                models.OfflineTransaction.transaction_date < date_to_obj)
+        except:
+            pass
+
+    return query
+
+
+def _transaction_items(transaction):
+    return "; ".join(
+        f"{item.product_name} x{item.quantity} (@Rp {item.product_price:,.0f})"
+        for item in transaction.offline_items)
+
+
+def iter_cashier_transactions(query, batch_size=EXPORT_BATCH_SIZE):
+    """Transaksi terbaru lebih dulu, dibaca bertahap (yield_per)"""
+    return query.order_by(
+        models.OfflineTransaction.transaction_date.desc()).yield_per(batch_size)
+
+
+def write_cashier_transactions_report(fileobj, cashier, date_from=None, date_to=None,
+                                      progress=_no_progress):
+    """Tulis laporan transaksi kasir (xlsx) milik satu kasir ke fileobj"""
+    query = cashier_transactions_query(cashier, date_from, date_to)
+    transaction_count = query.count()
+
+    # Workbook write-only: transaksi ditulis sambil dibaca bertahap
+    wb = register_styles(Workbook(write_only=True))
+    ws = wb.create_sheet("Laporan Transaksi Kasir")
+    ws.freeze_panes = 'A6'
+    set_column_widths(ws, [5, 25, 20, 20, 18, 50, 15, 12])
+    sheet = RowWriter(ws)
+
+    # Header toko dan info laporan
+    profile = models.StoreProfile.get_cached_profile()
+    date_range = ""
+    if date_from and date_to:
+        date_range = f"Periode: {date_from} s/d {date_to}"
+    elif date_from:
+        date_range = f"Mulai: {date_from}"
+    elif date_to:
+        date_range = f"Sampai: {date_to}"
+    else:
+        date_range = "Semua Transaksi"
+    sheet.append([profile.store_name if profile else "HURTROCK MUSIC STORE"],
+                 'hr_brand_title', merges=[('A', 'H')])
+    sheet.append(["LAPORAN TRANSAKSI KASIR"], 'hr_brand_subtitle', merges=[('A', 'H')])
+    sheet.append([f"{date_range} | Kasir: {cashier.name}"], 'hr_brand_info',
+                 merges=[('A', 'H')])
+    sheet.skip()
+
+    sheet.append([
+        'No', 'ID Transaksi', 'Tanggal & Waktu', 'Nama Pembeli',
+        'Metode Pembayaran', 'Daftar Barang', 'Total', 'Status'
+    ], 'hr_brand_header')
+
+    # Write transaction data
+    row_styles = ['hr_brand_cell'] * 6 + ['hr_brand_cell_money', 'hr_brand_cell']
+    total_amount = 0
+    for idx, transaction in enumerate(iter_cashier_transactions(query), start=1):
+        progress(idx, transaction_count)
+        sheet.append([
+            idx, transaction.local_transaction_id,
+            transaction.transaction_date.strftime('%d/%m/%Y %H:%M:%S'),
+            transaction.customer_name or '-',
+            transaction.payment_method.title(), _transaction_items(transaction),
+            float(transaction.total_amount), 'Tersinkron'
+            if transaction.sync_status == 'synced' else 'Pending'
+        ], row_styles)
+        total_amount += transaction.total_amount
+
+    # Add summary
+    sheet.skip()
+    sheet.append(["TOTAL PENJUALAN", None, None, None, None, None, float(total_amount)],
+                 ['hr_brand_total_label'] + [None] * 5 + ['hr_brand_total'],
+                 merges=[('A', 'F')])
+
+    wb.save(fileobj)
+
+
+def write_invoice_excel(fileobj, invoice_id, progress=_no_progress):
+    """Tulis invoice (xlsx) dengan branding Hurtrock ke fileobj"""
+    invoice = db.session.get(models.Invoice, invoice_id)
+    if invoice is None:
+        raise ValueError(f'Invoice {invoice_id} tidak ditemukan')
+    order = invoice.order if invoice.order_id else None
+
+    # Get store profile from database
+    store_profile = models.StoreProfile.get_cached_profile()
+
+    wb = register_styles(Workbook())
+    ws = wb.active
+    ws.title = f"Invoice {invoice.invoice_number}"
+    set_column_widths(ws, [5, 30, 15, 15, 20])
+    sheet = RowWriter(ws)
+    full_width = [('A', 'E')]
+
+    # Header - nama dan kontak toko
+    sheet.append(["HURTROCK MUSIC STORE"], 'hr_invoice_store', height=35, merges=full_width)
+    for line in _store_info_lines(store_profile):
+        sheet.append([line], 'hr_invoice_info', height=18, merges=full_width)
+    sheet.skip()
+    sheet.skip(height=10)
+
+    # Invoice Title
+    sheet.append(["INVOICE"], 'hr_invoice_title', height=25, merges=full_width)
+
+    # Invoice details
+    sheet.skip()
+    detail_styles = ['hr_invoice_label', None]
+    sheet.append(["Invoice No:", invoice.invoice_number], detail_styles)
+    sheet.append(["Tanggal:", invoice.created_at.strftime('%d-%m-%Y %H:%M')], detail_styles)
+    sheet.append(["Status:", invoice.status], detail_styles)
+
+    # Customer details
+    sheet.skip()
+    sheet.append(["CUSTOMER INFORMATION"], 'hr_invoice_section', height=25, merges=full_width)
+    customer_info = [
+        ("Nama:", invoice.customer_name),
+        ("Email:", invoice.customer_email or '-'),
+        ("Telepon:", invoice.customer_phone or '-'),
+        ("Alamat:", invoice.customer_address or '-'),
+    ]
+    for label, value in customer_info:
+        sheet.append([label, value], detail_styles, merges=[('B', 'E')])
+
+    # Items table
+    sheet.skip()
+    sheet.append(["ITEMS"], 'hr_invoice_section', height=25, merges=full_width)
+    sheet.append(['No', 'Product', 'Qty', 'Price', 'Subtotal'], 'hr_table_header_small')
+
+    # Items data - support both order items and manual invoice items
+    if order and order.order_items:
+        # Invoice dari order
+        items = [(item.product.name, item.quantity, item.price, item.subtotal)
+                 for item in order.order_items]
+    else:
+        # Invoice manual dengan custom items
+        items = [(item.item_name, item.quantity, item.unit_price, item.subtotal)
+                 for item in invoice.items]
+    item_styles = ['hr_invoice_item_center', 'hr_invoice_item_text', 'hr_invoice_item_center',
+                   'hr_invoice_item_money', 'hr_invoice_item_money']
+    for idx, (name, quantity, price, subtotal) in enumerate(items, start=1):
+        sheet.append([idx, name, quantity, f"Rp {price:,.0f}", f"Rp {subtotal:,.0f}"],
+                     item_styles)
+
+    # Totals
+    sheet.skip()
+    total_styles = ['hr_invoice_total_label', None, None, None, 'hr_invoice_total_value']
+    sheet.append(["Subtotal:", None, None, None, f"Rp {invoice.subtotal:,.0f}"],
+                 total_styles, merges=[('A', 'D')])
+    sheet.append(["Shipping Cost:", None, None, None, f"Rp {invoice.shipping_cost:,.0f}"],
+                 total_styles, merges=[('A', 'D')])
+    sheet.append(["TOTAL:", None, None, None, f"Rp {invoice.total_amount:,.0f}"],
+                 'hr_invoice_grand_total', merges=[('A', 'D')])
+
+    # Footer
+    sheet.skip(2)
+    sheet.append(["Terima kasih atas kepercayaan Anda kepada Hurtrock Music Store!"],
+                 'hr_invoice_footer', merges=full_width)
+
+    wb.save(fileobj)
+    return invoice
+
+
+# ===========================
+# CSV / PARQUET
+# ===========================
+
+def iter_sales_rows(start_date, end_date):
+    """Baris SALES_COLUMNS dari iter_product_sales"""
+    for sales in iter_product_sales(start_date, end_date):
+        yield {
+            'period_start': start_date,
+            'period_end': end_date,
+            'product_id': sales.product_id,
+            'product_name': sales.name,
+            'unit_price': sales.price,
+            'online_qty': sales.online_qty,
+            'online_amount': sales.online_amount,
+            'offline_qty': sales.offline_qty,
+            'offline_amount': sales.offline_amount,
+            'total_qty': sales.total_qty,
+            'total_amount': sales.total_amount,
+            'payment_methods': json.dumps(sales.payment_methods, sort_keys=True),
+        }
+
+
+def iter_cashier_rows(query, cashier):
+    """Baris CASHIER_COLUMNS dari cashier_transactions_query"""
+    for transaction in iter_cashier_transactions(query):
+        yield {
+            'transaction_id': transaction.id,
+            'local_transaction_id': transaction.local_transaction_id,
+            'transaction_date': transaction.transaction_date,
+            'cashier_name': cashier.name,
+            'customer_name': transaction.customer_name,
+            'payment_method': transaction.payment_method,
+            'items': _transaction_items(transaction),
+            'item_count': sum(item.quantity for item in transaction.offline_items),
+            'subtotal': float(transaction.subtotal or 0),
+            'tax_amount': float(transaction.tax_amount or 0),
+            'discount_amount': float(transaction.discount_amount or 0),
+            'total_amount': float(transaction.total_amount or 0),
+            'sync_status': transaction.sync_status,
+        }
+
+
+def write_csv(fileobj, columns, rows, total=0, progress=_no_progress):
+    """Tulis rows (dict) sebagai CSV UTF-8 dengan header ke fileobj biner"""
+    text = io.TextIOWrapper(fileobj, encoding='utf-8', newline='')
+    writer = csv.writer(text)
+    names = [name for name, _ in columns]
+    writer.writerow(names)
+    for idx, row in enumerate(rows, 1):
+        progress(idx, total)
+        writer.writerow([row[name] for name in names])
+    text.flush()
+    text.detach()  # fileobj tetap terbuka untuk pemanggil
+
+
+def _parquet_schema(columns):
+    types = {
+        'int': pa.int64(),
+        'float': pa.float64(),
+        'string': pa.string(),
+        'date': pa.date32(),
+        'timestamp': pa.timestamp('us'),
+    }
+    return pa.schema([(name, types[kind]) for name, kind in columns])
+
+
+def write_parquet(fileobj, columns, rows, total=0, progress=_no_progress,
+                  batch_size=EXPORT_BATCH_SIZE):
+    """Tulis rows (dict) sebagai Parquet, satu row group per batch_size baris"""
+    schema = _parquet_schema(columns)
+    batch = []
+    with pq.ParquetWriter(fileobj, schema, compression='snappy') as writer:
+        for idx, row in enumerate(rows, 1):
+            progress(idx, total)
+            batch.append(row)
+            if len(batch) >= batch_size:
+                writer.write_batch(pa.RecordBatch.from_pylist(batch, schema=schema))
+                batch = []
+        if batch:
+            writer.write_batch(pa.RecordBatch.from_pylist(batch, schema=schema))
+
+
+def _write_sales_table(write, params, fileobj, progress):
+    start_date = date.fromisoformat(params['start_date'])
+    end_date = date.fromisoformat(params['end_date'])
+    write(fileobj, SALES_COLUMNS, iter_sales_rows(start_date, end_date),
+          count_products(start_date, end_date), progress)
+    return f'penjualan_{params["period"]}_{start_date:%Y%m%d}_{end_date:%Y%m%d}'
+
+
+def _write_cashier_table(write, params, fileobj, progress):
+    cashier = db.session.get(models.User, params['cashier_user_id'])
+    query = cashier_transactions_query(cashier, params.get('date_from'), params.get('date_to'))
+    write(fileobj, CASHIER_COLUMNS, iter_cashier_rows(query, cashier), query.count(), progress)
+    return f"Transaksi_Kasir_{cashier.name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+
+
+# ===========================
+# EXPORT JOB HANDLERS
+# ===========================
+
+@export_job_queue.handler('sales_report', XLSX_MIMETYPE, '.xlsx')
+def sales_report_job(params, fileobj, progress):
+    write_sales_report(fileobj, models.StoreProfile.get_cached_profile(),
+                       params['period'], params['period_text'],
+                       date.fromisoformat(params['start_date']),
+                       date.fromisoformat(params['end_date']), progress=progress)
+    return f'laporan_penjualan_{params["period"]}_{datetime.utcnow().strftime("%Y%m%d")}.xlsx'
+
+
+@export_job_queue.handler('cashier_transactions', XLSX_MIMETYPE, '.xlsx')
+def cashier_transactions_job(params, fileobj, progress):
+    cashier = db.session.get(models.User, params['cashier_user_id'])
+    write_cashier_transactions_report(fileobj, cashier, params.get('date_from'),
+                                      params.get('date_to'), progress=progress)
+    return f"Laporan_Kasir_{cashier.name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+
+
+@export_job_queue.handler('invoice_excel', XLSX_MIMETYPE, '.xlsx')
+def invoice_excel_job(params, fileobj, progress):
+    invoice = write_invoice_excel(fileobj, params['invoice_id'], progress=progress)
+    return f'invoice_{invoice.invoice_number}.xlsx'
+
+
+@export_job_queue.handler('sales_report_csv', CSV_MIMETYPE, '.csv')
+def sales_csv_job(params, fileobj, progress):
+    return _write_sales_table(write_csv, params, fileobj, progress) + '.csv'
+
+
+@export_job_queue.handler('sales_report_parquet', PARQUET_MIMETYPE, '.parquet')
+def sales_parquet_job(params, fileobj, progress):
+    return _write_sales_table(write_parquet, params, fileobj, progress) + '.parquet'
+
+
+@export_job_queue.handler('cashier_transactions_csv', CSV_MIMETYPE, '.csv')
+def cashier_transactions_csv_job(params, fileobj, progress):
+    return _write_cashier_table(write_csv, params, fileobj, progress) + '.csv'
+
+
+@export_job_queue.handler('cashier_transactions_parquet', PARQUET_MIMETYPE, '.parquet')
+def cashier_transactions_parquet_job(params, fileobj, progress):
+    return _write_cashier_table(write_parquet, params, fileobj, progress) + '.parquet'
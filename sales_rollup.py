@@ -0,0 +1,206 @@
+"""
+Daily sales rollup untuk Hurtrock Music Store
+Memelihara tabel daily_sales_rollup (tanggal UTC x source_type x payment_method
+x produk) secara incremental di dalam transaksi yang sama dengan perubahan
+order, sehingga laporan tidak perlu memindai orders/order_items:
+
+- order masuk ke status penjualan (paid/shipped/delivered): ditambahkan
+- order keluar dari status penjualan (cancelled, pending, dihapus): dikurangi
+- item / total / tanggal / metode bayar order terhitung berubah: selisihnya
+
+Baris product_id = 0 menyimpan total level order (orders_count, total_amount),
+baris per produk menyimpan quantity dan revenue (quantity x price item).
+
+Tabel bisa dibangun ulang dari data mentah dengan
+`flask --app main rebuild-sales-rollup [--since YYYY-MM-DD]`. Tabel yang baru
+dibuat oleh db.create_all() / migrate_db.py masih kosong; backfill_if_empty()
+(dipanggil saat startup) mengisinya sekali dari order yang sudah ada.
+"""
+
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal
+from itertools import chain
+
+from sqlalchemy import event, func, inspect, literal, select
+from sqlalchemy.orm import Session
+
+import models
+from database import db, upsert_insert
+from sales_analytics import SALES_STATUSES
+
+ORDER_TOTAL_PRODUCT_ID = models.DailySalesRollup.ORDER_TOTAL_PRODUCT_ID
+KEY_COLUMNS = ('sales_date', 'source_type', 'payment_method', 'product_id')
+MEASURE_COLUMNS = ('orders_count', 'total_amount', 'quantity', 'revenue')
+
+ORDER_FIELDS = ('status', 'created_at', 'source_type', 'payment_method', 'total_amount')
+ITEM_FIELDS = ('product_id', 'quantity', 'price')
+
+
+def _value(obj, key, old):
+    """Nilai atribut sebelum (old=True) atau sesudah flush"""
+    history = inspect(obj).attrs[key].history
+    if old and history.added:
+        return history.deleted[0] if history.deleted else None
+    return getattr(obj, key)
+
+
+def _order_key(order, old):
+    """((tanggal, source_type, payment_method), total) jika order terhitung, selain itu None"""
+    if _value(order, 'status', old) not in SALES_STATUSES:
+        return None
+    created_at = _value(order, 'created_at', old) or models.get_utc_time()
+    key = (created_at.date(),
+           _value(order, 'source_type', old) or 'online',
+           _value(order, 'payment_method', old) or '')
+    return key, Decimal(_value(order, 'total_amount', old) or 0)
+
+
+def _item_values(item, old):
+    product_id, quantity, price = (_value(item, key, old) for key in ITEM_FIELDS)
+    quantity = quantity or 0
+    return product_id, quantity, Decimal(price or 0) * quantity
+
+
+def _collect_deltas(session, flush_context):
+    """Hitung selisih rollup dari order/item yang berubah lalu upsert (after_flush)"""
+    changed = list(chain(session.new, session.dirty, session.deleted))
+    new = set(session.new)
+    # Termasuk item yang dihapus sebagai orphan (dilepas dari order.order_items):
+    # baru ditandai terhapus di dalam flush, bukan di session.deleted
+    deleted = {obj for obj in changed if flush_context.is_deleted(inspect(obj))}
+    orders = {obj for obj in changed if isinstance(obj, models.Order)}
+    items = {obj for obj in changed if isinstance(obj, models.OrderItem)}
+    if not orders and not items:
+        return
+
+    deltas = defaultdict(lambda: [0, Decimal('0'), 0, Decimal('0')])
+    snapshots = {}
+
+    def order_snapshots(order):
+        if order not in snapshots:
+            snapshots[order] = (None if order in new else _order_key(order, old=True),
+                                None if order in deleted else _order_key(order, old=False))
+        return snapshots[order]
+
+    for order in orders:
+        before, after = order_snapshots(order)
+        if before == after:
+            continue
+        if before:
+            delta = deltas[before[0] + (ORDER_TOTAL_PRODUCT_ID,)]
+            delta[0] -= 1
+            delta[1] -= before[1]
+        if after:
+            delta = deltas[after[0] + (ORDER_TOTAL_PRODUCT_ID,)]
+            delta[0] += 1
+            delta[1] += after[1]
+        # Item order yang statusnya berubah ikut masuk/keluar rollup
+        items.update(order.order_items)
+
+    for item in items:
+        # Item baru yang hanya diisi order_id belum punya relasi order (pending)
+        order = item.order or (item.order_id and session.get(models.Order, item.order_id))
+        if order is None:
+            continue
+        order_before, order_after = order_snapshots(order)
+        before = after = None
+        if order_before and item not in new:
+            before = order_before[0] + _item_values(item, old=True)
+        if order_after and item not in deleted:
+            after = order_after[0] + _item_values(item, old=False)
+        if before == after:
+            continue
+        if before:
+            delta = deltas[before[:4]]
+            delta[2] -= before[4]
+            delta[3] -= before[5]
+        if after:
+            delta = deltas[after[:4]]
+            delta[2] += after[4]
+            delta[3] += after[5]
+
+    rows = [dict(zip(KEY_COLUMNS + MEASURE_COLUMNS, key + tuple(values)))
+            for key, values in deltas.items() if any(values)]
+    if rows:
+        apply_deltas(session.connection(), rows)
+
+
+def apply_deltas(connection, rows):
+    """INSERT ... ON CONFLICT DO UPDATE SET kolom = kolom + excluded.kolom"""
+    table = models.DailySalesRollup.__table__
+    stmt = upsert_insert(connection, table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c[name] for name in KEY_COLUMNS],
+        set_={**{name: table.c[name] + stmt.excluded[name] for name in MEASURE_COLUMNS},
+              'updated_at': stmt.excluded.updated_at})
+    now = models.get_utc_time()
+    connection.execute(stmt, [{**row, 'updated_at': now} for row in rows])
+
+
+def _load_old_value(target, value, oldvalue, initiator):
+    """No-op; didaftarkan dengan active_history agar nilai lama selalu dimuat"""
+
+
+def init_app(app):
+    # Nilai lama dibutuhkan untuk mengurangi baris rollup sebelumnya,
+    # juga saat atribut di-set tanpa dimuat lebih dulu (expired setelah commit)
+    for model, fields in ((models.Order, ORDER_FIELDS), (models.OrderItem, ITEM_FIELDS)):
+        for field in fields:
+            event.listen(getattr(model, field), 'set', _load_old_value, active_history=True)
+    event.listen(Session, 'after_flush', _collect_deltas)
+
+
+def rebuild(since=None):
+    """
+    Bangun ulang rollup dari orders/order_items (seluruhnya, atau mulai
+    tanggal since). Mengembalikan jumlah baris rollup yang ditulis.
+    """
+    Order, OrderItem = models.Order, models.OrderItem
+    Rollup = models.DailySalesRollup
+    table = Rollup.__table__
+
+    sales_date = func.date(Order.created_at)
+    source_type = func.coalesce(Order.source_type, 'online')
+    payment_method = func.coalesce(Order.payment_method, '')
+    conditions = [Order.status.in_(SALES_STATUSES)]
+    delete = table.delete()
+    if since is not None:
+        conditions.append(Order.created_at >= datetime.combine(since, datetime.min.time()))
+        delete = delete.where(Rollup.sales_date >= since)
+
+    order_rows = select(
+        sales_date, source_type, payment_method, literal(ORDER_TOTAL_PRODUCT_ID),
+        func.count(Order.id), func.sum(Order.total_amount), literal(0), literal(0),
+        literal(models.get_utc_time()),
+    ).where(*conditions).group_by(sales_date, source_type, payment_method)
+
+    item_rows = select(
+        sales_date, source_type, payment_method, OrderItem.product_id,
+        literal(0), literal(0), func.sum(OrderItem.quantity),
+        func.sum(OrderItem.quantity * OrderItem.price),
+        literal(models.get_utc_time()),
+    ).join(Order, Order.id == OrderItem.order_id).where(*conditions).group_by(
+        sales_date, source_type, payment_method, OrderItem.product_id)
+
+    columns = list(KEY_COLUMNS + MEASURE_COLUMNS) + ['updated_at']
+    db.session.execute(delete)
+    written = 0
+    for rows in (order_rows, item_rows):
+        written += db.session.execute(table.insert().from_select(columns, rows)).rowcount
+    db.session.commit()
+    return written
+
+
+def backfill_if_empty():
+    """
+    rebuild() jika rollup masih kosong padahal sudah ada order terhitung.
+    Mengembalikan jumlah baris yang ditulis, None jika tidak perlu.
+    """
+    if db.session.query(models.DailySalesRollup.id).first() is not None:
+        return None
+    has_sales = db.session.query(models.Order.id)\
+        .filter(models.Order.status.in_(SALES_STATUSES)).first()
+    if has_sales is None:
+        return None
+    return rebuild()
@@ -5,7 +5,7 @@ Run this script to populate the database with sample products and categories
 
 from main import app
 from database import db
-from models import Category, Product, ShippingService, Supplier, User, StoreProfile
+from models import Category, Product, ShippingService, Supplier, User, StoreProfile, assign_slugs
 from werkzeug.security import generate_password_hash
 from datetime import datetime
 
@@ -413,6 +413,7 @@ def create_sample_data():
         ]
 
         products_created = 0
+        new_products = []
         for product_data in products:
             existing = Product.query.filter_by(name=product_data['name']).first()
             if not existing:
@@ -436,8 +437,10 @@ def create_sample_data():
                     height=product_data.get('height')
                 )
                 db.session.add(product)
+                new_products.append(product)
                 products_created += 1
 
+        assign_slugs(new_products)
         db.session.commit()
         print(f"Sample data created successfully!")
         print(f"Created {len(categories_data)} categories, {products_created} new products, {len(shipping_data)} shipping services, and {len(suppliers_data)} suppliers")
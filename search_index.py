@@ -0,0 +1,216 @@
+"""
+In-process search index untuk Hurtrock Music Store
+Inverted index (trigram) atas produk aktif agar endpoint /search bisa menjawab
+query top-k tanpa query ke PostgreSQL setiap ketikan di live search.
+"""
+
+import heapq
+import threading
+from collections import defaultdict
+
+SEARCH_FIELDS = ('name', 'description', 'brand', 'model', 'gtin')
+TEXT_RESULT_LIMIT = 10
+CATEGORY_RESULT_LIMIT = 50
+
+
+def _trigrams(text):
+    """Return set of 3-character substrings of text"""
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def score_product(search_text, name, brand, model, gtin):
+    """
+    Hitung skor relevansi produk terhadap search_text.
+    Bobot sama dengan scoring lama di route /search.
+    """
+    score = 0
+    search_lower = search_text.lower()
+    name_lower = (name or '').lower()
+    brand_lower = (brand or '').lower()
+    model_lower = (model or '').lower()
+    gtin_lower = (gtin or '').lower()
+
+    # Exact match in name gets highest score
+    if search_lower == name_lower:
+        score += 100
+    # Starts with search term
+    elif name_lower.startswith(search_lower):
+        score += 50
+    # Contains search term
+    elif search_lower in name_lower:
+        score += 30
+
+    # Brand/model matching
+    if search_lower in brand_lower:
+        score += 20
+    if search_lower in model_lower:
+        score += 20
+
+    # GTIN exact match
+    if search_lower == gtin_lower:
+        score += 80
+
+    # Keyword matching bonus
+    for kw in search_lower.split():
+        if kw in name_lower:
+            score += 10
+        if kw in brand_lower:
+            score += 5
+        if kw in model_lower:
+            score += 5
+
+    return score
+
+
+def product_document(product):
+    """Snapshot field produk yang dibutuhkan untuk matching dan response"""
+    images = list(product.images)
+    fields = {
+        field: (getattr(product, field) or '').lower()
+        for field in SEARCH_FIELDS
+    }
+    return {
+        'id': product.id,
+        'name': product.name,
+        'slug': product.slug,
+        'price': str(product.price),
+        'image_url': product.image_url,
+        'brand': product.brand,
+        'model': product.model,
+        'gtin': product.gtin,
+        'description': product.description,
+        'category_id': product.category_id,
+        'category': product.category.name if product.category else '',
+        'has_multiple_images': len(images) > 0,
+        'last_image_url': images[-1].image_url if images else product.image_url,
+        'haystack': '\n'.join(fields.values()),
+    }
+
+
+class ProductSearchIndex:
+    """Trigram inverted index atas produk aktif, disimpan di memori proses"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._docs = {}
+        self._postings = defaultdict(set)
+        self._by_category = defaultdict(set)
+        self._ready = False
+
+    def _add_doc(self, doc):
+        self._docs[doc['id']] = doc
+        self._by_category[doc['category_id']].add(doc['id'])
+        for gram in _trigrams(doc['haystack']):
+            self._postings[gram].add(doc['id'])
+
+    def _remove_doc(self, product_id):
+        doc = self._docs.pop(product_id, None)
+        if not doc:
+            return
+        self._by_category[doc['category_id']].discard(product_id)
+        for gram in _trigrams(doc['haystack']):
+            ids = self._postings.get(gram)
+            if ids is not None:
+                ids.discard(product_id)
+                if not ids:
+                    del self._postings[gram]
+
+    def build(self):
+        """Bangun ulang index dari seluruh produk aktif"""
+        import catalog_queries
+
+        products = catalog_queries.active_products_query().all()
+        docs = [product_document(p) for p in products]
+
+        with self._lock:
+            self._docs = {}
+            self._postings = defaultdict(set)
+            self._by_category = defaultdict(set)
+            for doc in docs:
+                self._add_doc(doc)
+            self._ready = True
+        print(f"[INFO] Search index built with {len(docs)} products")
+
+    def ensure_built(self):
+        if not self._ready:
+            with self._lock:
+                if not self._ready:
+                    self.build()
+
+    def mark_stale(self):
+        """Paksa rebuild pada query berikutnya (misal setelah import massal)"""
+        with self._lock:
+            self._ready = False
+
+    def update_product(self, product):
+        """Sinkronkan satu produk setelah add/edit"""
+        if not self._ready:
+            return  # Akan dibangun penuh saat query berikutnya
+        doc = product_document(product) if product.is_active else None
+        with self._lock:
+            self._remove_doc(product.id)
+            if doc:
+                self._add_doc(doc)
+
+    def remove_product(self, product_id):
+        """Hapus produk dari index setelah delete"""
+        with self._lock:
+            self._remove_doc(product_id)
+
+    def _candidates(self, keyword):
+        """Id produk yang mengandung keyword sebagai substring"""
+        grams = _trigrams(keyword)
+        if not grams:
+            # Keyword < 3 karakter tidak punya trigram, verifikasi semua dokumen
+            return set(self._docs)
+        postings = sorted((self._postings.get(g, set()) for g in grams), key=len)
+        candidates = set(postings[0])
+        for ids in postings[1:]:
+            candidates &= ids
+            if not candidates:
+                break
+        return candidates
+
+    def search(self, search_text, category_id=None, limit=TEXT_RESULT_LIMIT):
+        """
+        Cari produk: setiap keyword harus muncul di salah satu field
+        (name, description, brand, model, gtin). Hasil diurutkan dengan score_product.
+        """
+        self.ensure_built()
+        keywords = search_text.lower().split()
+
+        with self._lock:
+            matched = None
+            for keyword in keywords:
+                ids = {
+                    pid for pid in self._candidates(keyword)
+                    if keyword in self._docs[pid]['haystack']
+                }
+                matched = ids if matched is None else matched & ids
+                if not matched:
+                    return []
+
+            if category_id is not None:
+                matched &= self._by_category.get(category_id, set())
+
+            docs = [self._docs[pid] for pid in matched]
+
+        scored = ((score_product(search_text, d['name'], d['brand'], d['model'],
+                                 d['gtin']), -d['id'], d) for d in docs)
+        return [d for _, _, d in heapq.nlargest(limit, scored, key=lambda s: s[:2])]
+
+    def browse(self, category_id=None, limit=CATEGORY_RESULT_LIMIT):
+        """Produk aktif diurutkan berdasarkan nama (tanpa teks pencarian)"""
+        self.ensure_built()
+        with self._lock:
+            if category_id is None:
+                docs = list(self._docs.values())
+            else:
+                docs = [
+                    self._docs[pid]
+                    for pid in self._by_category.get(category_id, set())
+                ]
+        return heapq.nsmallest(limit, docs, key=lambda d: (d['name'], d['id']))
+
+
+product_search_index = ProductSearchIndex()
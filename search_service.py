@@ -0,0 +1,161 @@
+"""
+Search service untuk Hurtrock Music Store
+Satu modul pencarian produk untuk storefront (/search), admin (invoice manual)
+dan kasir. Backend dipilih lewat config SEARCH_BACKEND:
+
+- 'memory'   : storefront dari in-process search index, admin/kasir via ILIKE
+- 'postgres' : pencocokan ILIKE yang dipercepat index pg_trgm (lihat migrasi
+               product_search_vector), tie-breaker ranking dengan similarity
+
+Kedua backend memakai aturan pencocokan dan LIMIT yang sama, jadi query yang
+sama menghasilkan produk yang sama; postgres hanya menambah tie-breaker
+similarity() sebelum urutan nama.
+"""
+
+import re
+
+from flask import current_app
+from sqlalchemy import case, func, literal
+
+import catalog_queries
+import models
+from database import db
+from search_index import (CATEGORY_RESULT_LIMIT, SEARCH_FIELDS, TEXT_RESULT_LIMIT,
+                          product_document, product_search_index)
+
+SEARCH_BACKENDS = ('memory', 'postgres')
+ADMIN_RESULT_LIMIT = 50
+CASHIER_RESULT_LIMIT = 100
+# Kolom yang dicocokkan (substring) dengan teks pencarian kasir
+CASHIER_SEARCH_FIELDS = ('name', 'description', 'brand', 'gtin')
+
+
+def get_backend():
+    """Backend aktif dari app.config['SEARCH_BACKEND'] (default: memory)"""
+    backend = current_app.config.get('SEARCH_BACKEND', 'memory')
+    if backend not in SEARCH_BACKENDS:
+        print(f"[WARNING] Unknown SEARCH_BACKEND '{backend}', using memory")
+        return 'memory'
+    return backend
+
+
+def _contains_condition(fields, text):
+    """
+    text muncul (case-insensitive, % dan _ literal) di salah satu kolom fields.
+    ILIKE pada kolom langsung agar index trigram GIN bisa dipakai.
+    """
+    pattern = '%' + re.sub(r'([\\%_])', r'\\\1', text) + '%'
+    return db.or_(*(getattr(models.Product, field).ilike(pattern, escape='\\')
+                    for field in fields))
+
+
+def _keyword_condition(keyword):
+    """Sama dengan search_index.search: keyword substring salah satu SEARCH_FIELDS"""
+    return _contains_condition(SEARCH_FIELDS, keyword)
+
+
+def _score_expression(search_text):
+    """Versi SQL dari search_index.score_product (bobot identik)"""
+    search_lower = search_text.lower()
+    name = func.lower(func.coalesce(models.Product.name, ''))
+    brand = func.lower(func.coalesce(models.Product.brand, ''))
+    model = func.lower(func.coalesce(models.Product.model, ''))
+    gtin = func.lower(func.coalesce(models.Product.gtin, ''))
+
+    score = case(
+        (name == search_lower, 100),
+        (name.startswith(search_lower, autoescape=True), 50),
+        (name.contains(search_lower, autoescape=True), 30),
+        else_=0)
+    score = score + case((brand.contains(search_lower, autoescape=True), 20), else_=0)
+    score = score + case((model.contains(search_lower, autoescape=True), 20), else_=0)
+    score = score + case((gtin == search_lower, 80), else_=0)
+
+    for kw in search_lower.split():
+        score = score + case((name.contains(kw, autoescape=True), 10), else_=0)
+        score = score + case((brand.contains(kw, autoescape=True), 5), else_=0)
+        score = score + case((model.contains(kw, autoescape=True), 5), else_=0)
+
+    return score
+
+
+def search_storefront(search_text, category_id=None, limit=TEXT_RESULT_LIMIT):
+    """Pencarian live search storefront, hasil berupa product_document"""
+    if get_backend() == 'memory':
+        return product_search_index.search(search_text,
+                                           category_id=category_id,
+                                           limit=limit)
+
+    keywords = search_text.lower().split()
+    query = catalog_queries.active_products_query(category_id=category_id)
+    for keyword in keywords:
+        query = query.filter(_keyword_condition(keyword))
+
+    products = query.order_by(
+        _score_expression(search_text).desc(),
+        func.similarity(models.Product.name, search_text).desc(),
+        models.Product.id).limit(limit).all()
+    return [product_document(p) for p in products]
+
+
+def browse_storefront(category_id=None, limit=CATEGORY_RESULT_LIMIT):
+    """Produk aktif urut nama, untuk /search tanpa teks (filter kategori saja)"""
+    if get_backend() == 'memory':
+        return product_search_index.browse(category_id=category_id, limit=limit)
+
+    products = catalog_queries.active_products_query(
+        category_id=category_id).order_by(
+        models.Product.name, models.Product.id).limit(limit).all()
+    return [product_document(p) for p in products]
+
+
+def search_admin(query_text, limit=ADMIN_RESULT_LIMIT):
+    """Pencarian produk untuk invoice manual: ID, awalan GTIN, atau nama"""
+    search_conditions = []
+
+    # 1. Exact ID match (prioritize)
+    if query_text.isdigit():
+        search_conditions.append(models.Product.id == int(query_text))
+
+    # 2. GTIN prefix match
+    search_conditions.append(models.Product.gtin.ilike(f'{query_text}%'))
+
+    # 3. Name partial match
+    search_conditions.append(models.Product.name.ilike(f'%{query_text}%'))
+
+    query = models.Product.query.filter(models.Product.is_active == True,
+                                        db.or_(*search_conditions))
+
+    if get_backend() == 'memory':
+        return query.order_by(models.Product.name).limit(limit).all()
+
+    exact_id = models.Product.id == int(query_text) if query_text.isdigit() else literal(False)
+    return query.order_by(
+        case((exact_id, 0), (models.Product.gtin == query_text, 1), else_=2),
+        func.similarity(models.Product.name, query_text).desc(),
+        models.Product.name).limit(limit).all()
+
+
+def search_cashier(search, category_id=None):
+    """
+    Produk untuk layar kasir; tanpa search mengembalikan seluruh katalog aktif.
+    Dengan search: ID persis atau teks utuh di CASHIER_SEARCH_FIELDS, paling
+    banyak CASHIER_RESULT_LIMIT produk (ID/GTIN persis dan skor tertinggi dulu).
+    """
+    query = catalog_queries.active_products_query(images=False)
+
+    if category_id:
+        query = query.filter_by(category_id=int(category_id))
+
+    if not search:
+        return query.all()
+
+    exact_id = models.Product.id == int(search) if search.isdigit() else literal(False)
+    query = query.filter(db.or_(exact_id, _contains_condition(CASHIER_SEARCH_FIELDS, search)))
+
+    order = [case((exact_id, 0), (models.Product.gtin == search, 1), else_=2),
+             _score_expression(search).desc()]
+    if get_backend() == 'postgres':
+        order.append(func.similarity(models.Product.name, search).desc())
+    return query.order_by(*order, models.Product.name, models.Product.id)\
+        .limit(CASHIER_RESULT_LIMIT).all()
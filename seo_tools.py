@@ -94,7 +94,7 @@ def validate_seo_setup():
         
         print("\n=== REKOMENDASI ===")
         if products_without_slug > 0:
-            print("- Jalankan script untuk generate slug untuk semua produk")
+            print("- Jalankan: flask --app main backfill-slugs")
         if products_without_desc > 0:
             print("- Tambahkan deskripsi untuk produk yang belum ada")
         print("- Submit sitemap.xml ke Google Search Console")
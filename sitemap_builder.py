@@ -0,0 +1,454 @@
+"""
+Sitemap & product feed builder untuk Hurtrock Music Store
+sitemap.xml dan product-feed.xml ditulis ke disk oleh thread background
+(bukan saat crawler request), dengan streaming produk per batch (yield_per)
+sehingga katalog besar tidak pernah dimuat sekaligus ke memori.
+
+- Lebih dari MAX_URLS_PER_SITEMAP URL: sitemap.xml menjadi sitemap index
+  yang menunjuk ke sitemap-1.xml, sitemap-2.xml, ...
+- ETag = hash isi file, Last-Modified = waktu terakhir isi file berubah
+- Perubahan field Product/ProductImage/Category yang tampil di sitemap/feed
+  menandai sitemap dirty (stok hanya saat ketersediaan berubah, bukan setiap
+  checkout); rebuild dijalankan setelah DEBOUNCE_SECONDS agar import massal
+  cukup satu rebuild
+- Antar proses (worker gunicorn, CLI, export worker): mark_dirty menyentuh
+  file DIRTY_FILE, thread builder (dimulai saat request pertama, tidak di
+  perintah CLI) membangun ulang jika penanda lebih baru dari manifest, dan
+  build diserialisasi dengan file lock
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from xml.sax.saxutils import escape
+
+from flask import abort, send_file
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session, selectinload
+
+import models
+from database import db
+
+try:
+    import fcntl
+except ImportError:  # Windows: tanpa lock antar proses
+    fcntl = None
+
+MAX_URLS_PER_SITEMAP = 50000
+MAX_SITEMAP_BYTES = 50 * 1024 * 1024 - 1024  # batas protokol 50MB, sisakan footer
+BATCH_SIZE = 500
+DEBOUNCE_SECONDS = 30
+REFRESH_INTERVAL = 6 * 60 * 60  # rebuild berkala walau tidak ada perubahan
+POLL_INTERVAL = 60  # detik, cek penanda dirty dari proses lain
+MANIFEST_FILE = 'manifest.json'
+DIRTY_FILE = '.dirty'
+LOCK_FILE = '.build.lock'
+
+# Field yang ikut ditulis ke sitemap/feed; perubahan field lain tidak memicu rebuild
+PRODUCT_FIELDS = ('name', 'slug', 'description', 'brand', 'price', 'image_url',
+                  'weight', 'is_active', 'created_at')
+PRODUCT_IMAGE_FIELDS = ('image_url', 'product_id')
+CATEGORY_FIELDS = ('is_active',)
+
+SITEMAP_NS = ('xmlns="http://www.sitemaps.org/schemas/sitemap/0.9" '
+              'xmlns:image="http://www.google.com/schemas/sitemap-image/1.1"')
+
+# (path, changefreq, priority) halaman statis
+STATIC_PAGES = [
+    ('', 'daily', '1.0'),
+    ('products', 'daily', '0.9'),
+    ('store-info', 'monthly', '0.6'),
+    ('login', 'yearly', '0.3'),
+    ('register', 'yearly', '0.3'),
+]
+
+
+class _HashingWriter:
+    """File writer yang menghitung sha1 dan ukuran sambil menulis"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'w', encoding='utf-8')
+        self._hash = hashlib.sha1()
+        self.size = 0
+
+    def write(self, text):
+        data = text.encode('utf-8')
+        self._hash.update(data)
+        self.size += len(data)
+        self._file.write(text)
+
+    def close(self):
+        self._file.close()
+        return self._hash.hexdigest()
+
+
+class _SitemapWriter:
+    """Tulis <url> ke sitemap-N.xml, pindah file baru saat batas URL/ukuran tercapai"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.files = {}  # nama file -> etag
+        self._writer = None
+        self._count = 0
+
+    def _open(self):
+        name = f'sitemap-{len(self.files) + 1}.xml'
+        self._writer = _HashingWriter(os.path.join(self.directory, name))
+        self._writer.write(f'<?xml version="1.0" encoding="UTF-8"?>\n<urlset {SITEMAP_NS}>\n')
+        self._count = 0
+
+    def _close(self):
+        self._writer.write('</urlset>\n')
+        self.files[os.path.basename(self._writer.path)] = self._writer.close()
+        self._writer = None
+
+    def add(self, entry):
+        if self._writer and (self._count >= MAX_URLS_PER_SITEMAP
+                             or self._writer.size + len(entry) > MAX_SITEMAP_BYTES):
+            self._close()
+        if self._writer is None:
+            self._open()
+        self._writer.write(entry)
+        self._count += 1
+
+    def finish(self):
+        if self._writer is None:
+            self._open()
+        self._close()
+        return self.files
+
+
+def _url_entry(loc, lastmod, changefreq, priority, images=()):
+    parts = [f'  <url>\n    <loc>{escape(loc)}</loc>\n    <lastmod>{lastmod}</lastmod>\n'
+             f'    <changefreq>{changefreq}</changefreq>\n    <priority>{priority}</priority>\n']
+    for image_loc, title, caption in images:
+        parts.append(f'    <image:image>\n      <image:loc>{escape(image_loc)}</image:loc>\n'
+                     f'      <image:title>{escape(title)}</image:title>\n'
+                     f'      <image:caption>{escape(caption)}</image:caption>\n    </image:image>\n')
+    parts.append('  </url>\n')
+    return ''.join(parts)
+
+
+def _absolute(site_url, path):
+    return f"{site_url}/{(path or '').lstrip('/')}"
+
+
+def _product_path(product):
+    return f'produk/{product.slug}' if product.slug else f'produk/id/{product.id}'
+
+
+def _product_url_entry(site_url, product):
+    images = []
+    if product.image_url:
+        images.append((_absolute(site_url, product.image_url), product.name,
+                       product.description[:160] if product.description else product.name))
+    for index, image in enumerate(product.images, 1):
+        images.append((_absolute(site_url, image.image_url),
+                       f'{product.name} - Gambar {index}',
+                       f"{product.name} dari {product.brand or 'Hurtrock Music Store'}"))
+    lastmod = (product.created_at or datetime.utcnow()).strftime('%Y-%m-%d')
+    return _url_entry(_absolute(site_url, _product_path(product)), lastmod,
+                      'weekly', '0.8', images)
+
+
+def _cdata(text):
+    return '<![CDATA[' + (text or '').replace(']]>', ']]]]><![CDATA[>') + ']]>'
+
+
+def _feed_item(site_url, product):
+    lines = [
+        '    <item>',
+        f'      <g:id>{product.id}</g:id>',
+        f'      <title>{_cdata(product.name)}</title>',
+        f'      <link>{escape(_absolute(site_url, _product_path(product)))}</link>',
+        f'      <description>{_cdata(product.description or product.name)}</description>',
+    ]
+    if product.image_url:
+        lines.append(f'      <g:image_link>{escape(_absolute(site_url, product.image_url))}</g:image_link>')
+    lines.append(f"      <g:brand>{_cdata(product.brand or 'Hurtrock')}</g:brand>")
+    lines.append('      <g:condition>new</g:condition>')
+    if product.price:
+        lines.append(f'      <g:price>{product.price:.2f} IDR</g:price>')
+    availability = 'in stock' if product.stock_quantity and product.stock_quantity > 0 else 'out of stock'
+    lines.append(f'      <g:availability>{availability}</g:availability>')
+    lines.append(f'      <g:shipping_weight>{float(product.weight or 4000):.2f} g</g:shipping_weight>')
+    lines.append('    </item>\n')
+    return '\n'.join(lines)
+
+
+class SitemapBuilder:
+    """Bangun file sitemap/feed di background dan layani dengan ETag/Last-Modified"""
+
+    def __init__(self):
+        self.app = None
+        self.directory = None
+        self._dirty = threading.Event()
+        self._build_lock = threading.Lock()
+        self._manifest = None
+        self._manifest_mtime = None
+        self._thread = None
+        self._thread_pid = None
+        self._thread_lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+        self.directory = app.config.get('SITEMAP_FOLDER') or os.path.join(
+            app.instance_path, 'sitemaps')
+        os.makedirs(self.directory, exist_ok=True)
+
+        event.listen(Session, 'after_flush', _collect_catalog_changes)
+        event.listen(Session, 'after_commit', self._after_commit)
+
+        # Stok lama dibutuhkan untuk mendeteksi perubahan ketersediaan di feed
+        event.listen(models.Product.stock_quantity, 'set', _load_old_value,
+                     active_history=True)
+
+        # Thread dimulai saat request pertama: perintah CLI tidak membangun sitemap
+        if app.config.get('SITEMAP_BACKGROUND', True):
+            app.before_request(self._ensure_thread)
+
+    def _ensure_thread(self):
+        if self._thread_pid == os.getpid():
+            return
+        with self._thread_lock:
+            if self._thread_pid == os.getpid():
+                return
+            self._thread = threading.Thread(target=self._run, name='sitemap-builder',
+                                            daemon=True)
+            self._thread.start()
+            self._thread_pid = os.getpid()
+
+    def _after_commit(self, session):
+        if session.info.pop('sitemap_dirty', False):
+            self.mark_dirty()
+
+    def mark_dirty(self):
+        """Tandai sitemap perlu dibangun ulang (juga terlihat oleh proses lain)"""
+        try:
+            with open(os.path.join(self.directory, DIRTY_FILE), 'a'):
+                pass
+            os.utime(os.path.join(self.directory, DIRTY_FILE))
+        except OSError as e:
+            print(f"[WARNING] Could not mark sitemap dirty: {e}")
+        self._dirty.set()
+
+    def needs_build(self):
+        """Belum ada manifest, ada perubahan setelah build terakhir, atau sudah basi"""
+        try:
+            built = os.stat(os.path.join(self.directory, MANIFEST_FILE)).st_mtime
+        except OSError:
+            return True
+        try:
+            dirty = os.stat(os.path.join(self.directory, DIRTY_FILE)).st_mtime
+        except OSError:
+            dirty = 0
+        return dirty >= built or time.time() - built > REFRESH_INTERVAL
+
+    def _run(self):
+        while True:
+            if self.needs_build():
+                if self._manifest_exists():
+                    # Tunggu perubahan lain (import massal) sebelum rebuild
+                    time.sleep(DEBOUNCE_SECONDS)
+                try:
+                    with self.app.app_context():
+                        self.build(only_if_needed=True)
+                except Exception as e:
+                    print(f"[ERROR] Sitemap generation failed: {e}")
+            self._dirty.wait(timeout=POLL_INTERVAL)
+            self._dirty.clear()
+
+    @contextmanager
+    def _process_lock(self):
+        """Satu build pada satu waktu di semua proses yang memakai folder ini"""
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(self.directory, LOCK_FILE), 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def build(self, only_if_needed=False):
+        """Tulis ulang sitemap.xml (+ child sitemaps) dan product-feed.xml"""
+        with self._build_lock, self._process_lock():
+            if only_if_needed and not self.needs_build():
+                return  # Proses lain baru saja membangun
+            # Waktu snapshot data: perubahan setelah ini membuat needs_build() True
+            snapshot_time = time.time()
+            started = time.monotonic()
+            site_url = self.app.config.get('SITE_URL', '').rstrip('/')
+            today = datetime.utcnow().strftime('%Y-%m-%d')
+            tmp_dir = tempfile.mkdtemp(prefix='.build-', dir=self.directory)
+            try:
+                files, url_count = self._write_files(tmp_dir, site_url, today)
+                self._publish(tmp_dir, files, snapshot_time)
+            finally:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+            print(f"[INFO] Sitemap built: {url_count} URLs in {len(files) - 1} files "
+                  f"({time.monotonic() - started:.1f}s)")
+
+    def _write_files(self, tmp_dir, site_url, today):
+        sitemaps = _SitemapWriter(tmp_dir)
+        for path, changefreq, priority in STATIC_PAGES:
+            sitemaps.add(_url_entry(_absolute(site_url, path), today, changefreq, priority))
+        url_count = len(STATIC_PAGES)
+
+        feed = _HashingWriter(os.path.join(tmp_dir, 'product-feed.xml'))
+        feed.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                   '<rss version="2.0" xmlns:g="http://base.google.com/ns/1.0">\n'
+                   '  <channel>\n'
+                   '    <title>Hurtrock Music Store</title>\n'
+                   f'    <link>{escape(site_url)}</link>\n'
+                   '    <description>Produk alat musik berkualitas dari Hurtrock Music Store</description>\n'
+                   f'    <lastBuildDate>{today}</lastBuildDate>\n\n')
+
+        # Session terpisah dari request, hanya membaca
+        with Session(db.engine) as session:
+            products = session.scalars(
+                select(models.Product).where(
+                    models.Product.is_active == True).options(
+                        selectinload(models.Product.images)).order_by(
+                            models.Product.id).execution_options(yield_per=BATCH_SIZE))
+            for product in products:
+                sitemaps.add(_product_url_entry(site_url, product))
+                feed.write(_feed_item(site_url, product))
+                url_count += 1
+
+            categories = session.query(models.Category.id).filter(
+                models.Category.is_active == True).order_by(models.Category.id)
+            for (category_id,) in categories:
+                sitemaps.add(_url_entry(_absolute(site_url, f'products?category={category_id}'),
+                                        today, 'weekly', '0.7'))
+                url_count += 1
+
+        feed.write('  </channel>\n</rss>\n')
+        files = {'product-feed.xml': feed.close()}
+
+        children = sitemaps.finish()
+        if len(children) == 1:
+            os.replace(os.path.join(tmp_dir, 'sitemap-1.xml'),
+                       os.path.join(tmp_dir, 'sitemap.xml'))
+            files['sitemap.xml'] = children['sitemap-1.xml']
+        else:
+            files.update(children)
+            index = _HashingWriter(os.path.join(tmp_dir, 'sitemap.xml'))
+            index.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                        '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n')
+            for name in children:
+                index.write(f'  <sitemap>\n    <loc>{escape(_absolute(site_url, name))}</loc>\n'
+                            f'    <lastmod>{today}</lastmod>\n  </sitemap>\n')
+            index.write('</sitemapindex>\n')
+            files['sitemap.xml'] = index.close()
+        return files, url_count
+
+    def _publish(self, tmp_dir, files, snapshot_time):
+        """Pindahkan file baru secara atomik dan perbarui manifest"""
+        previous = self._load_manifest() or {}
+        now = time.time()
+        manifest = {}
+        for name, etag in files.items():
+            old = previous.get(name)
+            last_modified = old['last_modified'] if old and old['etag'] == etag else now
+            manifest[name] = {'etag': etag, 'last_modified': last_modified}
+            os.replace(os.path.join(tmp_dir, name), os.path.join(self.directory, name))
+
+        for name in previous:
+            if name not in manifest:
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+
+        manifest_tmp = os.path.join(tmp_dir, MANIFEST_FILE)
+        with open(manifest_tmp, 'w') as f:
+            json.dump(manifest, f)
+        # mtime manifest = waktu snapshot, dibandingkan dengan DIRTY_FILE
+        os.utime(manifest_tmp, (snapshot_time, snapshot_time))
+        os.replace(manifest_tmp, os.path.join(self.directory, MANIFEST_FILE))
+
+    def _manifest_exists(self):
+        return os.path.exists(os.path.join(self.directory, MANIFEST_FILE))
+
+    def _load_manifest(self):
+        """Manifest dibaca ulang jika file berubah (bisa ditulis worker lain)"""
+        path = os.path.join(self.directory, MANIFEST_FILE)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+        if mtime != self._manifest_mtime:
+            with open(path) as f:
+                self._manifest = json.load(f)
+            self._manifest_mtime = mtime
+        return self._manifest
+
+    def send(self, name):
+        """Response file sitemap/feed; 304 jika ETag/Last-Modified cocok"""
+        manifest = self._load_manifest()
+        if manifest is None:
+            # Belum pernah dibangun: minta crawler mencoba lagi nanti
+            self.mark_dirty()
+            return 'Sitemap is being generated', 503, {'Retry-After': '120'}
+        entry = manifest.get(name)
+        if entry is None:
+            abort(404)
+
+        response = send_file(os.path.join(self.directory, name),
+                             mimetype='application/xml',
+                             etag=entry['etag'],
+                             last_modified=datetime.fromtimestamp(entry['last_modified'],
+                                                                  tz=timezone.utc),
+                             max_age=3600,
+                             conditional=True)
+        return response
+
+
+def _load_old_value(target, value, oldvalue, initiator):
+    """No-op; didaftarkan dengan active_history agar nilai lama selalu dimuat"""
+
+
+def _in_stock(quantity):
+    return bool(quantity and quantity > 0)
+
+
+def _changes_sitemap(obj):
+    """True jika perubahan obj (dirty) mengubah isi sitemap/feed"""
+    state = inspect(obj)
+    if isinstance(obj, models.Product):
+        fields = PRODUCT_FIELDS
+        # Feed hanya memuat in stock / out of stock, bukan jumlah stok
+        history = state.attrs.stock_quantity.history
+        if history.has_changes():
+            before = history.deleted[0] if history.deleted else None
+            if _in_stock(before) != _in_stock(obj.stock_quantity):
+                return True
+    elif isinstance(obj, models.ProductImage):
+        fields = PRODUCT_IMAGE_FIELDS
+    else:
+        fields = CATEGORY_FIELDS
+    return any(state.attrs[field].history.has_changes() for field in fields)
+
+
+def _collect_catalog_changes(session, flush_context):
+    watched = (models.Product, models.ProductImage, models.Category)
+    for obj in (*session.new, *session.deleted):
+        if isinstance(obj, watched):
+            session.info['sitemap_dirty'] = True
+            return
+    for obj in session.dirty:
+        if isinstance(obj, watched) and _changes_sitemap(obj):
+            session.info['sitemap_dirty'] = True
+            return
+
+
+sitemap_builder = SitemapBuilder()
@@ -0,0 +1,25 @@
+import unittest
+
+from flask import Flask
+
+from database import db
+
+
+class DatabaseTestCase(unittest.TestCase):
+    """App Flask dengan database SQLite in-memory yang dibuat ulang per test"""
+
+    config = {}
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        self.app.config.update(self.config)
+        db.init_app(self.app)
+        self.context = self.app.app_context()
+        self.context.push()
+        db.create_all()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.context.pop()
@@ -0,0 +1,149 @@
+import tempfile
+import unittest
+from unittest import mock
+
+from flask import Flask, render_template_string
+
+import catalog_queries
+import models
+from database import db
+from tests import DatabaseTestCase
+
+# Akses per produk yang sama dengan kartu produk di products.html dan
+# galeri/breadcrumb di product_detail.html
+PRODUCT_CARDS = """
+{% for product in products %}
+  {{ product.name }} {{ product.category.name }}
+  {% if product.thumbnail_image %}{{ product.thumbnail_image.variants }}{% endif %}
+  {% for image in product.images %}{{ image.image_url }}{% endfor %}
+{% endfor %}
+"""
+PRODUCT_DETAIL = """
+{{ product.name }} {{ product.category.name }} {{ product.images|length }}
+{% for image in product.images %}{{ image.image_url }} {{ image.is_thumbnail }}{% endfor %}
+""" + PRODUCT_CARDS.replace('products', 'related_products')
+
+
+class FakeCountQuery:
+    def __init__(self, count):
+        self.count_value = count
+        self.calls = 0
+
+    def order_by(self, *args):
+        return self
+
+    def count(self):
+        self.calls += 1
+        return self.count_value
+
+
+class CachedCountTest(unittest.TestCase):
+
+    def setUp(self):
+        catalog_queries.invalidate_product_counts()
+
+    def tearDown(self):
+        catalog_queries.invalidate_product_counts()
+
+    def test_cached_within_ttl(self):
+        query = FakeCountQuery(7)
+        self.assertEqual(catalog_queries.cached_count(('products', None, 'gitar'), query), 7)
+        self.assertEqual(catalog_queries.cached_count(('products', None, 'gitar'), query), 7)
+        self.assertEqual(query.calls, 1)
+
+    def test_bounded_by_max_entries(self):
+        limit = catalog_queries.COUNT_CACHE_MAX_ENTRIES
+        first = FakeCountQuery(1)
+        catalog_queries.cached_count(('products', None, 'search-0'), first)
+        for i in range(1, limit + 50):
+            catalog_queries.cached_count(('products', None, f'search-{i}'), FakeCountQuery(i))
+        self.assertEqual(len(catalog_queries._count_cache), limit)
+        # Key tertua sudah dibuang, jadi dihitung ulang
+        catalog_queries.cached_count(('products', None, 'search-0'), first)
+        self.assertEqual(first.calls, 2)
+
+
+class CatalogCacheSyncTest(unittest.TestCase):
+    """Dua instance dengan instance/ yang sama = dua proses (web, export worker)"""
+
+    def setUp(self):
+        app = Flask(__name__, instance_path=tempfile.mkdtemp())
+        self.web = catalog_queries.CatalogCacheSync()
+        self.web.init_app(app)
+        self.worker = catalog_queries.CatalogCacheSync()
+        self.worker.init_app(app)
+        catalog_queries.cached_count(('products', None, ''), FakeCountQuery(3))
+
+    def tearDown(self):
+        catalog_queries.invalidate_product_counts()
+
+    def test_refresh_in_other_process_invalidates_on_next_request(self):
+        with mock.patch.object(catalog_queries, 'CATALOG_SYNC_INTERVAL', 0), \
+                mock.patch('search_index.product_search_index.mark_stale') as mark_stale:
+            self.web.check()
+            self.assertEqual(len(catalog_queries._count_cache), 1)
+            self.worker.notify()
+            self.web.check()
+            self.assertEqual(len(catalog_queries._count_cache), 0)
+            mark_stale.assert_called_once_with()
+            # Sekali per perubahan
+            self.web.check()
+            mark_stale.assert_called_once_with()
+
+
+class ListingQueryCountTest(DatabaseTestCase):
+    """Jumlah query listing/detail tidak boleh bertambah per produk (N+1)"""
+
+    def setUp(self):
+        super().setUp()
+        catalog_queries.invalidate_product_counts()
+        for c in range(2):
+            category = models.Category(name=f'Kategori {c}')
+            db.session.add(category)
+            db.session.flush()
+            for p in range(15):
+                product = models.Product(name=f'Produk {c}-{p}', slug=f'produk-{c}-{p}',
+                                         price=100, category_id=category.id,
+                                         image_url=f'/img/{c}-{p}-0.jpg')
+                db.session.add(product)
+                db.session.flush()
+                for i in range(3):
+                    db.session.add(models.ProductImage(product_id=product.id,
+                                                       image_url=f'/img/{c}-{p}-{i}.jpg',
+                                                       is_thumbnail=(i == 0)))
+        db.session.commit()
+        db.session.expunge_all()
+
+    def tearDown(self):
+        super().tearDown()
+        catalog_queries.invalidate_product_counts()
+
+    def test_product_listing(self):
+        # COUNT + produk JOIN kategori + SELECT IN gambar
+        with catalog_queries.assert_max_queries(3):
+            pagination = catalog_queries.paginate_products(
+                catalog_queries.active_products_query(), count_key=('products', None, ''))
+            html = render_template_string(PRODUCT_CARDS, products=pagination.items)
+        self.assertEqual(len(pagination.items), 24)
+        self.assertIn('Kategori 1', html)
+
+    def test_product_detail(self):
+        # produk + gambar, lalu produk terkait + gambarnya
+        with catalog_queries.assert_max_queries(4):
+            product = catalog_queries.with_listing_relations(
+                models.Product.query.filter_by(slug='produk-0-3')).first()
+            html = render_template_string(
+                PRODUCT_DETAIL, product=product,
+                related_products=catalog_queries.related_products(product))
+        self.assertIn('/img/0-3-2.jpg', html)
+        self.assertIn('Produk 0-0', html)
+
+    def test_assert_max_queries_reports_n_plus_one(self):
+        products = models.Product.query.limit(5).all()
+        with self.assertRaises(AssertionError):
+            with catalog_queries.assert_max_queries(3):
+                render_template_string(PRODUCT_CARDS, products=products)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import tempfile
+import unittest
+from datetime import timedelta
+from unittest import mock
+
+import models
+from database import db
+from export_jobs import STALE_AFTER, ExportJobQueue, JobProgress
+from tests import DatabaseTestCase
+
+
+class ExportJobHeartbeatTest(DatabaseTestCase):
+    config = {'EXPORT_WORKER': 'external'}
+
+    def setUp(self):
+        self.config = {**self.config, 'EXPORT_FOLDER': tempfile.mkdtemp()}
+        super().setUp()
+        self.queue = ExportJobQueue()
+        self.queue.init_app(self.app)
+        user = models.User(email='admin@example.com', password_hash='x', name='Admin')
+        db.session.add(user)
+        db.session.commit()
+        self.user_id = user.id
+
+    def running_job(self, started_ago, beat_ago):
+        now = models.get_utc_time()
+        job = models.ExportJob(kind='sales_report', params='{}', user_id=self.user_id,
+                               status='running', attempts=1,
+                               started_at=now - started_ago, updated_at=now - beat_ago)
+        db.session.add(job)
+        db.session.commit()
+        return job.id
+
+    def test_long_running_job_with_heartbeat_is_kept(self):
+        job_id = self.running_job(started_ago=timedelta(hours=2),
+                                  beat_ago=timedelta(seconds=30))
+        self.assertEqual(self.queue.requeue_stale(), 0)
+        self.assertEqual(db.session.get(models.ExportJob, job_id).status, 'running')
+
+    def test_job_without_heartbeat_is_requeued(self):
+        job_id = self.running_job(started_ago=STALE_AFTER * 2,
+                                  beat_ago=STALE_AFTER + timedelta(minutes=1))
+        self.assertEqual(self.queue.requeue_stale(), 1)
+        self.assertEqual(db.session.get(models.ExportJob, job_id).status, 'queued')
+
+    def test_progress_refreshes_heartbeat(self):
+        job_id = self.running_job(started_ago=STALE_AFTER * 2, beat_ago=STALE_AFTER * 2)
+        progress = JobProgress(job_id)
+        progress(10, 100)
+        progress.beat()
+        db.session.expire_all()
+        job = db.session.get(models.ExportJob, job_id)
+        self.assertEqual(job.progress, 10)
+        # started_at dan heartbeat lama sudah lewat STALE_AFTER; hanya updated_at baru
+        self.assertEqual(self.queue.requeue_stale(), 0)
+
+
+class ExportWorkerThreadTest(DatabaseTestCase):
+    config = {'EXPORT_WORKER': 'thread'}
+
+    def test_thread_starts_on_first_request_not_on_init(self):
+        self.app.config['EXPORT_FOLDER'] = tempfile.mkdtemp()
+        self.app.add_url_rule('/', 'index', lambda: 'ok')
+        queue = ExportJobQueue()
+        with mock.patch.object(ExportJobQueue, '_run_thread') as run_thread:
+            queue.init_app(self.app)
+            # Perintah CLI hanya mengimpor app: tidak ada worker yang mengambil job
+            self.assertIsNone(queue._thread)
+            client = self.app.test_client()
+            client.get('/')
+            client.get('/')
+            queue._thread.join()
+        run_thread.assert_called_once_with()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import io
+import os
+import tempfile
+import unittest
+
+from PIL import ExifTags, Image
+
+from image_cache import ImageResizeCache
+
+
+def jpeg(path, size, orientation=None):
+    exif = Image.Exif()
+    if orientation:
+        exif[ExifTags.Base.Orientation] = orientation
+    Image.new('RGB', size, 'blue').save(path, 'JPEG', exif=exif)
+
+
+class ResizeOrientationTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = ImageResizeCache()
+        self.directory = tempfile.mkdtemp()
+        # Tersimpan 200x100, tampil 100x200 (EXIF orientation 6, foto HP portrait)
+        self.rotated = os.path.join(self.directory, 'rotated.jpg')
+        jpeg(self.rotated, (200, 100), orientation=6)
+
+    def resized_size(self, path, width, height):
+        data = self.cache.resize(path, width, height)
+        if data is None:
+            return None
+        with Image.open(io.BytesIO(data)) as img:
+            return img.size
+
+    def test_height_box_uses_displayed_axes(self):
+        self.assertEqual(self.resized_size(self.rotated, 0, 100), (50, 100))
+
+    def test_already_fits_uses_displayed_axes(self):
+        self.assertIsNone(self.resized_size(self.rotated, 100, 0))
+
+    def test_width_box_uses_displayed_axes(self):
+        self.assertEqual(self.resized_size(self.rotated, 50, 0), (50, 100))
+
+    def test_unrotated_image(self):
+        path = os.path.join(self.directory, 'plain.jpg')
+        jpeg(path, (200, 100))
+        self.assertEqual(self.resized_size(path, 100, 0), (100, 50))
+        self.assertIsNone(self.resized_size(path, 0, 100))
+
+
+if __name__ == '__main__':
+    unittest.main()
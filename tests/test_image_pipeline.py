@@ -0,0 +1,85 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from flask import Flask
+from PIL import Image
+
+from image_pipeline import ImagePipeline, VARIANT_FORMATS, generate_variants, variant_widths
+
+
+class VariantWidthsTest(unittest.TestCase):
+
+    def test_wider_than_largest_variant(self):
+        self.assertEqual(variant_widths(3000), [200, 400, 800, 1600])
+
+    def test_equal_to_largest_variant(self):
+        self.assertEqual(variant_widths(1600), [200, 400, 800, 1600])
+
+    def test_narrower_than_largest_variant(self):
+        self.assertEqual(variant_widths(1000), [200, 400, 800, 1000])
+        self.assertEqual(variant_widths(800), [200, 400, 800])
+        self.assertEqual(variant_widths(150), [150])
+
+    def test_large_image_writes_each_variant_once(self):
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, 'photo.jpg')
+        Image.new('RGB', (2000, 1000), 'red').save(path)
+        with Image.open(path) as img:
+            manifest = generate_variants(img, path)
+        for fmt in VARIANT_FORMATS:
+            self.assertEqual(list(manifest['formats'][fmt]), ['1600', '800', '400', '200'])
+        written = os.listdir(os.path.join(directory, 'variants'))
+        self.assertEqual(len(written), 4 * len(VARIANT_FORMATS))
+
+
+class ImagePipelinePoolTest(unittest.TestCase):
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config['IMAGE_WORKERS'] = 2
+        self.app.add_url_rule('/', 'index', lambda: 'ok')
+        self.pipeline = ImagePipeline()
+        directory = tempfile.mkdtemp()
+        self.paths = []
+        for index, size in enumerate(((400, 300), (300, 400))):
+            path = os.path.join(directory, f'photo{index}.jpg')
+            Image.new('RGB', size, 'red').save(path)
+            self.paths.append(path)
+
+    def tearDown(self):
+        self.pipeline.shutdown()
+
+    def test_pool_is_created_on_first_request_not_on_init(self):
+        self.pipeline.init_app(self.app)
+        # Perintah CLI hanya mengimpor app: tidak ada proses yang di-fork
+        self.assertIsNone(self.pipeline._get_executor())
+        self.app.test_client().get('/')
+        self.assertIsNotNone(self.pipeline._get_executor())
+        results = self.pipeline.process(self.paths)
+        self.assertEqual([result.orientation for result in results], ['landscape', 'portrait'])
+
+    def test_process_without_pool_does_not_fork(self):
+        # Mis. perintah CLI yang memproses gambar
+        self.pipeline.workers = 2
+        with mock.patch('image_pipeline.ProcessPoolExecutor') as executor:
+            results = self.pipeline.process(self.paths)
+        executor.assert_not_called()
+        self.assertEqual([result.orientation for result in results], ['landscape', 'portrait'])
+
+    def test_timeout_resets_pool_and_processes_inline(self):
+        self.pipeline.init_app(self.app)
+        self.pipeline.start()
+        with mock.patch('image_pipeline.PROCESS_TIMEOUT', 0):
+            results = self.pipeline.process(self.paths)
+        self.assertEqual([result.orientation for result in results], ['landscape', 'portrait'])
+        self.assertIsNone(self.pipeline._get_executor())
+        # Request berikutnya tidak mem-fork ulang dari proses yang sudah ber-thread
+        with mock.patch('image_pipeline.ProcessPoolExecutor') as executor:
+            self.app.test_client().get('/')
+        executor.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,198 @@
+import io
+import os
+import tempfile
+import time
+import unittest
+from datetime import datetime, timezone
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+import media_store
+import models
+from database import db
+from media_store import chat_media, product_media
+from tests import DatabaseTestCase
+
+DAY = 24 * 3600
+
+
+class MediaStoreTestCase(DatabaseTestCase):
+
+    def setUp(self):
+        self.config = {**self.config, 'UPLOAD_FOLDER': tempfile.mkdtemp(),
+                       'UPLOADS_MEDIA_FOLDER': tempfile.mkdtemp()}
+        super().setUp()
+        media_store.init_app(self.app)
+        category = models.Category(name='Gitar')
+        db.session.add(category)
+        user = models.User(email='admin@example.com', password_hash='x', name='Admin')
+        db.session.add(user)
+        db.session.flush()
+        self.category_id = category.id
+        self.user_id = user.id
+        db.session.commit()
+
+    def tearDown(self):
+        event.remove(Session, 'after_flush', media_store._collect_references)
+        super().tearDown()
+
+    def save(self, content, store=product_media, filename='foto.jpg'):
+        return store.save(io.BytesIO(content), filename)
+
+    def backdate(self, stored, seconds):
+        """Upload (file dan uploaded_at) seolah terjadi seconds detik yang lalu"""
+        past = time.time() - seconds
+        os.utime(stored.path, (past, past))
+        models.MediaObject.query.filter_by(url=stored.url).update(
+            {'uploaded_at': datetime.fromtimestamp(past, timezone.utc)})
+        db.session.commit()
+
+    def refs(self, url):
+        db.session.expire_all()
+        return media_store.reference_count(url)
+
+    def add_product(self, image_url=None, images=()):
+        product = models.Product(name='Gitar', price=100, category_id=self.category_id,
+                                 image_url=image_url)
+        product.images = [models.ProductImage(image_url=url) for url in images]
+        db.session.add(product)
+        db.session.commit()
+        return product
+
+
+class MediaStoreSaveTest(MediaStoreTestCase):
+
+    def test_same_content_stored_once(self):
+        first = self.save(b'isi foto')
+        second = self.save(b'isi foto', filename='lain.jpeg')
+        self.assertTrue(first.created)
+        self.assertFalse(second.created)
+        self.assertEqual(first.url, second.url)
+        self.assertTrue(product_media.owns(first.url))
+        self.assertEqual([entry.path for entry in product_media.files()], [first.path])
+
+    def test_reupload_keeps_file_mtime(self):
+        """mtime = cache key /img dan ETag; upload ulang hanya memperbarui uploaded_at"""
+        stored = self.save(b'isi foto')
+        self.backdate(stored, 2 * DAY)
+        mtime_ns = os.stat(stored.path).st_mtime_ns
+
+        self.save(b'isi foto')
+        self.assertEqual(os.stat(stored.path).st_mtime_ns, mtime_ns)
+        uploaded = media_store.uploaded_times([stored.url])[stored.url]
+        self.assertLess(time.time() - media_store.last_uploaded(os.stat(stored.path), uploaded),
+                        60)
+        self.assertEqual(self.refs(stored.url), 0)
+
+
+class ReferenceCountTest(MediaStoreTestCase):
+
+    def test_product_images(self):
+        a, b = self.save(b'foto a'), self.save(b'foto b')
+        product = self.add_product(image_url=a.url, images=[a.url, b.url])
+        self.assertEqual((self.refs(a.url), self.refs(b.url)), (2, 1))
+
+        product.image_url = b.url
+        db.session.commit()
+        self.assertEqual((self.refs(a.url), self.refs(b.url)), (1, 2))
+
+        # Dilepas dari product.images: dihapus sebagai orphan
+        product.images = [image for image in product.images if image.image_url != a.url]
+        db.session.commit()
+        self.assertEqual(models.ProductImage.query.count(), 1)
+        self.assertEqual((self.refs(a.url), self.refs(b.url)), (0, 2))
+
+        db.session.delete(product)
+        db.session.commit()
+        self.assertEqual((self.refs(a.url), self.refs(b.url)), (0, 0))
+
+    def test_chat_messages(self):
+        media = self.save(b'video', store=chat_media, filename='klip.mp4')
+        room = models.ChatRoom(name='buyer_1')
+        room.messages = [models.ChatMessage(user_id=self.user_id, user_name='Admin',
+                                            message='', media_url=media.url)
+                         for _ in range(2)]
+        db.session.add(room)
+        db.session.commit()
+        self.assertEqual(self.refs(media.url), 2)
+
+        room.messages = room.messages[:1]
+        db.session.commit()
+        self.assertEqual(self.refs(media.url), 1)
+
+    def test_foreign_urls_ignored(self):
+        self.add_product(image_url='https://cdn.example.com/a.jpg',
+                         images=['/static/public/produk_images/lama.jpg'])
+        self.assertEqual(models.MediaObject.query.count(), 0)
+
+    def test_release(self):
+        stored = self.save(b'isi foto')
+        product = self.add_product(images=[stored.url])
+        self.backdate(stored, 2 * media_store.PENDING_GRACE_SECONDS)
+        self.assertFalse(product_media.release(stored.url))
+
+        product.images = []
+        db.session.commit()
+        self.assertTrue(product_media.release(stored.url))
+        self.assertFalse(os.path.exists(stored.path))
+
+    def test_release_keeps_recent_upload(self):
+        stored = self.save(b'isi foto')
+        self.backdate(stored, 2 * media_store.PENDING_GRACE_SECONDS)
+        self.save(b'isi foto')
+        self.assertFalse(product_media.release(stored.url))
+        self.assertTrue(os.path.exists(stored.path))
+
+
+class CollectGarbageTest(MediaStoreTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.used = self.save(b'dipakai')
+        self.unused = self.save(b'tidak dipakai')
+        self.recent = self.save(b'baru')
+        self.chat = self.save(b'chat', store=chat_media, filename='foto.png')
+        self.add_product(images=[self.used.url])
+        for stored in (self.used, self.unused, self.recent, self.chat):
+            self.backdate(stored, 2 * DAY)
+        # Upload ulang isi yang sama: masa tenggang mulai lagi
+        self.save(b'baru')
+
+    def test_dry_run(self):
+        removed, freed = media_store.collect_garbage(dry_run=True)
+        self.assertEqual(sorted(removed), sorted([self.unused.url, self.chat.url]))
+        self.assertEqual(freed, self.unused.size + self.chat.size)
+        for stored in (self.used, self.unused, self.recent, self.chat):
+            self.assertTrue(os.path.exists(stored.path))
+
+    def test_collect(self):
+        removed, _ = media_store.collect_garbage()
+        self.assertEqual(sorted(removed), sorted([self.unused.url, self.chat.url]))
+        self.assertTrue(os.path.exists(self.used.path))
+        self.assertTrue(os.path.exists(self.recent.path))
+        self.assertFalse(os.path.exists(self.unused.path))
+        self.assertFalse(os.path.exists(self.chat.path))
+        self.assertEqual(sorted(obj.url for obj in models.MediaObject.query),
+                         sorted([self.used.url, self.recent.url]))
+
+    def test_recount(self):
+        """Referensi yang ditulis di luar after_flush (layanan chat Django)"""
+        models.MediaObject.query.filter_by(url=self.used.url).update({'ref_count': 0})
+        db.session.execute(models.ChatMessage.__table__.insert().values(
+            room_id=1, user_id=self.user_id, user_name='Buyer', message='',
+            media_url=self.chat.url))
+        db.session.commit()
+
+        removed, _ = media_store.collect_garbage()
+        self.assertEqual(removed, [self.unused.url])
+        self.assertEqual(self.refs(self.used.url), 1)
+        self.assertEqual(self.refs(self.chat.url), 1)
+
+    def test_grace_seconds(self):
+        removed, _ = media_store.collect_garbage(grace_seconds=3 * DAY)
+        self.assertEqual(removed, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
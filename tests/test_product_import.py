@@ -0,0 +1,163 @@
+import io
+import tempfile
+import unittest
+from decimal import Decimal
+
+from openpyxl import Workbook
+
+import models
+import product_import
+from database import db
+from export_jobs import export_job_queue
+from product_import import IMPORT_HEADERS
+from tests import DatabaseTestCase
+
+
+def workbook(rows, headers=IMPORT_HEADERS):
+    """File template import: header, baris petunjuk, lalu rows (dict kolom -> nilai)"""
+    wb = Workbook()
+    ws = wb.active
+    ws.append(headers)
+    ws.append(['Petunjuk pengisian'])
+    for row in rows:
+        ws.append([row.get(header) for header in headers])
+    fileobj = io.BytesIO()
+    wb.save(fileobj)
+    fileobj.seek(0)
+    return fileobj
+
+
+def row(name, price=100000, stock=5, category='Gitar', **values):
+    return {'nama_produk': name, 'harga': price, 'stok_awal': stock, 'kategori': category,
+            **values}
+
+
+class ProductImportTest(DatabaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        category = models.Category(name='Gitar')
+        db.session.add(category)
+        db.session.flush()
+        self.category_id = category.id
+        db.session.add(models.Product(name='Gitar Lama', slug='gitar-lama', price=500,
+                                      stock_quantity=1, category_id=category.id,
+                                      gtin='111', brand='Yamaha'))
+        db.session.add(models.Product(name='Capo', slug='capo', price=50,
+                                      stock_quantity=10, category_id=category.id))
+        db.session.commit()
+
+    def product(self, name):
+        db.session.expire_all()
+        return models.Product.query.filter_by(name=name).one()
+
+    def import_rows(self, rows, mode='insert', headers=IMPORT_HEADERS):
+        return product_import.import_products(workbook(rows, headers), mode=mode)
+
+    def test_insert(self):
+        result = self.import_rows([
+            row('Gitar Baru', brand='Ibanez', warna='Merah', garansi_bulan=12, gtin='222'),
+            row('Gitar Baru 2', aktif='tidak'),
+        ])
+        self.assertEqual((result.imported_count, result.error_count), (2, 0))
+        product = self.product('Gitar Baru')
+        self.assertEqual((product.slug, product.gtin, product.brand), ('gitar-baru', '222', 'Ibanez'))
+        self.assertEqual(product.description, 'Warna: Merah\nGaransi: 12 bulan')
+        self.assertTrue(product.is_active)
+        self.assertFalse(self.product('Gitar Baru 2').is_active)
+
+    def test_insert_errors(self):
+        result = self.import_rows([
+            row('Gitar Lama'),
+            row('Gitar GTIN Sama', gtin='111'),
+            row('Gitar A', gtin='333'),
+            row('Gitar B', gtin='333'),
+            row('Gitar A'),
+            row('', price=10),
+            row('Harga Salah', price='abc'),
+            row('Kategori Salah', category='Drum'),
+        ])
+        self.assertEqual(result.imported_count, 1)
+        self.assertEqual([(error.row_num, error.message) for error in result.errors], [
+            (3, 'Produk "Gitar Lama" sudah ada'),
+            (4, 'GTIN "111" sudah dipakai'),
+            (6, 'GTIN "333" sudah dipakai'),
+            (7, 'Produk "Gitar A" sudah ada'),
+            (8, 'Nama produk wajib diisi'),
+            (9, 'Harga harus berupa angka positif'),
+            (10, 'Kategori "Drum" tidak ditemukan'),
+        ])
+
+    def test_template_without_gtin_column(self):
+        result = self.import_rows([row('Gitar Tanpa GTIN')], headers=IMPORT_HEADERS[:-1])
+        self.assertEqual(result.imported_count, 1)
+
+    def test_wrong_header(self):
+        with self.assertRaises(product_import.HeaderMismatch):
+            self.import_rows([], headers=['nama'] + IMPORT_HEADERS[1:])
+
+    def test_upsert(self):
+        result = self.import_rows([
+            # Cocok lewat GTIN (ON CONFLICT (gtin)): nama dan harga berubah
+            row('Gitar Lama Baru', price=450, stock=2, gtin='111'),
+            # Cocok lewat nama, brand kosong mempertahankan nilai lama
+            row('Capo', price=60, stock=10),
+            row('Gitar Baru', gtin='444'),
+        ], mode='upsert')
+        self.assertEqual((result.imported_count, result.updated_count,
+                          result.unchanged_count, result.error_count), (1, 2, 0, 0))
+        updated = self.product('Gitar Lama Baru')
+        self.assertEqual((updated.slug, updated.price, updated.stock_quantity, updated.brand),
+                         ('gitar-lama', Decimal('450'), 2, 'Yamaha'))
+        self.assertEqual(self.product('Capo').price, Decimal('60'))
+        self.assertEqual(models.Product.query.count(), 3)
+
+    def test_upsert_unchanged_and_conflicts(self):
+        result = self.import_rows([
+            row('Gitar Lama', price=500, stock=1, gtin='111'),
+            row('Capo', price=50, stock=10, gtin='555'),
+            row('Gitar Lama', price=400, gtin='111'),
+            row('Capo Lain', gtin='111'),
+        ], mode='upsert')
+        self.assertEqual((result.unchanged_count, result.updated_count), (1, 1))
+        self.assertEqual([(error.row_num, error.message) for error in result.errors], [
+            (5, 'Produk yang sama sudah ada di baris lain dalam file'),
+            (6, 'Produk yang sama sudah ada di baris lain dalam file'),
+        ])
+        self.assertEqual(self.product('Capo').gtin, '555')
+
+    def test_upsert_name_with_other_gtin(self):
+        result = self.import_rows([row('Gitar Lama', gtin='999')], mode='upsert')
+        self.assertEqual([error.message for error in result.errors],
+                         ['Produk "Gitar Lama" sudah ada dengan GTIN lain (111)'])
+
+    def test_error_report_can_be_reuploaded(self):
+        result = self.import_rows([row('Gitar OK'), row('Gitar Rusak', price=-1)])
+        report = io.BytesIO()
+        product_import.write_error_report(report, result)
+        report.seek(0)
+        rows = list(product_import.read_rows(report))
+        self.assertEqual([(row_num, values[0]) for row_num, values in rows],
+                         [(3, 'Gitar Rusak')])
+
+    def test_product_import_job(self):
+        self.app.config.update(EXPORT_FOLDER=tempfile.mkdtemp(), EXPORT_WORKER='external')
+        export_job_queue.init_app(self.app)
+        upload_id = export_job_queue.save_upload(
+            workbook([row('Gitar Job', gtin='777'), row('Gitar Lama')]), '.xlsx')
+        progress = []
+        report = io.BytesIO()
+        download_name, summary = product_import.product_import_job(
+            {'upload_id': upload_id, 'import_mode': 'insert', 'filename': 'produk.xlsx'},
+            report, lambda done, total: progress.append((done, total)))
+        self.assertTrue(download_name.endswith('.xlsx'))
+        self.assertEqual((summary['imported_count'], summary['error_count']), (1, 1))
+        self.assertEqual(self.product('Gitar Job').gtin, '777')
+        with self.assertRaises(FileNotFoundError):
+            product_import.parse_upload(upload_id)
+        self.assertTrue(progress)
+        self.assertTrue(all(done <= total for done, total in progress))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,150 @@
+import unittest
+from datetime import date, datetime
+from decimal import Decimal
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+import models
+import sales_rollup
+from database import db
+from tests import DatabaseTestCase
+
+DAY = date(2026, 10, 1)
+NEXT_DAY = date(2026, 10, 2)
+
+
+class SalesRollupTest(DatabaseTestCase):
+    maxDiff = None
+    """Rollup incremental harus sama dengan rebuild() dari orders/order_items"""
+
+    def setUp(self):
+        super().setUp()
+        sales_rollup.init_app(self.app)
+        user = models.User(email='kasir@example.com', password_hash='x', name='Kasir')
+        db.session.add(user)
+        db.session.commit()
+        self.user_id = user.id
+
+    def tearDown(self):
+        event.remove(Session, 'after_flush', sales_rollup._collect_deltas)
+        super().tearDown()
+
+    def add_order(self, status, items, day=DAY, payment_method='cash'):
+        """items: [(product_id, quantity, price)]; total = jumlah subtotal"""
+        order = models.Order(
+            user_id=self.user_id, status=status, payment_method=payment_method,
+            source_type='offline', created_at=datetime.combine(day, datetime.min.time()),
+            total_amount=sum(quantity * price for _, quantity, price in items))
+        order.order_items = [models.OrderItem(product_id=product_id, quantity=quantity,
+                                              price=price)
+                             for product_id, quantity, price in items]
+        db.session.add(order)
+        db.session.commit()
+        return order.id
+
+    def get_order(self, order_id):
+        return db.session.get(models.Order, order_id)
+
+    def rollup(self):
+        """{(tanggal, source, payment, product_id): (orders, total, quantity, revenue)}"""
+        db.session.expire_all()
+        rows = {}
+        for row in models.DailySalesRollup.query:
+            measures = (row.orders_count, row.total_amount, row.quantity, row.revenue)
+            if any(measures):
+                rows[(row.sales_date, row.source_type, row.payment_method,
+                      row.product_id)] = measures
+        return rows
+
+    def assertMatchesRebuild(self, since=None):
+        incremental = self.rollup()
+        sales_rollup.rebuild(since=since)
+        self.assertEqual(incremental, self.rollup())
+        return incremental
+
+    def test_pending_to_paid(self):
+        order_id = self.add_order('pending', [(1, 2, 100), (2, 1, 50)])
+        self.assertEqual(self.rollup(), {})
+        self.get_order(order_id).status = 'paid'
+        db.session.commit()
+        self.assertEqual(self.assertMatchesRebuild(), {
+            (DAY, 'offline', 'cash', 0): (1, Decimal('250'), 0, 0),
+            (DAY, 'offline', 'cash', 1): (0, 0, 2, Decimal('200')),
+            (DAY, 'offline', 'cash', 2): (0, 0, 1, Decimal('50')),
+        })
+
+    def test_paid_to_cancelled(self):
+        order_id = self.add_order('paid', [(1, 2, 100)])
+        self.add_order('paid', [(1, 1, 100)])
+        self.get_order(order_id).status = 'cancelled'
+        db.session.commit()
+        self.assertEqual(self.assertMatchesRebuild(), {
+            (DAY, 'offline', 'cash', 0): (1, Decimal('100'), 0, 0),
+            (DAY, 'offline', 'cash', 1): (0, 0, 1, Decimal('100')),
+        })
+
+    def test_order_deleted(self):
+        order_id = self.add_order('delivered', [(1, 2, 100), (2, 1, 50)])
+        db.session.delete(self.get_order(order_id))
+        db.session.commit()
+        self.assertEqual(self.assertMatchesRebuild(), {})
+
+    def test_item_edits_on_paid_order(self):
+        order_id = self.add_order('paid', [(1, 2, 100), (2, 1, 50)])
+        order = self.get_order(order_id)
+        first, second = sorted(order.order_items, key=lambda item: item.product_id)
+        first.quantity = 3
+        second.price = 40
+        order.total_amount = 340
+        db.session.commit()
+        self.assertEqual(self.assertMatchesRebuild(), {
+            (DAY, 'offline', 'cash', 0): (1, Decimal('340'), 0, 0),
+            (DAY, 'offline', 'cash', 1): (0, 0, 3, Decimal('300')),
+            (DAY, 'offline', 'cash', 2): (0, 0, 1, Decimal('40')),
+        })
+
+        order = self.get_order(order_id)
+        order.order_items.remove(next(item for item in order.order_items
+                                      if item.product_id == 2))
+        db.session.add(models.OrderItem(order_id=order_id, product_id=3, quantity=4, price=5))
+        order.total_amount = 320
+        db.session.commit()
+        self.assertEqual(self.assertMatchesRebuild(), {
+            (DAY, 'offline', 'cash', 0): (1, Decimal('320'), 0, 0),
+            (DAY, 'offline', 'cash', 1): (0, 0, 3, Decimal('300')),
+            (DAY, 'offline', 'cash', 3): (0, 0, 4, Decimal('20')),
+        })
+
+    def test_created_at_moved_to_another_date(self):
+        order_id = self.add_order('paid', [(1, 2, 100)])
+        self.get_order(order_id).created_at = datetime.combine(NEXT_DAY, datetime.min.time())
+        db.session.commit()
+        self.assertEqual(self.assertMatchesRebuild(), {
+            (NEXT_DAY, 'offline', 'cash', 0): (1, Decimal('200'), 0, 0),
+            (NEXT_DAY, 'offline', 'cash', 1): (0, 0, 2, Decimal('200')),
+        })
+
+    def test_rebuild_since_matches_incremental(self):
+        self.add_order('paid', [(1, 1, 100)], day=DAY)
+        self.add_order('paid', [(1, 2, 100), (2, 1, 70)], day=NEXT_DAY, payment_method='qris')
+        pending_id = self.add_order('pending', [(2, 3, 70)], day=NEXT_DAY)
+        self.get_order(pending_id).status = 'shipped'
+        db.session.commit()
+        incremental = self.assertMatchesRebuild(since=NEXT_DAY)
+        self.assertEqual(incremental[(NEXT_DAY, 'offline', 'cash', 2)],
+                         (0, 0, 3, Decimal('210')))
+        self.assertEqual(self.assertMatchesRebuild(), incremental)
+
+    def test_backfill_if_empty(self):
+        self.add_order('paid', [(1, 1, 100)])
+        expected = self.rollup()
+        db.session.execute(models.DailySalesRollup.__table__.delete())
+        db.session.commit()
+        self.assertIsNotNone(sales_rollup.backfill_if_empty())
+        self.assertEqual(self.rollup(), expected)
+        self.assertIsNone(sales_rollup.backfill_if_empty())
+
+
+if __name__ == '__main__':
+    unittest.main()
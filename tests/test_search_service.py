@@ -0,0 +1,77 @@
+import unittest
+
+import models
+import search_service
+from database import db
+from search_index import product_search_index
+from tests import DatabaseTestCase
+
+PRODUCTS = [
+    ('Gitar Akustik Yamaha F310', 'Yamaha', 'F310', '8991', 'Gitar akustik untuk pemula'),
+    ('Senar Gitar Elixir', 'Elixir', 'Nanoweb', '8992', 'Coating 100% anti karat'),
+    ('Drum Pad', 'Roland', 'PD-8', '8993', 'Pad mesh dual-zone'),
+    ('Kabel Jack', None, None, None, 'Kabel gitar 3 meter, konektor 1/4_inch'),
+    ('Ampli Mini', 'Fender', 'Mini Deluxe', '8995', None),
+]
+
+
+class SearchBackendsTest(DatabaseTestCase):
+    config = {'SEARCH_BACKEND': 'memory'}
+
+    def setUp(self):
+        super().setUp()
+        category = models.Category(name='Alat Musik')
+        db.session.add(category)
+        db.session.flush()
+        for i, (name, brand, model, gtin, description) in enumerate(PRODUCTS):
+            db.session.add(models.Product(name=name, slug=f'p-{i}', price=10, brand=brand,
+                                          model=model, gtin=gtin, description=description,
+                                          category_id=category.id))
+        db.session.commit()
+        product_search_index.mark_stale()
+
+    def tearDown(self):
+        super().tearDown()
+        product_search_index.mark_stale()
+
+    def sql_storefront_ids(self, search_text):
+        """Filter yang dipakai backend postgres, dijalankan di SQLite"""
+        query = models.Product.query
+        for keyword in search_text.lower().split():
+            query = query.filter(search_service._keyword_condition(keyword))
+        return {product.id for product in query}
+
+    def test_storefront_matching_same_as_memory_index(self):
+        for search_text in ('gitar', 'akustik', 'karat', 'pd-8', '100%', '1/4_inch',
+                            'gitar yamaha', 'gitar meter', 'mini', 'x%', 'a_u'):
+            with self.subTest(search_text=search_text):
+                memory_ids = {doc['id'] for doc in
+                              product_search_index.search(search_text, limit=100)}
+                self.assertEqual(memory_ids, self.sql_storefront_ids(search_text))
+
+    def test_cashier_matches_description_and_literal_wildcards(self):
+        names = lambda search: {p.name for p in search_service.search_cashier(search)}
+        self.assertEqual(names('anti karat'), {'Senar Gitar Elixir'})
+        self.assertEqual(names('100%'), {'Senar Gitar Elixir'})
+        self.assertEqual(names('%'), {'Senar Gitar Elixir'})
+        self.assertEqual(names('gitar'), {'Gitar Akustik Yamaha F310', 'Senar Gitar Elixir',
+                                          'Kabel Jack'})
+        # Teks utuh, bukan AND per kata
+        self.assertEqual(names('gitar karat'), set())
+
+    def test_cashier_exact_id_and_gtin_first(self):
+        results = search_service.search_cashier('8993')
+        self.assertEqual(results[0].name, 'Drum Pad')
+
+    def test_cashier_result_limit(self):
+        category_id = models.Category.query.first().id
+        for i in range(search_service.CASHIER_RESULT_LIMIT + 20):
+            db.session.add(models.Product(name=f'Pick {i}', slug=f'pick-{i}', price=1,
+                                          category_id=category_id))
+        db.session.commit()
+        results = search_service.search_cashier('pick')
+        self.assertEqual(len(results), search_service.CASHIER_RESULT_LIMIT)
+
+
+if __name__ == '__main__':
+    unittest.main()
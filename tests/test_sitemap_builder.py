@@ -0,0 +1,66 @@
+import os
+import tempfile
+import time
+import unittest
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+import models
+from database import db
+from sitemap_builder import SitemapBuilder
+from tests import DatabaseTestCase
+
+
+class SitemapDirtyTest(DatabaseTestCase):
+    config = {'SITEMAP_BACKGROUND': False}
+
+    def setUp(self):
+        self.config = {**self.config, 'SITEMAP_FOLDER': tempfile.mkdtemp()}
+        super().setUp()
+        self.builder = SitemapBuilder()
+        self.builder.init_app(self.app)
+        category = models.Category(name='Gitar')
+        db.session.add(category)
+        db.session.flush()
+        self.product = models.Product(name='Gitar', slug='gitar', price=100,
+                                      stock_quantity=5, category_id=category.id)
+        db.session.add(self.product)
+        db.session.commit()
+        self.builder.build()
+        self.assertFalse(self.builder.needs_build())
+
+    def tearDown(self):
+        event.remove(Session, 'after_commit', self.builder._after_commit)
+        super().tearDown()
+
+    def commit_marks_dirty(self, change):
+        # Build terakhir 10 detik lalu, perubahan sebelumnya 20 detik lalu
+        now = time.time()
+        os.utime(os.path.join(self.builder.directory, '.dirty'), (now - 20, now - 20))
+        os.utime(os.path.join(self.builder.directory, 'manifest.json'), (now - 10, now - 10))
+        self.assertFalse(self.builder.needs_build())
+        change(db.session.get(models.Product, self.product.id))
+        db.session.commit()
+        return self.builder.needs_build()
+
+    def test_stock_change_within_availability_is_ignored(self):
+        self.assertFalse(self.commit_marks_dirty(lambda p: setattr(p, 'stock_quantity', 4)))
+
+    def test_availability_change_marks_dirty(self):
+        self.assertTrue(self.commit_marks_dirty(lambda p: setattr(p, 'stock_quantity', 0)))
+
+    def test_sitemap_field_change_marks_dirty(self):
+        self.assertTrue(self.commit_marks_dirty(lambda p: setattr(p, 'price', 120)))
+
+    def test_build_clears_dirty(self):
+        self.builder.mark_dirty()
+        self.assertTrue(self.builder.needs_build())
+        self.builder.build(only_if_needed=True)
+        self.assertFalse(self.builder.needs_build())
+        with open(os.path.join(self.builder.directory, 'product-feed.xml')) as f:
+            self.assertIn('in stock', f.read())
+
+
+if __name__ == '__main__':
+    unittest.main()